@@ -53,6 +53,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # 放在最外層，記錄的處理時間包含其他 middleware
+    "web.middleware.MetricsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -124,6 +126,69 @@ DATABASES = {
     }
 }
 
+# Cache
+# 使用檔案型快取，讓同一台主機上的 uwsgi worker 共用版本號等資料
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": BASE_DIR / "cache",
+        "OPTIONS": {
+            "MAX_ENTRIES": 10000,
+        },
+    },
+    # filter_news 的查詢結果快取，每個 worker 各自一份，以項目數限制記憶體用量
+    "results": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "news-results",
+        "TIMEOUT": int(os.getenv("NEWS_RESULT_CACHE_TTL", 300)),
+        "OPTIONS": {
+            "MAX_ENTRIES": 500,
+        },
+    },
+}
+
+# 每組篩選條件最多快取的文章 id 數量（預設 100 頁）
+NEWS_RESULT_CACHE_MAX_IDS = 1000
+# 結果超過快取上限時是否計算精確總數；關閉時顯示為「1000+ 篇」
+NEWS_EXACT_TOTALS = False
+
+# NewsAPI 回應快取（存放在本機 SQLite 檔案，供所有 worker 共用）
+NEWS_API_CACHE = {
+    "PATH": BASE_DIR / "cache" / "newsapi.sqlite3",
+    "TTL": int(os.getenv("NEWS_API_CACHE_TTL", 300)),
+    "MAX_ENTRIES": 1000,
+}
+
+# 已知文章網址的 Bloom filter（以 mmap 由所有 worker 共用），命中的文章不查詢資料庫直接略過；
+# ERROR_RATE 為新文章被誤判為已知而略過的機率，超過 CAPACITY 後誤判率會上升，需以 url_filter --rebuild 重建
+NEWS_URL_FILTER = {
+    "PATH": BASE_DIR / "cache" / "urls.bloom",
+    "CAPACITY": 1_000_000,
+    "ERROR_RATE": float(os.getenv("NEWS_URL_FILTER_ERROR_RATE", 0.001)),
+}
+
+# run_scheduler 的抓取間隔（秒）與每小時 API 請求上限
+NEWS_SCHEDULER = {
+    "MIN_INTERVAL": 10 * 60,
+    "MAX_INTERVAL": 24 * 60 * 60,
+    "INITIAL_INTERVAL": 60 * 60,
+    "REQUESTS_PER_HOUR": int(os.getenv("NEWS_SCHEDULER_REQUESTS_PER_HOUR", 50)),
+}
+
+# 瀏覽時遇到的新產業與關鍵字先寫入此檔案，由 flush_pending_terms 批次建立
+NEWS_PENDING_TERMS_PATH = BASE_DIR / "cache" / "pending_terms.jsonl"
+
+# /metrics 的指標：web 伺服器與背景常駐程式每 FLUSH_INTERVAL 秒把自己的數值寫入 DIR，輸出時加總。
+# /metrics 只允許 ALLOWED_IPS 中的位址（例如同一台主機上的 Prometheus）與管理員存取
+NEWS_METRICS = {
+    "DIR": BASE_DIR / "cache" / "metrics",
+    "FLUSH_INTERVAL": 5,
+    "ALLOWED_IPS": [
+        ip.strip() for ip in os.getenv("NEWS_METRICS_ALLOWED_IPS", "127.0.0.1,::1").split(",") if ip.strip()
+    ],
+}
+
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 
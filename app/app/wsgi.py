@@ -14,3 +14,19 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "app.settings")
 
 application = get_wsgi_application()
+
+# 各 worker 定期寫入自己的指標數值，由 /metrics 加總
+from web.metrics import start_flushing
+
+start_flushing()
+
+# 預先建立記憶體內的建議索引並載入已知網址的 Bloom filter，第一個請求不需等待
+try:
+    from modelCore.bloom import get_url_filter
+    from web.autocomplete import warm_index
+
+    warm_index()
+    get_url_filter()
+except Exception:
+    # 資料庫尚未遷移等情況下略過，第一次查詢時再建立
+    pass
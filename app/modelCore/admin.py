@@ -1,12 +1,13 @@
 from django.contrib import admin
 from .models import User
-from .models import Industry, Keyword, NewsArticle
+from .models import Industry, Keyword, NewsArticle, FetchJob
 # Register your models here.
 
 admin.site.register(User)
 admin.site.register(Industry)
 admin.site.register(Keyword)
 admin.site.register(NewsArticle)
+admin.site.register(FetchJob)
 
 
 
@@ -0,0 +1,117 @@
+# modelCore/backfill.py
+
+import hashlib
+import json
+
+from django.db import IntegrityError, transaction
+
+from .linking import sync_links
+from .matcher import get_matcher
+from .models import FetchJob, Industry, Keyword, NewsArticle
+from .search import text_search_q
+
+# 每次載入並比對的候選文章數
+CHUNK_SIZE = 500
+
+
+def candidate_article_ids(term):
+    """
+    找出標題或描述可能包含 term 的文章 id：長度足夠的詞查全文索引（字元 trigram 倒排索引），
+    太短的詞退回 icontains。結果可能多於實際符合的文章，需再以比對器確認
+    """
+    term = (term or '').strip()
+    if not term:
+        return set()
+    return set(NewsArticle.objects.filter(text_search_q([term])).values_list('id', flat=True))
+
+
+def backfill_terms(industry_ids=(), keyword_ids=(), chunk_size=CHUNK_SIZE, renamed=False):
+    """
+    為新增或更名的產業與關鍵字補建既有文章的關聯：
+    只比對索引找出的候選文章，確認符合後批次新增關聯。
+    產業出現時其關鍵字才算相關，因此產業的候選文章也會補建該產業關鍵字的關聯。
+    renamed 為 True 時（更名或改變所屬產業），目前已關聯的文章也一併重新比對，移除不再符合的關聯。
+    回傳 {'candidates': 候選文章數, 'industries': 新增產業關聯數, 'keywords': 新增關鍵字關聯數,
+    'removed': 移除的關聯數}
+    """
+    industry_scope = set(industry_ids)
+    keyword_scope = set(keyword_ids)
+    if industry_scope:
+        keyword_scope.update(
+            Keyword.objects.filter(industry_id__in=industry_scope).values_list('id', flat=True)
+        )
+
+    candidates = set()
+    for name in Industry.objects.filter(id__in=industry_scope).values_list('name', flat=True):
+        candidates |= candidate_article_ids(name)
+    for keyword in Keyword.objects.filter(id__in=keyword_ids).values_list('keyword', flat=True):
+        candidates |= candidate_article_ids(keyword)
+
+    linked = set()
+    if renamed:
+        linked.update(NewsArticle.industries.through.objects.filter(
+            industry_id__in=industry_scope
+        ).values_list('newsarticle_id', flat=True))
+        linked.update(NewsArticle.keywords.through.objects.filter(
+            keyword_id__in=keyword_scope
+        ).values_list('newsarticle_id', flat=True))
+        candidates |= linked
+
+    totals = {'candidates': len(candidates), 'industries': 0, 'keywords': 0, 'removed': 0}
+    if not candidates:
+        return totals
+
+    matcher = get_matcher()
+    candidates = sorted(candidates)
+    for start in range(0, len(candidates), chunk_size):
+        links = {}
+        for article_id, title, description in NewsArticle.objects.filter(
+            id__in=candidates[start:start + chunk_size]
+        ).values_list('id', 'title', 'description'):
+            matched_industries, matched_keywords = matcher.match_article(title, description)
+            matched_industries &= industry_scope
+            matched_keywords &= keyword_scope
+            # 已關聯的文章即使不再符合也要列入，才會移除舊名稱留下的關聯
+            if matched_industries or matched_keywords or article_id in linked:
+                links[article_id] = (matched_industries, matched_keywords)
+
+        counts = sync_links(links, industry_scope, keyword_scope, remove=renamed)
+        totals['industries'] += counts['industries'][0]
+        totals['keywords'] += counts['keywords'][0]
+        totals['removed'] += counts['industries'][1] + counts['keywords'][1]
+    return totals
+
+
+def enqueue_backfill(industry_ids=(), keyword_ids=(), renamed=False):
+    """
+    交易提交後排入補建關聯的背景工作，由 run_worker 執行，後台儲存時不需等待掃描文章。
+    相同內容的工作等待中時不重複建立
+    """
+    params = {
+        'task': 'backfill',
+        'industries': sorted(industry_ids),
+        'keywords': sorted(keyword_ids),
+        'renamed': renamed,
+    }
+    key = hashlib.sha1(json.dumps(params).encode('utf-8')).hexdigest()
+
+    def create():
+        try:
+            with transaction.atomic():
+                FetchJob.objects.create(dedupe_key=key, params=params)
+        except IntegrityError:
+            # 相同的工作已在等待中或執行中
+            pass
+
+    transaction.on_commit(create)
+
+
+def run_backfill(params):
+    """
+    執行 enqueue_backfill 排入的工作，回傳結果摘要
+    """
+    return backfill_terms(
+        industry_ids=params.get('industries', ()),
+        keyword_ids=params.get('keywords', ()),
+        renamed=params.get('renamed', False),
+    )
@@ -0,0 +1,195 @@
+# modelCore/bloom.py
+
+import hashlib
+import math
+import mmap
+import os
+import struct
+import threading
+
+from django.conf import settings
+
+
+class BloomFilter:
+    """
+    以 mmap 存放在檔案中的 Bloom filter，同一台機器上的多個行程共用同一份位元陣列。
+    查詢結果為「一定不存在」或「可能存在」，可能存在的機率由 error_rate 控制。
+    多個行程同時寫入同一個位元組時可能遺失位元，結果只會變成「不存在」，不會誤判為存在
+    """
+
+    MAGIC = b'NEWSBLM1'
+    # magic、位元數、雜湊函數數量、設計容量、已加入數量
+    HEADER = struct.Struct('<8sQQQQ')
+
+    def __init__(self, path):
+        self.path = str(path)
+        self._file = open(self.path, 'r+b')
+        self._map = mmap.mmap(self._file.fileno(), 0)
+        magic, self.num_bits, self.num_hashes, self.capacity, _ = self.HEADER.unpack_from(self._map)
+        if magic != self.MAGIC:
+            self.close()
+            raise ValueError(f"{self.path} 不是 Bloom filter 檔案")
+        self._offset = self.HEADER.size
+        self._lock = threading.Lock()
+        self.stats = {'checks': 0, 'hits': 0, 'adds': 0}
+
+    @staticmethod
+    def optimal_parameters(capacity, error_rate):
+        """
+        依預計加入的數量與可接受的誤判率計算位元數與雜湊函數數量
+        """
+        num_bits = math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)
+        num_hashes = max(1, round(num_bits / capacity * math.log(2)))
+        return num_bits, num_hashes
+
+    @classmethod
+    def create(cls, path, capacity, error_rate):
+        """
+        建立新的空白檔案；先寫入暫存檔再改名，讓其他行程不會讀到寫到一半的檔案
+        """
+        num_bits, num_hashes = cls.optimal_parameters(capacity, error_rate)
+        os.makedirs(os.path.dirname(str(path)) or '.', exist_ok=True)
+        temp_path = f'{path}.{os.getpid()}.tmp'
+        with open(temp_path, 'wb') as handle:
+            handle.write(cls.HEADER.pack(cls.MAGIC, num_bits, num_hashes, capacity, 0))
+            handle.truncate(cls.HEADER.size + (num_bits + 7) // 8)
+        os.replace(temp_path, path)
+        return cls(path)
+
+    def _positions(self, item):
+        # 以兩個 64 位元雜湊值組合出 k 個位置（double hashing）
+        digest = hashlib.blake2b(item.encode('utf-8'), digest_size=16).digest()
+        h1, h2 = struct.unpack('<QQ', digest)
+        return [(h1 + i * h2) % self.num_bits for i in range(self.num_hashes)]
+
+    def __contains__(self, item):
+        self.stats['checks'] += 1
+        data = self._map
+        offset = self._offset
+        for position in self._positions(item):
+            if not data[offset + (position >> 3)] & (1 << (position & 7)):
+                return False
+        self.stats['hits'] += 1
+        return True
+
+    def add(self, item):
+        """
+        加入一個項目，回傳此項目先前是否可能已存在
+        """
+        data = self._map
+        offset = self._offset
+        added = False
+        with self._lock:
+            for position in self._positions(item):
+                index = offset + (position >> 3)
+                bit = 1 << (position & 7)
+                if not data[index] & bit:
+                    data[index] |= bit
+                    added = True
+            if added:
+                self.stats['adds'] += 1
+                count = self.HEADER.unpack_from(data)[4]
+                struct.pack_into('<Q', data, self.HEADER.size - 8, count + 1)
+        return not added
+
+    def update(self, items):
+        for item in items:
+            self.add(item)
+
+    def __len__(self):
+        """已加入的項目數量（近似值）"""
+        return self.HEADER.unpack_from(self._map)[4]
+
+    def fill_ratio(self):
+        ones = int.from_bytes(self._map[self._offset:], 'little').bit_count()
+        return ones / self.num_bits
+
+    def get_stats(self):
+        """
+        回傳設定、目前的填充率與估計誤判率，以及此行程的查詢統計
+        """
+        fill = self.fill_ratio()
+        stats = dict(self.stats)
+        stats.update({
+            'path': self.path,
+            'capacity': self.capacity,
+            'count': len(self),
+            'bits': self.num_bits,
+            'hashes': self.num_hashes,
+            'size_bytes': (self.num_bits + 7) // 8,
+            'fill_ratio': fill,
+            'estimated_error_rate': fill ** self.num_hashes,
+            'hit_rate': stats['hits'] / stats['checks'] if stats['checks'] else 0.0,
+        })
+        return stats
+
+    def flush(self):
+        self._map.flush()
+
+    def close(self):
+        self._map.close()
+        self._file.close()
+
+
+def _filter_settings():
+    options = {'PATH': None, 'CAPACITY': 1_000_000, 'ERROR_RATE': 0.001}
+    options.update(getattr(settings, 'NEWS_URL_FILTER', {}))
+    return options
+
+
+def build_url_filter(path=None, capacity=None, error_rate=None, batch_size=5000):
+    """
+    由資料庫中所有文章的標準網址建立新的 Bloom filter，容量不足時自動放大為現有數量的兩倍
+    """
+    from .models import NewsArticle
+
+    options = _filter_settings()
+    path = path or options['PATH']
+    existing = NewsArticle.objects.filter(canonical_url__isnull=False).count()
+    capacity = max(capacity or options['CAPACITY'], existing * 2)
+    temp_path = f'{path}.build'
+    bloom = BloomFilter.create(temp_path, capacity, error_rate or options['ERROR_RATE'])
+    bloom.update(
+        NewsArticle.objects.filter(canonical_url__isnull=False)
+        .values_list('canonical_url', flat=True).iterator(chunk_size=batch_size)
+    )
+    bloom.close()
+    os.replace(temp_path, path)
+    return BloomFilter(path)
+
+
+_lock = threading.Lock()
+_url_filter = None
+
+
+def get_url_filter():
+    """
+    取得行程內共用的已知網址 Bloom filter；檔案不存在時由資料庫建立。
+    未設定 NEWS_URL_FILTER['PATH'] 時回傳 None
+    """
+    global _url_filter
+
+    if _url_filter is not None:
+        return _url_filter
+    path = _filter_settings()['PATH']
+    if not path:
+        return None
+    with _lock:
+        if _url_filter is None:
+            if os.path.exists(path):
+                _url_filter = BloomFilter(path)
+            else:
+                _url_filter = build_url_filter(path)
+    return _url_filter
+
+
+def reset_url_filter():
+    """
+    關閉目前開啟的檔案，下次呼叫 get_url_filter 時重新載入（例如重建之後）
+    """
+    global _url_filter
+
+    with _lock:
+        if _url_filter is not None:
+            _url_filter.close()
+        _url_filter = None
@@ -0,0 +1,52 @@
+# modelCore/canonical.py
+
+import re
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+# 追蹤用的查詢參數，不影響文章內容
+TRACKING_PARAMS = {
+    'fbclid', 'gclid', 'dclid', 'msclkid', 'igshid', 'mc_cid', 'mc_eid', 'ocid',
+    'cmpid', 'spm', 'share', 'ref', 'ref_src', 'feature', 'output', 'outputtype',
+}
+TRACKING_PREFIXES = ('utm_', 'ga_', 'pk_', 'hmb_')
+# 行動版與 AMP 版的主機名稱前綴
+MOBILE_HOST_PREFIXES = ('www.', 'm.', 'mobile.', 'amp.', 'wap.')
+_AMP_PATH = re.compile(r'(/amp/?|\.amp)$', re.IGNORECASE)
+_DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+
+def canonicalize_url(url):
+    """
+    將文章網址正規化，讓同一篇文章的不同網址得到相同結果：
+    統一使用 https、主機名稱小寫並移除 www/行動版前綴、移除預設連接埠、錨點、
+    追蹤參數與 AMP 路徑，其餘參數依名稱排序，並移除結尾的斜線
+    """
+    if not url:
+        return ''
+    try:
+        parts = urlsplit(url.strip())
+        port = parts.port
+    except ValueError:
+        return url.strip()
+    if not parts.netloc:
+        return url.strip()
+
+    host = (parts.hostname or '').lower()
+    for prefix in MOBILE_HOST_PREFIXES:
+        if host.startswith(prefix) and host.count('.') > 1:
+            host = host[len(prefix):]
+            break
+    scheme = parts.scheme.lower()
+    if port and port != _DEFAULT_PORTS.get(scheme):
+        host = f'{host}:{port}'
+
+    path = _AMP_PATH.sub('', parts.path) or '/'
+    if len(path) > 1:
+        path = path.rstrip('/')
+
+    query = sorted(
+        (key, value)
+        for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if key.lower() not in TRACKING_PARAMS and not key.lower().startswith(TRACKING_PREFIXES)
+    )
+    return urlunsplit(('https', host, path, urlencode(query), ''))
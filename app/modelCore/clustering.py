@@ -0,0 +1,191 @@
+# modelCore/clustering.py
+
+import hashlib
+import operator
+import struct
+import zlib
+from collections import defaultdict
+
+from django.db.models import Count, Exists, F, OuterRef, Window
+from django.db.models.functions import RowNumber
+
+from .models import ArticleBucket, NewsArticle
+
+# 以連續幾個字元為一組計算指紋，對中文與英文都適用
+SHINGLE_SIZE = 3
+# MinHash 的雜湊函數數量，切成 BANDS 段、每段 ROWS 個值
+SIGNATURE_SIZE = 32
+BANDS = 8
+ROWS = SIGNATURE_SIZE // BANDS
+# 估計的 Jaccard 相似度達到此值視為同一則新聞
+SIMILARITY_THRESHOLD = 0.7
+# 每個桶只與最近加入的幾篇比較，熱門新聞的桶再大，每篇文章的比對次數仍有上限
+MAX_BUCKET_CANDIDATES = 50
+# 每次以 IN 查詢的數量，避免超過 SQLite 的參數上限
+QUERY_CHUNK_SIZE = 500
+
+# 每個 n-gram 以兩次 64 位元組的 blake2b 取得 32 個 32 位元雜湊值
+_SALTS = (b'minhash0', b'minhash1')
+_SIGNATURE = struct.Struct(f'<{SIGNATURE_SIZE}I')
+_BAND_BITS = 24
+
+
+def shingles(title, description=None):
+    """
+    將標題與描述正規化（小寫、只保留文字與數字）後切成字元 n-gram 集合
+    """
+    text = f"{title or ''} {description or ''}".lower()
+    text = ''.join(c for c in text if c.isalnum())
+    if len(text) < SHINGLE_SIZE:
+        return {text} if text else set()
+    return {text[i:i + SHINGLE_SIZE] for i in range(len(text) - SHINGLE_SIZE + 1)}
+
+
+def minhash(title, description=None):
+    """
+    計算 MinHash 指紋（128 位元組），兩篇文章指紋相同位置相等的比例即為 Jaccard 相似度的估計；
+    沒有內容時回傳 None
+    """
+    grams = shingles(title, description)
+    if not grams:
+        return None
+    hashes = []
+    for gram in grams:
+        data = gram.encode('utf-8')
+        digest = b''.join(hashlib.blake2b(data, digest_size=64, salt=salt).digest() for salt in _SALTS)
+        hashes.append(_SIGNATURE.unpack(digest))
+    return _SIGNATURE.pack(*map(min, zip(*hashes)))
+
+
+def similarity(a, b):
+    """
+    由兩個 MinHash 指紋（bytes 或已解開的 tuple）估計 Jaccard 相似度
+    """
+    if isinstance(a, (bytes, bytearray, memoryview)):
+        a = _SIGNATURE.unpack(a)
+    if isinstance(b, (bytes, bytearray, memoryview)):
+        b = _SIGNATURE.unpack(b)
+    return sum(map(operator.eq, a, b)) / SIGNATURE_SIZE
+
+
+def bucket_keys(signature):
+    """
+    指紋每一段的桶：段號放在高位、該段內容的雜湊放在低位，讓所有段共用同一個索引欄位
+    """
+    band_size = ROWS * 4
+    mask = (1 << _BAND_BITS) - 1
+    return [
+        (band << _BAND_BITS) | (zlib.crc32(signature[band * band_size:(band + 1) * band_size]) & mask)
+        for band in range(BANDS)
+    ]
+
+
+def assign_clusters(rows, replace=False):
+    """
+    為一批文章計算指紋並指定 cluster_id。
+    rows: [(article_id, title, description), ...]
+    replace: 文章內容已變更時，先移除舊的桶紀錄
+    每篇文章只需查詢自己所在的幾個桶，並與桶內文章比較相似度；
+    找到相近的文章時沿用其 cluster_id，否則以自己的 id 作為新群組。
+    回傳 {article_id: cluster_id}
+    """
+    signatures = {}
+    for article_id, title, description in rows:
+        signatures[article_id] = minhash(title, description)
+    if not signatures:
+        return {}
+
+    if replace:
+        ArticleBucket.objects.filter(article_id__in=list(signatures)).delete()
+
+    # 一次查出所有相關桶中最近加入的既有文章
+    keys = sorted({key for sig in signatures.values() if sig is not None for key in bucket_keys(sig)})
+    buckets = defaultdict(list)
+    for start in range(0, len(keys), QUERY_CHUNK_SIZE):
+        for key, article_id in ArticleBucket.objects.filter(
+            bucket__in=keys[start:start + QUERY_CHUNK_SIZE]
+        ).exclude(article_id__in=list(signatures)).annotate(
+            rank=Window(RowNumber(), partition_by=F('bucket'), order_by=F('article_id').desc())
+        ).filter(rank__lte=MAX_BUCKET_CANDIDATES).values_list('bucket', 'article_id'):
+            buckets[key].append(article_id)
+
+    known = {}
+    candidate_ids = sorted({article_id for ids in buckets.values() for article_id in ids})
+    for start in range(0, len(candidate_ids), QUERY_CHUNK_SIZE):
+        for article_id, signature, cluster_id in NewsArticle.objects.filter(
+            id__in=candidate_ids[start:start + QUERY_CHUNK_SIZE], minhash__isnull=False
+        ).values_list('id', 'minhash', 'cluster_id'):
+            known[article_id] = (_SIGNATURE.unpack(signature), cluster_id or article_id)
+
+    clusters = {}
+    new_buckets = []
+    for article_id in sorted(signatures):
+        signature = signatures[article_id]
+        if signature is None:
+            clusters[article_id] = None
+            continue
+
+        # 與同桶文章比較，沿用最相似（相同時取較早）文章的群組
+        best_score, best_id = SIMILARITY_THRESHOLD, None
+        keys = bucket_keys(signature)
+        values = _SIGNATURE.unpack(signature)
+        candidates = {
+            other for key in keys for other in buckets.get(key, ())[-MAX_BUCKET_CANDIDATES:]
+        }
+        for other in sorted(candidates):
+            if other in known:
+                score = similarity(values, known[other][0])
+                if score > best_score or (score == best_score and best_id is None):
+                    best_score, best_id = score, other
+
+        cluster_id = known[best_id][1] if best_id is not None else article_id
+        clusters[article_id] = cluster_id
+        # 同一批次中後面的文章也能比對到這篇
+        known[article_id] = (values, cluster_id)
+        for key in keys:
+            buckets[key].append(article_id)
+            new_buckets.append(ArticleBucket(bucket=key, article_id=article_id))
+
+    ArticleBucket.objects.bulk_create(new_buckets, batch_size=QUERY_CHUNK_SIZE)
+    NewsArticle.objects.bulk_update(
+        [
+            NewsArticle(id=article_id, minhash=signatures[article_id], cluster_id=cluster_id)
+            for article_id, cluster_id in clusters.items()
+        ],
+        ['minhash', 'cluster_id'],
+        batch_size=QUERY_CHUNK_SIZE,
+    )
+    return clusters
+
+
+def collapse_clusters(queryset):
+    """
+    每個群組只保留結果中 id 最大（最新加入）的一篇；沒有群組的文章全部保留
+    """
+    newer = queryset.order_by().filter(cluster_id=OuterRef('cluster_id'), id__gt=OuterRef('id'))
+    return queryset.exclude(Exists(newer))
+
+
+def bucket_stats():
+    """
+    回傳指紋與桶的統計數字
+    """
+    sizes = sorted(
+        ArticleBucket.objects.values('bucket').annotate(size=Count('id'))
+        .values_list('size', flat=True)
+    )
+    cluster_sizes = list(
+        NewsArticle.objects.filter(cluster_id__isnull=False).values('cluster_id')
+        .annotate(size=Count('id')).filter(size__gt=1).values_list('size', flat=True)
+    )
+    return {
+        'articles': NewsArticle.objects.count(),
+        'signed': NewsArticle.objects.filter(minhash__isnull=False).count(),
+        'buckets': len(sizes),
+        'bucket_avg': sum(sizes) / len(sizes) if sizes else 0.0,
+        'bucket_p95': sizes[int(len(sizes) * 0.95)] if sizes else 0,
+        'bucket_max': sizes[-1] if sizes else 0,
+        'clusters': len(cluster_sizes),
+        'clustered_articles': sum(cluster_sizes),
+        'cluster_max': max(cluster_sizes, default=0),
+    }
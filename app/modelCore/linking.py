@@ -0,0 +1,83 @@
+# modelCore/linking.py
+
+from django.db import transaction
+
+from .models import NewsArticle
+from .rollups import apply_link_changes
+from .versions import CORPUS, bump_version
+
+
+def _sync_through(through, target_field, links, scope=None, remove=True):
+    """
+    以集合差異同步單一中介表：刪除不再需要的列，批次建立缺少的列。
+    links: {article_id: 目標 id 集合}
+    scope: 若指定，只處理目標 id 在此集合中的列
+    remove: 為 False 時只新增缺少的列，保留 links 中沒有的既有關聯
+    回傳 (新增的 (article_id, target_id) 集合, 刪除的集合)
+    """
+    if not links:
+        return set(), set()
+
+    existing = through.objects.filter(newsarticle_id__in=list(links))
+    if scope is not None:
+        existing = existing.filter(**{f'{target_field}__in': list(scope)})
+
+    desired = {
+        (article_id, target_id)
+        for article_id, target_ids in links.items()
+        for target_id in target_ids
+        if scope is None or target_id in scope
+    }
+
+    stale_ids = []
+    stale = set()
+    present = set()
+    for row_id, article_id, target_id in existing.values_list('id', 'newsarticle_id', target_field):
+        pair = (article_id, target_id)
+        if pair in desired:
+            present.add(pair)
+        elif remove:
+            stale_ids.append(row_id)
+            stale.add(pair)
+
+    if stale_ids:
+        through.objects.filter(id__in=stale_ids).delete()
+
+    missing = desired - present
+    if missing:
+        through.objects.bulk_create(
+            [through(newsarticle_id=article_id, **{target_field: target_id})
+             for article_id, target_id in missing],
+            ignore_conflicts=True,
+        )
+    return missing, stale
+
+
+def sync_links(links, industry_scope=None, keyword_scope=None, remove=True):
+    """
+    批次寫入文章的產業與關鍵字關聯。
+    links: {article_id: (產業 id 集合, 關鍵字 id 集合)}
+    industry_scope / keyword_scope: 限定只同步部分產業或關鍵字的關聯
+    remove: 為 False 時只補建關聯，不刪除既有關聯
+    回傳各中介表的 (新增數量, 刪除數量)
+    """
+    industry_links = {article_id: ids[0] for article_id, ids in links.items()}
+    keyword_links = {article_id: ids[1] for article_id, ids in links.items()}
+    with transaction.atomic():
+        industry_changes = _sync_through(
+            NewsArticle.industries.through, 'industry_id', industry_links, industry_scope, remove
+        )
+        keyword_changes = _sync_through(
+            NewsArticle.keywords.through, 'keyword_id', keyword_links, keyword_scope, remove
+        )
+        # 同步更新每日統計
+        apply_link_changes(industry_changes, keyword_changes)
+
+    counts = {
+        'industries': tuple(len(pairs) for pairs in industry_changes),
+        'keywords': tuple(len(pairs) for pairs in keyword_changes),
+    }
+    # 關聯有變動時，讓依賴文章資料的快取失效
+    if any(added or removed for added, removed in counts.values()):
+        bump_version(CORPUS)
+    return counts
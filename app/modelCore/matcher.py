@@ -0,0 +1,172 @@
+# modelCore/matcher.py
+
+import threading
+from collections import deque
+
+from .text import clean_text, clean_texts
+from .versions import TAXONOMY, get_version
+
+
+class KeywordMatcher:
+    """
+    以 Aho-Corasick 自動機一次掃描文章，找出所有出現的產業名稱與關鍵字。
+
+    每個詞以 " 詞 " 的形式加入自動機，文章以 " 標題 描述 " 的形式比對，
+    與原本逐一檢查 f" {name} " in article_text 的完整詞匹配語意相同，
+    但比對成本只與文章長度相關，與字庫大小無關。
+    """
+
+    def __init__(self, industries, keywords):
+        """
+        industries: [(industry_id, 已清理的名稱), ...]
+        keywords: [(keyword_id, 已清理的關鍵字, industry_id), ...]
+        """
+        # 每個狀態的轉移表、失敗連結，以及結束於此狀態的詞編號
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [()]
+        # 詞編號 -> (產業 id 列表, 關鍵字 id 列表)
+        self._terms = []
+        self._term_index = {}
+        # 產業 -> 關鍵字對照表
+        self.keyword_industry = {}
+        self.industry_keywords = {}
+
+        for industry_id, name in industries:
+            if not name or len(name) < 2:
+                continue
+            self._term(name)[0].append(industry_id)
+            self.industry_keywords.setdefault(industry_id, set())
+
+        for keyword_id, keyword, industry_id in keywords:
+            if not keyword or len(keyword) < 2:
+                continue
+            self._term(keyword)[1].append(keyword_id)
+            self.keyword_industry[keyword_id] = industry_id
+            if industry_id is not None:
+                self.industry_keywords.setdefault(industry_id, set()).add(keyword_id)
+
+        self._build_failure_links()
+
+    def __len__(self):
+        return len(self._terms)
+
+    def _term(self, text):
+        pattern = f" {text.lower()} "
+        index = self._term_index.get(pattern)
+        if index is not None:
+            return self._terms[index]
+
+        index = len(self._terms)
+        self._term_index[pattern] = index
+        self._terms.append(([], []))
+
+        state = 0
+        for ch in pattern:
+            next_state = self._goto[state].get(ch)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][ch] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append(())
+            state = next_state
+        self._output[state] = self._output[state] + (index,)
+        return self._terms[index]
+
+    def _build_failure_links(self):
+        # 以 BFS 計算失敗連結，並將失敗狀態的輸出合併進來
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fail = self._fail[state]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                fail = self._goto[fail].get(ch, 0)
+                if fail == next_state:
+                    fail = 0
+                self._fail[next_state] = fail
+                if self._output[fail]:
+                    self._output[next_state] = self._output[next_state] + self._output[fail]
+
+    def match_text(self, text):
+        """
+        回傳文字中出現的 (產業 id 集合, 關鍵字 id 集合)。
+        關鍵字只在其所屬產業也出現時才算相關。
+        """
+        goto = self._goto
+        fail = self._fail
+        output = self._output
+
+        found = set()
+        state = 0
+        for ch in f" {text.lower()} ":
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if output[state]:
+                found.update(output[state])
+
+        industry_ids = set()
+        keyword_ids = set()
+        for index in found:
+            term_industries, term_keywords = self._terms[index]
+            industry_ids.update(term_industries)
+            keyword_ids.update(term_keywords)
+
+        keyword_industry = self.keyword_industry
+        keyword_ids = {
+            keyword_id for keyword_id in keyword_ids
+            if keyword_industry[keyword_id] in industry_ids
+        }
+        return industry_ids, keyword_ids
+
+    def match_article(self, title, description):
+        """
+        清理標題與描述後進行比對
+        """
+        clean_title = clean_text(title)
+        clean_description = clean_text(description) if description else ""
+        return self.match_text(f"{clean_title} {clean_description}")
+
+    @classmethod
+    def from_database(cls):
+        from .models import Industry, Keyword
+
+        industry_rows = list(Industry.objects.values_list('id', 'name'))
+        industries = list(zip(
+            [industry_id for industry_id, _ in industry_rows],
+            clean_texts(name for _, name in industry_rows),
+        ))
+        keyword_rows = list(Keyword.objects.values_list('id', 'keyword', 'industry_id'))
+        keywords = [
+            (keyword_id, keyword, industry_id)
+            for (keyword_id, _, industry_id), keyword in zip(
+                keyword_rows, clean_texts(keyword for _, keyword, _ in keyword_rows)
+            )
+        ]
+        return cls(industries, keywords)
+
+
+_lock = threading.Lock()
+_matcher = None
+_matcher_version = None
+
+
+def get_matcher():
+    """
+    取得行程內共用的比對器；字庫版本改變時才重新建立
+    """
+    global _matcher, _matcher_version
+
+    version = get_version(TAXONOMY)
+    if _matcher is not None and _matcher_version == version:
+        return _matcher
+
+    with _lock:
+        if _matcher is None or _matcher_version != version:
+            _matcher = KeywordMatcher.from_database()
+            _matcher_version = version
+    return _matcher
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-18 01:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("modelCore", "0003_alter_keyword_keyword_and_more"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="keyword",
+            name="last_article_url",
+            field=models.URLField(
+                blank=True, default="", max_length=500, verbose_name="最後抓取文章連結"
+            ),
+        ),
+        migrations.AddField(
+            model_name="keyword",
+            name="last_published_at",
+            field=models.DateTimeField(
+                blank=True, null=True, verbose_name="最後抓取文章時間"
+            ),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-18 01:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("modelCore", "0005_newsarticle_fts"),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name="newsarticle",
+            options={
+                "ordering": ["-published_at", "-id"],
+                "verbose_name": "新聞文章",
+                "verbose_name_plural": "新聞文章",
+            },
+        ),
+        migrations.AddIndex(
+            model_name="newsarticle",
+            index=models.Index(
+                fields=["-published_at", "-id"], name="newsarticle_published_id_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,88 @@
+# Generated by Django 5.2.18 on 2026-10-18 01:24
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("modelCore", "0006_newsarticle_keyset_index"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="IndustryDailyCount",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("day", models.DateField(verbose_name="日期")),
+                ("count", models.IntegerField(default=0, verbose_name="文章數量")),
+                (
+                    "industry",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="daily_counts",
+                        to="modelCore.industry",
+                        verbose_name="產業",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "產業每日統計",
+                "verbose_name_plural": "產業每日統計",
+                "indexes": [
+                    models.Index(fields=["day"], name="modelCore_i_day_2fd9cb_idx")
+                ],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("industry", "day"), name="unique_industry_day"
+                    )
+                ],
+            },
+        ),
+        migrations.CreateModel(
+            name="KeywordDailyCount",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("day", models.DateField(verbose_name="日期")),
+                ("count", models.IntegerField(default=0, verbose_name="文章數量")),
+                (
+                    "keyword",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="daily_counts",
+                        to="modelCore.keyword",
+                        verbose_name="關鍵字",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "關鍵字每日統計",
+                "verbose_name_plural": "關鍵字每日統計",
+                "indexes": [
+                    models.Index(fields=["day"], name="modelCore_k_day_b96ab8_idx")
+                ],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("keyword", "day"), name="unique_keyword_day"
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,87 @@
+# Generated by Django 5.2.18 on 2026-10-18 01:29
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("modelCore", "0007_daily_rollups"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="FetchJob",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("dedupe_key", models.CharField(max_length=64, verbose_name="去重鍵")),
+                ("params", models.JSONField(default=dict, verbose_name="參數")),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("pending", "等待中"),
+                            ("running", "執行中"),
+                            ("done", "完成"),
+                            ("failed", "失敗"),
+                        ],
+                        default="pending",
+                        max_length=10,
+                        verbose_name="狀態",
+                    ),
+                ),
+                (
+                    "result",
+                    models.JSONField(blank=True, null=True, verbose_name="結果"),
+                ),
+                (
+                    "error",
+                    models.TextField(blank=True, default="", verbose_name="錯誤訊息"),
+                ),
+                ("attempts", models.IntegerField(default=0, verbose_name="執行次數")),
+                (
+                    "created_at",
+                    models.DateTimeField(
+                        default=django.utils.timezone.now, verbose_name="建立時間"
+                    ),
+                ),
+                (
+                    "started_at",
+                    models.DateTimeField(
+                        blank=True, null=True, verbose_name="開始時間"
+                    ),
+                ),
+                (
+                    "finished_at",
+                    models.DateTimeField(
+                        blank=True, null=True, verbose_name="完成時間"
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "抓取工作",
+                "verbose_name_plural": "抓取工作",
+                "indexes": [
+                    models.Index(
+                        fields=["status", "id"], name="modelCore_f_status_ba3c87_idx"
+                    )
+                ],
+                "constraints": [
+                    models.UniqueConstraint(
+                        condition=models.Q(("status__in", ["pending", "running"])),
+                        fields=("dedupe_key",),
+                        name="unique_active_fetch_job",
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,68 @@
+# Generated by Django 5.2.18 on 2026-10-18 01:31
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("modelCore", "0008_fetch_job"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="KeywordSchedule",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("interval", models.IntegerField(verbose_name="抓取間隔（秒）")),
+                (
+                    "next_fetch_at",
+                    models.DateTimeField(db_index=True, verbose_name="下次抓取時間"),
+                ),
+                (
+                    "last_fetched_at",
+                    models.DateTimeField(
+                        blank=True, null=True, verbose_name="上次抓取時間"
+                    ),
+                ),
+                (
+                    "last_new_articles",
+                    models.IntegerField(default=0, verbose_name="上次新增文章數"),
+                ),
+                (
+                    "avg_new_articles",
+                    models.FloatField(default=0, verbose_name="平均新增文章數"),
+                ),
+                (
+                    "fetch_count",
+                    models.IntegerField(default=0, verbose_name="抓取次數"),
+                ),
+                (
+                    "error_count",
+                    models.IntegerField(default=0, verbose_name="連續失敗次數"),
+                ),
+                (
+                    "keyword",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="schedule",
+                        to="modelCore.keyword",
+                        verbose_name="關鍵字",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "關鍵字排程",
+                "verbose_name_plural": "關鍵字排程",
+            },
+        ),
+    ]
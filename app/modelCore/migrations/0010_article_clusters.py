@@ -0,0 +1,54 @@
+# Generated by Django 5.2.18 on 2026-10-18 01:34
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("modelCore", "0009_keyword_schedule"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="newsarticle",
+            name="cluster_id",
+            field=models.BigIntegerField(
+                blank=True, db_index=True, null=True, verbose_name="相同新聞群組"
+            ),
+        ),
+        migrations.AddField(
+            model_name="newsarticle",
+            name="minhash",
+            field=models.BinaryField(blank=True, null=True, verbose_name="內容指紋"),
+        ),
+        migrations.CreateModel(
+            name="ArticleBucket",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("bucket", models.IntegerField(db_index=True, verbose_name="桶")),
+                (
+                    "article",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="lsh_buckets",
+                        to="modelCore.newsarticle",
+                        verbose_name="文章",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "指紋桶",
+                "verbose_name_plural": "指紋桶",
+            },
+        ),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 5.2.18 on 2026-10-18 01:38
+
+from django.db import migrations, models
+
+
+def backfill_canonical_urls(apps, schema_editor):
+    """
+    為既有文章填入標準網址；同一標準網址的多篇文章只有最早的一篇填入
+    """
+    from modelCore.canonical import canonicalize_url
+
+    NewsArticle = apps.get_model("modelCore", "NewsArticle")
+    seen = set()
+    batch = []
+    for article_id, url in (
+        NewsArticle.objects.order_by("id").values_list("id", "url").iterator()
+    ):
+        canonical = canonicalize_url(url)[:500]
+        if canonical in seen:
+            continue
+        seen.add(canonical)
+        batch.append(NewsArticle(id=article_id, canonical_url=canonical))
+        if len(batch) >= 1000:
+            NewsArticle.objects.bulk_update(batch, ["canonical_url"])
+            batch = []
+    if batch:
+        NewsArticle.objects.bulk_update(batch, ["canonical_url"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("modelCore", "0010_article_clusters"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="newsarticle",
+            name="canonical_url",
+            field=models.CharField(
+                blank=True, max_length=500, null=True, verbose_name="標準網址"
+            ),
+        ),
+        migrations.RunPython(backfill_canonical_urls, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="newsarticle",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("canonical_url__isnull", False)),
+                fields=("canonical_url",),
+                name="unique_canonical_url",
+            ),
+        ),
+    ]
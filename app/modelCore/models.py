@@ -1,4 +1,4 @@
-from django.db import models
+from django.db import models, transaction
 from django.contrib.auth.models import (
     AbstractBaseUser,
     BaseUserManager,
@@ -6,40 +6,11 @@ from django.contrib.auth.models import (
 )
 from django.utils import timezone
 from django.db.models import Q
+from .text import clean_text
+from .versions import CORPUS, TAXONOMY, bump_version
 # Create your models here.
 # news_app/models.py
 
-def clean_text(text):
-    """
-    清理文字，移除不必要的符號和空白
-    """
-    if not text:
-        return ""
-    
-    # 如果是列表，取第一個元素
-    if isinstance(text, list):
-        text = text[0] if text else ""
-        
-    # 處理字符串
-    if isinstance(text, str):
-        # 如果文字看起來像列表字符串，嘗試解析它
-        if text.startswith('[') and text.endswith(']'):
-            try:
-                import ast
-                # 安全地解析字符串為Python對象
-                parsed = ast.literal_eval(text)
-                if isinstance(parsed, list) and parsed:
-                    text = parsed[0]
-            except:
-                pass
-        
-        # 移除可能的列表符號和引號
-        text = text.strip('[]\'\"')
-        # 移除額外的空白
-        text = text.strip()
-        
-    return text
-
 class UserManager(BaseUserManager):
     def create_user(self, email, password=None, **extra_fields):
         """Creates and saves a new user"""
@@ -101,7 +72,21 @@ class Industry(models.Model):
 
     def save(self, *args, **kwargs):
         self.name = clean_text(self.name)
+        previous = None
+        if self.pk:
+            previous = Industry.objects.filter(pk=self.pk).values_list('name', flat=True).first()
         super().save(*args, **kwargs)
+        bump_version(TAXONOMY)
+        # 新增或更名時，由背景工作經全文索引為既有文章補建關聯；更名時也移除舊名稱的關聯
+        if previous != self.name:
+            from .backfill import enqueue_backfill
+
+            enqueue_backfill(industry_ids=[self.pk], renamed=previous is not None)
+
+    def delete(self, *args, **kwargs):
+        result = super().delete(*args, **kwargs)
+        bump_version(TAXONOMY)
+        return result
 
     class Meta:
         verbose_name = "產業"
@@ -121,6 +106,9 @@ class Keyword(models.Model):
         related_name='keywords',
         verbose_name="相關產業"
     )
+    # 抓取進度：已看過最新文章的發布時間與網址，下次只抓取更新的文章
+    last_published_at = models.DateTimeField("最後抓取文章時間", null=True, blank=True)
+    last_article_url = models.URLField("最後抓取文章連結", max_length=500, blank=True, default="")
     created_at = models.DateTimeField("建立時間", default=timezone.now)
     updated_at = models.DateTimeField("更新時間", auto_now=True)
 
@@ -143,8 +131,24 @@ class Keyword(models.Model):
                 existing.industry = self.industry
                 existing.save()
             return existing
-            
+
+        previous = None
+        if self.pk:
+            previous = Keyword.objects.filter(pk=self.pk).values_list('keyword', 'industry_id').first()
         super().save(*args, **kwargs)
+        # 字庫已變更，通知比對器重新建立
+        bump_version(TAXONOMY)
+        # 新增、更名或改變所屬產業時，由背景工作只為包含此關鍵字的既有文章補建關聯；
+        # 更名或改變產業時也移除不再符合的關聯
+        if previous != (self.keyword, self.industry_id):
+            from .backfill import enqueue_backfill
+
+            enqueue_backfill(keyword_ids=[self.pk], renamed=previous is not None)
+
+    def delete(self, *args, **kwargs):
+        result = super().delete(*args, **kwargs)
+        bump_version(TAXONOMY)
+        return result
 
     class Meta:
         verbose_name = "關鍵字"
@@ -153,10 +157,15 @@ class Keyword(models.Model):
             models.Index(fields=['keyword']),  # 添加索引以提升查詢效能
         ]
 
+# 變更後需要重新比對產業、關鍵字與相同新聞群組的欄位
+TEXT_FIELDS = {'title', 'description'}
+
 class NewsArticle(models.Model):
     title = models.CharField("標題", max_length=200)
     description = models.TextField("描述", null=True, blank=True)
     url = models.URLField("連結", unique=True)
+    # 移除追蹤參數、行動版前綴等差異後的網址，用來辨識同一篇文章的不同網址
+    canonical_url = models.CharField("標準網址", max_length=500, null=True, blank=True)
     source = models.CharField("來源", max_length=100)
     published_at = models.DateTimeField("發布時間", null=True)
     created_at = models.DateTimeField("建立時間", default=timezone.now)
@@ -174,6 +183,9 @@ class NewsArticle(models.Model):
         related_name='news_articles',
         verbose_name="相關關鍵字"
     )
+    # 近似重複偵測：標題與描述的 MinHash 指紋，以及所屬群組（群組第一篇文章的 id）
+    minhash = models.BinaryField("內容指紋", null=True, blank=True)
+    cluster_id = models.BigIntegerField("相同新聞群組", null=True, blank=True, db_index=True)
 
     def __str__(self):
         return self.title
@@ -181,73 +193,228 @@ class NewsArticle(models.Model):
     class Meta:
         verbose_name = "新聞文章"
         verbose_name_plural = "新聞文章"
-        ordering = ['-published_at']
+        ordering = ['-published_at', '-id']
+        indexes = [
+            # 支援以 (published_at, id) 為鍵的游標分頁
+            models.Index(fields=['-published_at', '-id'], name='newsarticle_published_id_idx'),
+        ]
+        constraints = [
+            # 使用條件式唯一索引，SQLite 不需重建資料表（重建會移除全文索引的觸發器）
+            models.UniqueConstraint(
+                fields=['canonical_url'],
+                condition=Q(canonical_url__isnull=False),
+                name='unique_canonical_url',
+            ),
+        ]
 
     def detect_and_link_industries_keywords(self):
         """
         檢測文章內容中的產業和關鍵字，並建立關聯
         """
-        # 清理文章內容
-        clean_title = clean_text(self.title)
-        clean_description = clean_text(self.description) if self.description else ""
-        
-        # 將標題和描述合併成一個文本進行搜索
-        article_text = f" {clean_title} {clean_description} ".lower()
-        
-        # 獲取所有產業
-        all_industries = Industry.objects.all()
-        relevant_industries = set()
-        
-        # 第一步：找出所有相關的產業
-        for industry in all_industries:
-            clean_industry_name = clean_text(industry.name)
-            print(f'clean_industry_name: {clean_industry_name}')
-            if not clean_industry_name or len(clean_industry_name) < 2:
-                continue
-            
-            # 檢查產業名稱是否出現在文章中（使用完整詞匹配）
-            if f" {clean_industry_name.lower()} " in article_text:
-                relevant_industries.add(industry)
-        
-        # 清除所有不相關的產業關聯
-        for industry in self.industries.all():
-            if industry not in relevant_industries:
-                self.industries.remove(industry)
-        
-        # 添加新發現的相關產業
-        for industry in relevant_industries:
-            if not self.industries.filter(id=industry.id).exists():
-                self.industries.add(industry)
-        
-        # 第二步：處理關鍵字
-        # 先移除所有現有的關鍵字關聯
-        self.keywords.clear()
-        
-        # 只檢查相關產業的關鍵字
-        for industry in relevant_industries:
-            industry_keywords = Keyword.objects.filter(industry=industry)
-            
-            for keyword in industry_keywords:
-                clean_keyword = clean_text(keyword.keyword)
-                print(f'clean_keyword: {clean_keyword}')
-                if not clean_keyword or len(clean_keyword) < 2:
-                    continue
-                
-                # 使用完整詞匹配來檢查關鍵字
-                if f" {clean_keyword.lower()} " in article_text:
-                    self.keywords.add(keyword)
+        from .matcher import get_matcher
+        from .linking import sync_links
+
+        # 以編譯好的比對器一次掃描標題與描述，再以集合差異更新關聯
+        links = get_matcher().match_article(self.title, self.description)
+        sync_links({self.pk: links})
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # 記錄載入時的標題與描述，儲存時只在內容變更後才重新比對
+        instance._loaded_text = instance._text_snapshot()
+        return instance
+
+    def _text_snapshot(self):
+        deferred = self.get_deferred_fields()
+        if 'title' in deferred or 'description' in deferred:
+            return None
+        return (self.title, self.description)
 
     def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        touches_text = update_fields is None or bool(TEXT_FIELDS & set(update_fields))
+
         # 清理文章內容
-        self.title = clean_text(self.title)
-        if self.description:
-            self.description = clean_text(self.description)
+        if touches_text:
+            self.title = clean_text(self.title)
+            if self.description:
+                self.description = clean_text(self.description)
         
         # 檢查是否為新建立的文章
         is_new = self._state.adding
+        text_changed = touches_text and (
+            is_new
+            or getattr(self, '_loaded_text', None) is None
+            or self._loaded_text != (self.title, self.description)
+        )
+        if not self.canonical_url and update_fields is None:
+            from .canonical import canonicalize_url
+
+            # 遷移時保留下來的重複文章沒有標準網址，已被其他文章使用時維持空值
+            canonical_url = canonicalize_url(self.url)[:500]
+            if not NewsArticle.objects.filter(canonical_url=canonical_url).exclude(pk=self.pk).exists():
+                self.canonical_url = canonical_url
         
         # 先保存文章本身
         super().save(*args, **kwargs)
+        self._loaded_text = self._text_snapshot()
+        if is_new:
+            from .bloom import get_url_filter
+
+            url_filter = get_url_filter()
+            if url_filter is not None and self.canonical_url:
+                # 交易回復時不記錄，避免之後誤判為已存在而略過
+                transaction.on_commit(lambda url=self.canonical_url: url_filter.add(url))
         
-        # 執行關鍵字檢測（每次保存都執行，確保關聯始終正確）
-        self.detect_and_link_industries_keywords()
+        # 標題或描述有變更時才重新檢測關鍵字
+        if text_changed:
+            self.detect_and_link_industries_keywords()
+            self.assign_cluster(replace=not is_new)
+        bump_version(CORPUS)
+
+    def assign_cluster(self, replace=True):
+        """
+        重新計算內容指紋並指定相同新聞群組
+        """
+        from .clustering import assign_clusters, minhash
+
+        self.cluster_id = assign_clusters(
+            [(self.pk, self.title, self.description)], replace=replace
+        )[self.pk]
+        self.minhash = minhash(self.title, self.description)
+
+    def delete(self, *args, **kwargs):
+        from .linking import sync_links
+
+        # 先經由 sync_links 移除關聯，讓每日統計一併扣除
+        sync_links({self.pk: (set(), set())})
+        result = super().delete(*args, **kwargs)
+        bump_version(CORPUS)
+        return result
+
+class ArticleBucket(models.Model):
+    """近似重複偵測的 LSH 索引：文章指紋的每一段各佔一列，同一桶內的文章才需要比對"""
+    bucket = models.IntegerField("桶", db_index=True)
+    article = models.ForeignKey(
+        NewsArticle,
+        on_delete=models.CASCADE,
+        related_name='lsh_buckets',
+        verbose_name="文章"
+    )
+
+    class Meta:
+        verbose_name = "指紋桶"
+        verbose_name_plural = "指紋桶"
+
+class IndustryDailyCount(models.Model):
+    """每個產業每天的文章數量（由關聯變更時累加，可用 rebuild_rollups 重建）"""
+    industry = models.ForeignKey(
+        Industry,
+        on_delete=models.CASCADE,
+        related_name='daily_counts',
+        verbose_name="產業"
+    )
+    day = models.DateField("日期")
+    count = models.IntegerField("文章數量", default=0)
+
+    def __str__(self):
+        return f"{self.industry} {self.day}: {self.count}"
+
+    class Meta:
+        verbose_name = "產業每日統計"
+        verbose_name_plural = "產業每日統計"
+        constraints = [
+            models.UniqueConstraint(fields=['industry', 'day'], name='unique_industry_day'),
+        ]
+        indexes = [
+            models.Index(fields=['day']),
+        ]
+
+class KeywordDailyCount(models.Model):
+    """每個關鍵字每天的文章數量（由關聯變更時累加，可用 rebuild_rollups 重建）"""
+    keyword = models.ForeignKey(
+        Keyword,
+        on_delete=models.CASCADE,
+        related_name='daily_counts',
+        verbose_name="關鍵字"
+    )
+    day = models.DateField("日期")
+    count = models.IntegerField("文章數量", default=0)
+
+    def __str__(self):
+        return f"{self.keyword} {self.day}: {self.count}"
+
+    class Meta:
+        verbose_name = "關鍵字每日統計"
+        verbose_name_plural = "關鍵字每日統計"
+        constraints = [
+            models.UniqueConstraint(fields=['keyword', 'day'], name='unique_keyword_day'),
+        ]
+        indexes = [
+            models.Index(fields=['day']),
+        ]
+
+class FetchJob(models.Model):
+    """即時抓取新聞與補建字庫關聯的背景工作，由 run_worker 依序處理"""
+    STATUS_PENDING = 'pending'
+    STATUS_RUNNING = 'running'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, '等待中'),
+        (STATUS_RUNNING, '執行中'),
+        (STATUS_DONE, '完成'),
+        (STATUS_FAILED, '失敗'),
+    ]
+
+    # 相同條件的工作共用同一個鍵，等待中或執行中時不會重複建立
+    dedupe_key = models.CharField("去重鍵", max_length=64)
+    params = models.JSONField("參數", default=dict)
+    status = models.CharField("狀態", max_length=10, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    result = models.JSONField("結果", null=True, blank=True)
+    error = models.TextField("錯誤訊息", blank=True, default="")
+    attempts = models.IntegerField("執行次數", default=0)
+    created_at = models.DateTimeField("建立時間", default=timezone.now)
+    started_at = models.DateTimeField("開始時間", null=True, blank=True)
+    finished_at = models.DateTimeField("完成時間", null=True, blank=True)
+
+    def __str__(self):
+        return f"#{self.id} {self.get_status_display()}"
+
+    class Meta:
+        verbose_name = "抓取工作"
+        verbose_name_plural = "抓取工作"
+        constraints = [
+            models.UniqueConstraint(
+                fields=['dedupe_key'],
+                condition=Q(status__in=['pending', 'running']),
+                name='unique_active_fetch_job',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['status', 'id']),
+        ]
+
+class KeywordSchedule(models.Model):
+    """run_scheduler 使用的關鍵字抓取排程，依每次抓取到的新文章數量調整間隔"""
+    keyword = models.OneToOneField(
+        Keyword,
+        on_delete=models.CASCADE,
+        related_name='schedule',
+        verbose_name="關鍵字"
+    )
+    interval = models.IntegerField("抓取間隔（秒）")
+    next_fetch_at = models.DateTimeField("下次抓取時間", db_index=True)
+    last_fetched_at = models.DateTimeField("上次抓取時間", null=True, blank=True)
+    last_new_articles = models.IntegerField("上次新增文章數", default=0)
+    avg_new_articles = models.FloatField("平均新增文章數", default=0)
+    fetch_count = models.IntegerField("抓取次數", default=0)
+    error_count = models.IntegerField("連續失敗次數", default=0)
+
+    def __str__(self):
+        return f"{self.keyword}：每 {self.interval} 秒"
+
+    class Meta:
+        verbose_name = "關鍵字排程"
+        verbose_name_plural = "關鍵字排程"
@@ -0,0 +1,103 @@
+# modelCore/rollups.py
+
+from collections import Counter
+
+from django.db import connection, transaction
+from django.db.models import Count, F
+from django.db.models.functions import Coalesce, TruncDate
+from django.utils import timezone
+
+from .models import IndustryDailyCount, KeywordDailyCount, NewsArticle
+
+
+def article_day(published_at, created_at=None):
+    """
+    文章歸屬的日期：以發布時間為準，沒有發布時間時使用建立時間（皆以本地時區計算）
+    """
+    moment = published_at or created_at
+    if moment is None:
+        return None
+    if timezone.is_aware(moment):
+        return timezone.localdate(moment)
+    return moment.date()
+
+
+def _upsert(model, target_field, deltas):
+    """
+    以單一 INSERT ... ON CONFLICT 語句累加每日數量。
+    deltas: {(target_id, day): 變化量}
+    """
+    rows = [(target_id, day, delta) for (target_id, day), delta in deltas.items() if delta]
+    if not rows:
+        return
+    table = connection.ops.quote_name(model._meta.db_table)
+    column = connection.ops.quote_name(target_field)
+    sql = (
+        f'INSERT INTO {table} ({column}, day, count) VALUES (%s, %s, %s) '
+        f'ON CONFLICT ({column}, day) DO UPDATE SET count = {table}.count + excluded.count'
+    )
+    with connection.cursor() as cursor:
+        cursor.executemany(sql, rows)
+
+
+def apply_link_changes(industry_changes, keyword_changes):
+    """
+    依關聯的新增與刪除，更新每日統計。
+    industry_changes / keyword_changes: (新增的 (article_id, target_id) 集合, 刪除的集合)
+    """
+    article_ids = {
+        article_id
+        for added, removed in (industry_changes, keyword_changes)
+        for article_id, _ in added | removed
+    }
+    if not article_ids:
+        return
+
+    days = {
+        article_id: article_day(published_at, created_at)
+        for article_id, published_at, created_at in NewsArticle.objects.filter(
+            id__in=article_ids
+        ).values_list('id', 'published_at', 'created_at')
+    }
+
+    def deltas(changes):
+        added, removed = changes
+        counter = Counter()
+        for sign, pairs in ((1, added), (-1, removed)):
+            for article_id, target_id in pairs:
+                day = days.get(article_id)
+                if day is not None:
+                    counter[(target_id, day)] += sign
+        return counter
+
+    with transaction.atomic():
+        _upsert(IndustryDailyCount, 'industry_id', deltas(industry_changes))
+        _upsert(KeywordDailyCount, 'keyword_id', deltas(keyword_changes))
+
+
+def rebuild_rollups(batch_size=1000):
+    """
+    從中介表重新計算所有每日統計，回傳 (產業列數, 關鍵字列數)
+    """
+    day = TruncDate(Coalesce(F('newsarticle__published_at'), F('newsarticle__created_at')))
+    results = []
+    with transaction.atomic():
+        for model, through, target_field in (
+            (IndustryDailyCount, NewsArticle.industries.through, 'industry_id'),
+            (KeywordDailyCount, NewsArticle.keywords.through, 'keyword_id'),
+        ):
+            model.objects.all().delete()
+            rows = (
+                through.objects.annotate(day=day)
+                .values(target_field, 'day')
+                .annotate(count=Count('id'))
+                .order_by()
+            )
+            objects = [
+                model(**{target_field: row[target_field]}, day=row['day'], count=row['count'])
+                for row in rows.iterator()
+                if row['day'] is not None
+            ]
+            model.objects.bulk_create(objects, batch_size=batch_size)
+            results.append(len(objects))
+    return tuple(results)
@@ -0,0 +1,59 @@
+# modelCore/search.py
+
+from django.db import connection
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+# 由 0005 migration 建立的 FTS5 全文索引（trigram 分詞，支援中文子字串搜尋）
+FTS_TABLE = 'modelCore_newsarticle_fts'
+
+# trigram 分詞至少需要三個字元才能使用索引
+MIN_FTS_TERM_LENGTH = 3
+
+_fts_available = None
+
+
+def fts_available():
+    """
+    目前的資料庫是否為 SQLite 且已建立 FTS5 全文索引
+    """
+    global _fts_available
+    if _fts_available is None:
+        _fts_available = (
+            connection.vendor == 'sqlite'
+            and FTS_TABLE in connection.introspection.table_names()
+        )
+    return _fts_available
+
+
+def match_expression(terms):
+    """
+    將多個詞組成 FTS5 的 MATCH 運算式，每個詞以片語形式比對
+    """
+    return ' OR '.join('"' + term.replace('"', '""') + '"' for term in terms)
+
+
+def text_search_q(terms):
+    """
+    回傳「標題或描述包含任一個詞」的 Q 物件。
+    在 SQLite 上，長度足夠的詞走 FTS5 索引；
+    太短的詞與其他資料庫則退回 icontains
+    """
+    terms = [term for term in terms if term]
+    if not terms:
+        return Q()
+
+    q = Q()
+    like_terms = terms
+    if fts_available():
+        fts_terms = [term for term in terms if len(term) >= MIN_FTS_TERM_LENGTH]
+        like_terms = [term for term in terms if len(term) < MIN_FTS_TERM_LENGTH]
+        if fts_terms:
+            q |= Q(id__in=RawSQL(
+                f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s',
+                (match_expression(fts_terms),),
+            ))
+
+    for term in like_terms:
+        q |= Q(title__icontains=term) | Q(description__icontains=term)
+    return q
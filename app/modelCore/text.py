@@ -0,0 +1,119 @@
+# modelCore/text.py
+
+import ast
+import re
+import unicodedata
+from functools import lru_cache
+
+# 預先編譯的規則
+_WHITESPACE = re.compile(r'\s+')
+_SEPARATORS = re.compile(r'[-_]+')
+# 字串前後可能殘留的列表符號與引號
+_WRAPPER_CHARS = '[]\'"'
+
+# 不超過此長度的字串（產業名稱、關鍵字、查詢字串）走有快取的路徑
+MEMO_MAX_LENGTH = 64
+MEMO_SIZE = 8192
+
+
+def fold(text):
+    """
+    NFKC 正規化：全形英數字與符號轉為半形、相容字元轉為標準字元。
+    純 ASCII 或已正規化的字串（例如資料庫中已清理過的內容）只需快速檢查
+    """
+    if text.isascii() or unicodedata.is_normalized('NFKC', text):
+        return text
+    return unicodedata.normalize('NFKC', text)
+
+
+def _unwrap(text):
+    """
+    處理資料來源把列表存成字串的情況，例如 "['標題']"，取出第一個元素
+    """
+    if text.startswith('[') and text.endswith(']'):
+        try:
+            parsed = ast.literal_eval(text)
+        except (ValueError, TypeError, SyntaxError, MemoryError, RecursionError):
+            parsed = None
+        if isinstance(parsed, list) and parsed and isinstance(parsed[0], str):
+            text = parsed[0]
+    return text
+
+
+def _clean(text):
+    if not text:
+        return ''
+    # 如果是列表，取第一個元素
+    if isinstance(text, list):
+        text = text[0] if text else ''
+    if not isinstance(text, str):
+        return text
+    text = fold(text)
+    text = _unwrap(text).strip(_WRAPPER_CHARS).strip()
+    if '  ' in text or not text.isprintable():
+        text = _WHITESPACE.sub(' ', text)
+    return text
+
+
+def _term(text):
+    text = _clean(text)
+    if not isinstance(text, str):
+        return text
+    if '-' in text or '_' in text:
+        text = _SEPARATORS.sub(' ', text)
+        text = _WHITESPACE.sub(' ', text).strip()
+    # 太短或不含任何文字與數字的詞視為無效
+    if len(text) < 2 or not any(c.isalnum() for c in text):
+        return ''
+    return text
+
+
+_clean_cached = lru_cache(maxsize=MEMO_SIZE)(_clean)
+_term_cached = lru_cache(maxsize=MEMO_SIZE)(_term)
+
+
+def clean_text(text):
+    """
+    清理文章標題、描述與字庫名稱：取出列表字串中的內容、NFKC 正規化、
+    移除前後的列表符號與引號，並將連續空白合併為一個空格
+    """
+    if isinstance(text, str) and len(text) <= MEMO_MAX_LENGTH:
+        return _clean_cached(text)
+    return _clean(text)
+
+
+def clean_term(text):
+    """
+    清理使用者輸入的產業名稱、關鍵字與查詢字串：在 clean_text 之外，
+    將連字號與底線換成空格；少於兩個字元或不含文字與數字時回傳空字串
+    """
+    if isinstance(text, str) and len(text) <= MEMO_MAX_LENGTH:
+        return _term_cached(text)
+    return _term(text)
+
+
+def _many(single, texts):
+    """
+    批次正規化：相同的字串只處理一次（同一批文章常重複出現相同的描述或來源名稱），
+    短字串沿用快取
+    """
+    texts = list(texts)
+    results = {}
+    for text in texts:
+        if isinstance(text, str) and text not in results:
+            results[text] = single(text)
+    return [results[text] if isinstance(text, str) else single(text) for text in texts]
+
+
+def clean_texts(texts):
+    """
+    批次版本的 clean_text，回傳與輸入順序相同的列表
+    """
+    return _many(clean_text, texts)
+
+
+def clean_terms(texts):
+    """
+    批次版本的 clean_term，回傳與輸入順序相同的列表
+    """
+    return _many(clean_term, texts)
@@ -0,0 +1,39 @@
+# modelCore/versions.py
+
+import time
+from django.core.cache import cache
+
+# 產業/關鍵字字庫版本：Industry 或 Keyword 儲存時遞增
+TAXONOMY = 'taxonomy'
+# 文章資料版本：新增、修改、刪除文章或變更文章關聯時遞增
+CORPUS = 'corpus'
+
+
+def _cache_key(name):
+    return f'modelCore:version:{name}'
+
+
+def get_version(name):
+    """
+    取得指定名稱的版本號。
+    版本號存放在共用的 cache 中，讓所有 worker 行程看到同一個值；
+    若 cache 中不存在（例如被清除），以目前時間建立新的版本號，
+    使各行程的本地快取一律視為過期。
+    """
+    return cache.get_or_set(_cache_key(name), time.time_ns, None)
+
+
+def bump_version(name):
+    """
+    遞增指定名稱的版本號，使依賴此版本的本地快取失效
+    """
+    key = _cache_key(name)
+    try:
+        value = cache.incr(key)
+    except ValueError:
+        value = time.time_ns()
+        cache.set(key, value, None)
+        return value
+    # incr() 以預設的 TIMEOUT 寫回，需改回永不過期，否則版本號過期後所有本地快取會一起重建
+    cache.touch(key, None)
+    return value
@@ -0,0 +1,273 @@
+# web/archive.py
+
+import codecs
+import gzip
+import json
+import os
+import re
+
+from .ingest import ingest_articles
+
+# 每次讀取的位元組數；記憶體用量約為此大小加上單一篇文章（或單一回應）的大小
+CHUNK_SIZE = 1 << 20
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+_GZIP_MAGIC = b'\x1f\x8b'
+
+
+def open_archive(path):
+    """
+    以二進位模式開啟檔案，gzip 壓縮檔依檔頭自動解壓縮
+    """
+    with open(path, 'rb') as handle:
+        magic = handle.read(2)
+    if magic == _GZIP_MAGIC:
+        return gzip.open(path, 'rb')
+    return open(path, 'rb')
+
+
+class ArchiveReader:
+    """
+    逐筆讀取 NewsAPI 文章的串流 JSON 解析器，不會把整個檔案載入記憶體。支援：
+    - NDJSON：每行一篇文章或一個 NewsAPI 回應（{"articles": [...]}）
+    - JSON 陣列：元素為文章或回應
+    - 單一（可能非常大的）回應物件：逐一讀取 "articles" 陣列中的文章
+
+    每篇文章附帶位置 (state, offset, index)：所在的解析狀態、所屬 JSON 值在解壓縮後的位元組位置，
+    以及它是該值中的第幾篇，可用來從中斷處繼續讀取
+    """
+
+    def __init__(self, handle, offset=0):
+        self.handle = handle
+        self._decoder = codecs.getincrementaldecoder('utf-8')()
+        self._json = json.JSONDecoder()
+        self.buffer = ''
+        self.pos = 0
+        self.eof = False
+        # buffer[_mark_char] 對應的位元組位置，用來換算字元與位元組位置
+        self._mark_char = 0
+        self._mark_byte = offset
+
+    def byte_offset(self, pos=None):
+        pos = self.pos if pos is None else pos
+        self._mark_byte += len(self.buffer[self._mark_char:pos].encode('utf-8'))
+        self._mark_char = pos
+        return self._mark_byte
+
+    def _fill(self):
+        """
+        捨棄已解析的部分並讀入下一段；已到檔尾時回傳 False
+        """
+        if self.eof:
+            return False
+        self.byte_offset()
+        self.buffer = self.buffer[self.pos:]
+        self.pos = self._mark_char = 0
+        chunk = self.handle.read(CHUNK_SIZE)
+        if not chunk:
+            self.buffer += self._decoder.decode(b'', final=True)
+            self.eof = True
+            return False
+        self.buffer += self._decoder.decode(chunk)
+        return True
+
+    def _peek(self):
+        """
+        略過空白並回傳下一個字元；檔案結束時回傳空字串
+        """
+        while True:
+            self.pos = _WHITESPACE.match(self.buffer, self.pos).end()
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self._fill():
+                return ''
+
+    def _expect(self, chars):
+        char = self._peek()
+        if not char or char not in chars:
+            raise ValueError(
+                f"位置 {self.byte_offset()} 預期為 {' 或 '.join(chars)}，實際為 {char or '檔案結尾'}"
+            )
+        self.pos += 1
+        return char
+
+    def _decode(self):
+        """
+        解碼目前位置的一個 JSON 值，回傳 (值, 起始位元組位置)
+        """
+        self._peek()
+        start = self.byte_offset()
+        while True:
+            try:
+                value, end = self._json.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            else:
+                # 值剛好在緩衝區結尾結束時（例如數字）可能還沒讀完，需再讀一段確認
+                if end < len(self.buffer) or self.eof:
+                    self.pos = end
+                    return value, start
+            self._fill()
+
+    def _expand(self, value, state, start, skip):
+        if isinstance(value, dict) and isinstance(value.get('articles'), list):
+            items = value['articles']
+        elif isinstance(value, list):
+            items = value
+        else:
+            items = [value]
+        for index in range(skip, len(items)):
+            yield items[index], (state, start, index)
+
+    def _array(self, state, skip=0, resume=False):
+        """
+        讀取陣列元素（已讀過 "["；resume 時目前位置為某個元素的開頭）
+        """
+        if not resume and self._peek() == ']':
+            self.pos += 1
+            return
+        while True:
+            value, start = self._decode()
+            yield from self._expand(value, state, start, skip)
+            skip = 0
+            if self._expect(',]') == ']':
+                return
+
+    def _object(self, start, skip=0, resume=False):
+        """
+        逐一讀取物件成員（已讀過 "{"）。"articles" 陣列以串流方式讀取；
+        沒有 "articles" 的物件視為單篇文章
+        """
+        members = {}
+        has_articles = resume
+        if resume:
+            yield from self._array('articles', skip, resume=True)
+        else:
+            if self._peek() == '}':
+                self.pos += 1
+                yield members, ('top', start, 0)
+                return
+
+        first = not resume
+        while first or self._expect(',}') == ',':
+            first = False
+            key, _ = self._decode()
+            self._expect(':')
+            if key == 'articles' and self._peek() == '[':
+                self.pos += 1
+                has_articles = True
+                yield from self._array('articles')
+            else:
+                members[key], _ = self._decode()
+
+        if not has_articles and skip == 0:
+            yield members, ('top', start, 0)
+
+    def articles(self, state='top', skip=0):
+        """
+        依序產生 (文章, 位置)。state 與 skip 用於從檢查點繼續：
+        目前位置為該狀態下某個 JSON 值的開頭，並略過該值的前 skip 篇文章
+        """
+        if state == 'array':
+            yield from self._array('array', skip, resume=True)
+            skip = 0
+        elif state == 'articles':
+            yield from self._object(None, skip, resume=True)
+            skip = 0
+
+        while True:
+            char = self._peek()
+            if not char:
+                return
+            if char == '[':
+                self.pos += 1
+                yield from self._array('array')
+            elif char == '{':
+                start = self.byte_offset()
+                self.pos += 1
+                yield from self._object(start, skip)
+            else:
+                value, start = self._decode()
+                yield from self._expand(value, 'top', start, skip)
+            skip = 0
+
+
+def _file_identity(path):
+    stat = os.stat(path)
+    return {'size': stat.st_size, 'mtime': int(stat.st_mtime)}
+
+
+def _load_checkpoint(path):
+    try:
+        with open(path, encoding='utf-8') as handle:
+            return json.load(handle)
+    except (OSError, ValueError):
+        return None
+
+
+def _save_checkpoint(path, checkpoint):
+    temp_path = f'{path}.tmp'
+    with open(temp_path, 'w', encoding='utf-8') as handle:
+        json.dump(checkpoint, handle)
+    os.replace(temp_path, path)
+
+
+def import_archive(path, batch_size=500, restart=False, log=None):
+    """
+    以固定大小的批次將檔案中的文章寫入資料庫（與 save_articles 相同的正規化、去重與關聯），
+    每批完成後把進度寫入 <path>.checkpoint；中斷後再次執行會從檢查點繼續。
+    檔案內容改變或 restart=True 時從頭開始。回傳累計的統計數字
+    """
+    log = log or (lambda message: None)
+    checkpoint_path = f'{path}.checkpoint'
+    identity = _file_identity(path)
+    checkpoint = None if restart else _load_checkpoint(checkpoint_path)
+    if checkpoint and checkpoint.get('file') != identity:
+        log("檔案已變更，忽略先前的檢查點")
+        checkpoint = None
+    if checkpoint and checkpoint.get('completed'):
+        log("此檔案已匯入完成，如需重新匯入請使用 --restart")
+        return checkpoint['totals']
+
+    totals = {'records': 0, 'created': 0, 'duplicates': 0, 'filtered': 0, 'invalid': 0}
+    state, offset, skip = 'top', 0, 0
+    if checkpoint:
+        totals = checkpoint['totals']
+        state, offset, skip = checkpoint['state'], checkpoint['offset'], checkpoint['skip']
+        log(f"從檢查點繼續：已處理 {totals['records']} 篇，位置 {offset}")
+
+    def flush(batch, position):
+        articles = [article for article in batch if isinstance(article, dict)]
+        stats = ingest_articles(articles)
+        totals['records'] += len(batch)
+        totals['invalid'] += len(batch) - len(articles) + stats['invalid']
+        for key in ('created', 'duplicates', 'filtered'):
+            totals[key] += stats[key]
+        _save_checkpoint(checkpoint_path, {
+            'file': identity,
+            'state': position[0],
+            'offset': position[1],
+            'skip': position[2] + 1,
+            'totals': totals,
+        })
+        log(
+            f"已處理 {totals['records']} 篇（新增 {totals['created']}，"
+            f"重複 {totals['duplicates']}，無效 {totals['invalid']}），位置 {position[1]}"
+        )
+
+    with open_archive(path) as handle:
+        if offset:
+            handle.seek(offset)
+        reader = ArchiveReader(handle, offset)
+        batch = []
+        position = None
+        for article, position in reader.articles(state, skip):
+            batch.append(article)
+            if len(batch) >= batch_size:
+                flush(batch, position)
+                batch = []
+        if batch:
+            flush(batch, position)
+
+    _save_checkpoint(checkpoint_path, {'file': identity, 'completed': True, 'totals': totals})
+    return totals
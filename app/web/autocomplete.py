@@ -0,0 +1,164 @@
+# web/autocomplete.py
+
+import threading
+from bisect import bisect_left, bisect_right
+
+from modelCore.text import clean_terms
+from modelCore.versions import TAXONOMY, get_version
+
+# 前端 select2 的提示文字，不應出現在建議列表中
+EXCLUDED_TERMS = {'選擇或輸入關鍵字...', '選擇或輸入產業類別...'}
+
+# 分隔各詞的字元，不會出現在已清理的詞中
+_SEPARATOR = '\n'
+
+
+class _TermList:
+    """
+    已排序的詞列表，支援前綴（二分搜尋）與子字串（在串接字串上以 str.find 掃描）查詢
+    """
+
+    def __init__(self, terms):
+        self.terms = sorted(set(terms), key=lambda t: (t.lower(), t))
+        self.lowered = [t.lower() for t in self.terms]
+        self._haystack = _SEPARATOR.join(self.lowered)
+        # 每個詞在串接字串中的起始位置
+        self._offsets = []
+        position = 0
+        for term in self.lowered:
+            self._offsets.append(position)
+            position += len(term) + 1
+
+    def __len__(self):
+        return len(self.terms)
+
+    def __contains__(self, term):
+        """不分大小寫判斷詞是否存在"""
+        term = term.lower()
+        index = bisect_left(self.lowered, term)
+        return index < len(self.lowered) and self.lowered[index] == term
+
+    def search(self, query, limit, exclude=()):
+        """
+        回傳最多 limit 個符合的詞：前綴符合的排前面，其次為包含查詢字串的詞
+        """
+        query = query.lower()
+        if not query:
+            return [t for t in self.terms if t not in exclude][:limit]
+
+        results = []
+        seen = set()
+        start = bisect_left(self.lowered, query)
+        end = bisect_right(self.lowered, query + '\U0010ffff')
+        for index in range(start, end):
+            term = self.terms[index]
+            if term not in exclude:
+                results.append(term)
+                seen.add(index)
+                if len(results) >= limit:
+                    return results
+
+        position = self._haystack.find(query)
+        while position != -1:
+            index = bisect_right(self._offsets, position) - 1
+            if index not in seen and self.terms[index] not in exclude:
+                seen.add(index)
+                results.append(self.terms[index])
+                if len(results) >= limit:
+                    break
+            # 跳到下一個詞，同一個詞只比對一次
+            next_index = index + 1
+            if next_index >= len(self._offsets):
+                break
+            position = self._haystack.find(query, self._offsets[next_index])
+        return results
+
+
+class AutocompleteIndex:
+    """
+    產業與關鍵字的記憶體內建議索引，查詢時不需存取資料庫
+    """
+
+    def __init__(self, industries, keywords):
+        """
+        industries: [產業名稱, ...]
+        keywords: [(關鍵字, 產業名稱或 None), ...]
+        """
+        self.industries = _TermList(industries)
+        self.keywords = _TermList(k for k, _ in keywords)
+        grouped = {}
+        for keyword, industry in keywords:
+            if industry:
+                grouped.setdefault(industry.lower(), []).append(keyword)
+        self.industry_keywords = {name: _TermList(terms) for name, terms in grouped.items()}
+
+    def has_industry(self, name):
+        return name in self.industries
+
+    def has_keyword(self, keyword):
+        return keyword in self.keywords
+
+    def search_industries(self, query, limit=10):
+        return self.industries.search(query, limit)
+
+    def search_keywords(self, query, industry=None, limit=10):
+        """
+        指定產業時，該產業的關鍵字優先顯示，再補上其他關鍵字
+        """
+        group = self.industry_keywords.get((industry or '').lower())
+        if group is None:
+            return self.keywords.search(query, limit)
+
+        results = group.search(query, limit)
+        if len(results) < limit:
+            results += self.keywords.search(query, limit - len(results), exclude=set(results))
+        return results
+
+    @classmethod
+    def from_database(cls):
+        from modelCore.models import Industry, Keyword
+
+        names = [
+            name for name in Industry.objects.values_list('name', flat=True)
+            if name and name not in EXCLUDED_TERMS
+        ]
+        industries = [name for name, cleaned in zip(names, clean_terms(names)) if cleaned]
+
+        rows = [
+            (keyword, industry)
+            for keyword, industry in Keyword.objects.values_list('keyword', 'industry__name')
+            if keyword and keyword not in EXCLUDED_TERMS
+        ]
+        keywords = [
+            row for row, cleaned in zip(rows, clean_terms(keyword for keyword, _ in rows)) if cleaned
+        ]
+        return cls(industries, keywords)
+
+
+_lock = threading.Lock()
+_index = None
+_index_version = None
+
+
+def get_index():
+    """
+    取得行程內共用的建議索引；字庫版本改變時才重新建立
+    """
+    global _index, _index_version
+
+    version = get_version(TAXONOMY)
+    if _index is not None and _index_version == version:
+        return _index
+
+    with _lock:
+        if _index is None or _index_version != version:
+            _index = AutocompleteIndex.from_database()
+            _index_version = version
+    return _index
+
+
+def warm_index():
+    """
+    在啟動時預先建立索引，讓第一個請求不需等待
+    """
+    return get_index()
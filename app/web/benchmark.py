@@ -0,0 +1,167 @@
+# web/benchmark.py
+
+import json
+import math
+import random
+import threading
+from datetime import timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from django.utils import timezone
+
+# 產生名稱用的字元與詞根
+CJK_CHARS = (
+    '科技金融能源醫療電動車半導體晶片雲端零售物流航運電信生技製藥綠能儲能面板光電鋼鐵'
+    '石化紡織食品觀光營建保險證券銀行支付遊戲影音教育農業水泥汽車機器人無人機資安軟硬網通'
+)
+LATIN_ROOTS = (
+    'tech', 'fin', 'cloud', 'data', 'bio', 'nano', 'quant', 'robo', 'grid', 'chip',
+    'net', 'soft', 'ware', 'med', 'pay', 'auto', 'solar', 'wave', 'link', 'core',
+)
+CJK_FILLER = (
+    '市場', '營收', '成長', '公布', '最新', '財報', '投資', '布局', '發表', '合作',
+    '需求', '供應鏈', '政策', '法說會', '展望', '今年', '第三季', '創新高', '下滑', '擴產',
+)
+LATIN_FILLER = (
+    'market', 'shares', 'rally', 'outlook', 'report', 'growth', 'deal', 'launch',
+    'quarter', 'demand', 'supply', 'chain', 'policy', 'record', 'plans', 'update',
+)
+SOURCES = ('經濟日報', '工商時報', 'Reuters', 'Bloomberg', '中央社', 'TechNews', 'CNBC', '自由時報')
+
+
+def percentile(values, fraction):
+    """
+    最近排名法的百分位數；values 需已排序
+    """
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, max(0, math.ceil(fraction * len(values)) - 1))]
+
+
+class SyntheticCorpus:
+    """
+    以固定的亂數種子產生產業、關鍵字（中英混合）與 NewsAPI 格式的文章，
+    相同的種子與數量每次產生相同的內容
+    """
+
+    def __init__(self, seed=0, industries=20, keywords=400, articles=5000, days=90):
+        self.seed = seed
+        self.rng = random.Random(seed)
+        self.days = days
+        self.now = timezone.now().replace(minute=0, second=0, microsecond=0)
+        self.industries = self._names(industries, set())
+        used = {name.lower() for name in self.industries}
+        names = self._names(keywords, used)
+        # 關鍵字平均分配到各產業
+        self.keywords = [(name, self.industries[i % len(self.industries)]) for i, name in enumerate(names)]
+        self.industry_keywords = {}
+        for keyword, industry in self.keywords:
+            self.industry_keywords.setdefault(industry, []).append(keyword)
+        self.article_count = articles
+        self._next_index = articles
+        self._lock = threading.Lock()
+
+    def _name(self):
+        rng = self.rng
+        if rng.random() < 0.6:
+            return ''.join(rng.choice(CJK_CHARS) for _ in range(rng.randint(2, 4)))
+        if rng.random() < 0.3:
+            return ''.join(rng.choice('ABCDEFGHIJKLMNOPQRSTUVWXYZ') for _ in range(rng.randint(2, 4)))
+        return ''.join(rng.choice(LATIN_ROOTS) for _ in range(2)).capitalize()
+
+    def _names(self, count, used):
+        names = []
+        while len(names) < count:
+            name = self._name()
+            if name.lower() not in used:
+                used.add(name.lower())
+                names.append(name)
+        return names
+
+    def article(self, index):
+        """
+        第 index 篇文章（NewsAPI 格式）；同一個 index 永遠得到相同內容
+        """
+        rng = random.Random(f'{self.seed}:{index}')
+        parts = [rng.choice(CJK_FILLER + LATIN_FILLER) for _ in range(rng.randint(3, 6))]
+        description = [rng.choice(CJK_FILLER + LATIN_FILLER) for _ in range(rng.randint(8, 20))]
+        # 八成的文章提到某個產業與其中幾個關鍵字
+        if rng.random() < 0.8:
+            industry = rng.choice(self.industries)
+            keywords = self.industry_keywords.get(industry) or [industry]
+            parts.insert(0, industry)
+            for keyword in rng.sample(keywords, min(len(keywords), rng.randint(1, 3))):
+                parts.insert(rng.randint(1, len(parts)), keyword)
+            description.insert(rng.randint(0, len(description)), rng.choice(keywords))
+        published_at = self.now - timedelta(seconds=rng.randint(0, self.days * 86400))
+        return {
+            'url': f'https://bench.example/{self.seed}/{index}?utm_source=bench',
+            'title': ' '.join(parts)[:200],
+            'description': ' '.join(description),
+            'source': {'name': rng.choice(SOURCES)},
+            'publishedAt': published_at.strftime('%Y-%m-%dT%H:%M:%SZ'),
+        }
+
+    def articles(self, start=0, stop=None):
+        return [self.article(index) for index in range(start, self.article_count if stop is None else stop)]
+
+    def new_batch(self, size, duplicate_ratio=0.2):
+        """
+        一批新文章，其中約 duplicate_ratio 比例為已產生過的文章（模擬重複抓取）
+        """
+        with self._lock:
+            batch = []
+            for _ in range(size):
+                if self._next_index and self.rng.random() < duplicate_ratio:
+                    batch.append(self.article(self.rng.randrange(self._next_index)))
+                else:
+                    batch.append(self.article(self._next_index))
+                    self._next_index += 1
+            return batch
+
+
+class StubNewsAPI:
+    """
+    在本機背景執行緒中提供 NewsAPI 格式回應的 HTTP 伺服器，讓效能測試不需連線外部服務
+    """
+
+    def __init__(self, corpus, duplicate_ratio=0.2):
+        corpus_ref = corpus
+        # 收到的查詢字串（q 參數），依收到的順序
+        self.queries = []
+        queries = self.queries
+        lock = threading.Lock()
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                params = parse_qs(urlparse(self.path).query)
+                with lock:
+                    queries.extend(params.get('q') or [''])
+                size = int((params.get('pageSize') or ['20'])[0])
+                articles = corpus_ref.new_batch(size, duplicate_ratio)
+                body = json.dumps(
+                    {'status': 'ok', 'totalResults': len(articles), 'articles': articles}
+                ).encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f'http://127.0.0.1:{self.server.server_address[1]}/'
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.server.shutdown()
+        self.server.server_close()
@@ -1,5 +1,49 @@
+from datetime import timedelta
 from django import forms
-from modelCore.models import Industry, Keyword
+from django.core.cache import cache
+from django.db.models import Sum
+from django.utils import timezone
+from modelCore.models import Industry, Keyword, IndustryDailyCount, KeywordDailyCount
+from modelCore.versions import TAXONOMY, get_version
+
+# 表單中預先輸出的常用產業與關鍵字數量
+POPULAR_CHOICES_LIMIT = 20
+# 常用選項依最近幾天的文章數量排序
+POPULAR_CHOICES_DAYS = 30
+
+def get_popular_choices(limit=POPULAR_CHOICES_LIMIT):
+    """
+    回傳 (常用產業名稱列表, 常用關鍵字列表)。
+    依每日統計中最近的文章數量排序，不足時以名稱排序補齊；
+    結果以字庫版本為鍵存入快取，字庫變更時自動重新計算
+    """
+    key = f'web:popular_choices:{get_version(TAXONOMY)}:{limit}'
+    choices = cache.get(key)
+    if choices is not None:
+        return choices
+
+    since = timezone.localdate() - timedelta(days=POPULAR_CHOICES_DAYS)
+    industries = list(
+        IndustryDailyCount.objects.filter(day__gte=since)
+        .values('industry__name').annotate(total=Sum('count'))
+        .order_by('-total').values_list('industry__name', flat=True)[:limit]
+    )
+    if len(industries) < limit:
+        industries += Industry.objects.exclude(name__in=industries).order_by('name').values_list(
+            'name', flat=True)[:limit - len(industries)]
+
+    keywords = list(
+        KeywordDailyCount.objects.filter(day__gte=since)
+        .values('keyword__keyword').annotate(total=Sum('count'))
+        .order_by('-total').values_list('keyword__keyword', flat=True)[:limit]
+    )
+    if len(keywords) < limit:
+        keywords += Keyword.objects.exclude(keyword__in=keywords).order_by('keyword').values_list(
+            'keyword', flat=True)[:limit - len(keywords)]
+
+    choices = (industries, keywords)
+    cache.set(key, choices, 60 * 60)
+    return choices
 
 class FilterForm(forms.Form):
     TIME_RANGES = [
@@ -45,24 +89,52 @@ class FilterForm(forms.Form):
         help_text='勾選此項可立即從網路獲取最新新聞',
         widget=forms.CheckboxInput(attrs={'class': 'form-check-input'})
     )
+
+    collapse = forms.BooleanField(
+        required=False,
+        initial=False,
+        label='合併相同新聞',
+        help_text='不同來源轉載的同一則新聞只顯示一篇',
+        widget=forms.CheckboxInput(attrs={'class': 'form-check-input'})
+    )
     
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        # 設置初始選項
+        # 只輸出目前選取的值與常用的前 N 個選項，其餘由 select2 透過 AJAX 查詢
+        popular_industries, popular_keywords = get_popular_choices()
+        selected_industry, selected_keywords = self._selected_values()
+
+        industries = list(popular_industries)
+        if selected_industry and selected_industry not in industries:
+            industries.insert(0, selected_industry)
+        keywords = list(popular_keywords)
+        for keyword in reversed(selected_keywords):
+            if keyword not in keywords:
+                keywords.insert(0, keyword)
+
         self.fields['industry'].widget.choices = [('', '選擇或輸入產業類別...')] + [
-            (i.name, i.name) for i in Industry.objects.all()
+            (name, name) for name in industries
         ]
         self.fields['keywords'].widget.choices = [('', '選擇或輸入關鍵字...')] + [
-            (k.keyword, k.keyword) for k in Keyword.objects.all()
+            (keyword, keyword) for keyword in keywords
         ]
+
+    def _selected_values(self):
+        """取得表單送出的產業與關鍵字，讓已選取的值能正確顯示"""
+        if not self.is_bound:
+            return '', []
+        industry = self.data.get('industry') or ''
+        if hasattr(self.data, 'getlist'):
+            keywords = self.data.getlist('keywords')
+        else:
+            keywords = self.data.get('keywords') or []
+            if isinstance(keywords, str):
+                keywords = [keywords]
+        return industry, [k for k in keywords if k]
     
     def clean_industry(self):
-        """處理產業輸入"""
-        industry = self.cleaned_data.get('industry', '')
-        if industry:
-            # 如果輸入的產業不存在，則創建新的產業
-            Industry.objects.get_or_create(name=industry)
-        return industry
+        """處理產業輸入（驗證時不寫入資料庫，新產業由 views 記錄後批次建立）"""
+        return self.cleaned_data.get('industry', '')
 
     def clean_keywords(self):
         """處理關鍵字輸入"""
@@ -72,11 +144,6 @@ class FilterForm(forms.Form):
             keywords = [k.strip() for k in keywords.split(',') if k.strip()]
         elif isinstance(keywords, list):
             keywords = [k.strip() for k in keywords if k.strip()]
-        
-        # 為每個關鍵字創建記錄（如果不存在）
-        for keyword in keywords:
-            Keyword.objects.get_or_create(keyword=keyword)
-        
         return keywords
     
     def clean(self):
@@ -0,0 +1,175 @@
+# web/ingest.py
+
+import time
+from datetime import datetime
+
+from django.db import transaction
+
+from modelCore.bloom import get_url_filter
+from modelCore.canonical import canonicalize_url
+from modelCore.models import NewsArticle
+from modelCore.clustering import assign_clusters
+from modelCore.matcher import get_matcher
+from modelCore.linking import sync_links
+from modelCore.text import clean_text
+from modelCore.versions import CORPUS, bump_version
+
+from . import metrics
+
+
+def parse_published_at(value):
+    """
+    解析 NewsAPI 的 publishedAt（ISO 8601），失敗時回傳 None
+    """
+    try:
+        return datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except Exception:
+        return None
+
+
+def normalize_article(article):
+    """
+    將一筆 NewsAPI 結果轉換為 NewsArticle 欄位，清理方式與 NewsArticle.save 相同。
+    沒有網址的結果回傳 None
+    """
+    url = article.get('url')
+    if not url:
+        return None
+
+    description = article.get('description') or ''
+    return {
+        'url': url,
+        'canonical_url': canonicalize_url(url)[:500],
+        'title': clean_text(article.get('title') or ''),
+        'description': clean_text(description) if description else description,
+        'source': (article.get('source') or {}).get('name') or '',
+        'published_at': parse_published_at(article.get('publishedAt')),
+    }
+
+
+def _keyword_links(keywords):
+    """
+    回傳 Keyword 列表對應的 (產業 id 集合, 關鍵字 id 集合)
+    """
+    industry_ids = set()
+    keyword_ids = set()
+    for keyword in keywords or []:
+        keyword_ids.add(keyword.id)
+        if keyword.industry_id:
+            industry_ids.add(keyword.industry_id)
+    return industry_ids, keyword_ids
+
+
+def _ingest_articles(articles, keywords=None, keywords_by_url=None):
+    """
+    以固定數量的查詢批次儲存一批 NewsAPI 結果：
+    先以標準網址的 Bloom filter 略過已知文章（不查詢資料庫），
+    再一次查詢既有網址、bulk_create 新文章、在記憶體中比對產業與關鍵字，
+    最後以每個中介表一次 bulk_create 寫入關聯。
+
+    keywords: 觸發此次抓取的 Keyword 列表，新文章會額外關聯到這些關鍵字及其產業
+    keywords_by_url: {url: [Keyword, ...]}，只額外關聯到個別文章的關鍵字
+    回傳此批次的統計數字
+    """
+    stats = {
+        'received': len(articles),
+        'invalid': 0,
+        'duplicates': 0,
+        'filtered': 0,
+        'created': 0,
+        'industry_links': 0,
+        'keyword_links': 0,
+        'created_articles': [],
+        'created_urls': set(),
+    }
+
+    # 正規化整批資料，同一批內標準網址重複的只保留第一筆
+    url_filter = get_url_filter()
+    rows = {}
+    for article in articles:
+        row = normalize_article(article)
+        if row is None:
+            stats['invalid'] += 1
+        elif row['canonical_url'] in rows:
+            stats['duplicates'] += 1
+        elif url_filter is not None and row['canonical_url'] in url_filter:
+            # 已知的文章直接略過；誤判的機率由 NEWS_URL_FILTER['ERROR_RATE'] 控制
+            stats['duplicates'] += 1
+            stats['filtered'] += 1
+        else:
+            rows[row['canonical_url']] = row
+
+    if not rows:
+        return stats
+
+    existing = set(
+        NewsArticle.objects.filter(canonical_url__in=list(rows)).values_list('canonical_url', flat=True)
+    )
+    stats['duplicates'] += len(existing)
+    new_rows = [row for canonical_url, row in rows.items() if canonical_url not in existing]
+    if url_filter is not None:
+        # 資料庫中已有但尚未記錄的網址（例如過濾器重建前的文章），下次即可直接略過
+        url_filter.update(existing)
+    if not new_rows:
+        return stats
+
+    with transaction.atomic():
+        NewsArticle.objects.bulk_create(
+            [NewsArticle(**row) for row in new_rows],
+            batch_size=500,
+            ignore_conflicts=True,
+        )
+        # SQLite 的 ignore_conflicts 不會回傳主鍵，以標準網址重新查詢 id；
+        # 不以原始網址查詢，避免把網址相同但沒有標準網址的舊文章算成新文章
+        urls = {row['canonical_url']: row['url'] for row in new_rows}
+        created = [
+            (article_id, urls[canonical_url], title, description)
+            for article_id, canonical_url, title, description in NewsArticle.objects.filter(
+                canonical_url__in=list(urls)
+            ).values_list('id', 'canonical_url', 'title', 'description')
+        ]
+        stats['created'] = len(created)
+        stats['duplicates'] += len(new_rows) - len(created)
+
+        extra_industries, extra_keywords = _keyword_links(keywords)
+
+        matcher = get_matcher()
+        links = {}
+        for article_id, url, title, description in created:
+            industry_ids, keyword_ids = matcher.match_article(title, description)
+            industry_ids |= extra_industries
+            keyword_ids |= extra_keywords
+            if keywords_by_url and url in keywords_by_url:
+                article_industries, article_keywords = _keyword_links(keywords_by_url[url])
+                industry_ids |= article_industries
+                keyword_ids |= article_keywords
+            links[article_id] = (industry_ids, keyword_ids)
+            stats['created_articles'].append((article_id, title))
+            stats['created_urls'].add(url)
+
+        # 近似重複的文章歸入同一群組
+        assign_clusters([(article_id, title, description) for article_id, _, title, description in created])
+
+        counts = sync_links(links)
+        stats['industry_links'] = counts['industries'][0]
+        stats['keyword_links'] = counts['keywords'][0]
+
+    if url_filter is not None:
+        url_filter.update(canonical_url for canonical_url, url in urls.items() if url in stats['created_urls'])
+    if stats['created']:
+        bump_version(CORPUS)
+    return stats
+
+
+def ingest_articles(articles, keywords=None, keywords_by_url=None):
+    """
+    儲存一批 NewsAPI 結果並記錄寫入指標；參數與回傳值同 _ingest_articles
+    """
+    started = time.perf_counter()
+    stats = _ingest_articles(articles, keywords, keywords_by_url)
+    metrics.INGEST_LATENCY.observe(time.perf_counter() - started)
+    for result in ('received', 'created', 'duplicates', 'filtered', 'invalid'):
+        metrics.INGEST_ARTICLES.inc(stats[result], result=result)
+    metrics.INGEST_LINKS.inc(stats['industry_links'], kind='industry')
+    metrics.INGEST_LINKS.inc(stats['keyword_links'], kind='keyword')
+    return stats
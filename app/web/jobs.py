@@ -0,0 +1,173 @@
+# web/jobs.py
+
+import hashlib
+import json
+from datetime import timedelta
+
+from django.db import IntegrityError, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from modelCore.backfill import run_backfill
+from modelCore.models import FetchJob, Industry, Keyword
+
+from .ingest import ingest_articles
+from .pending_terms import flush_pending_terms
+from .query_planner import page_size_for, plan_queries
+
+ACTIVE_STATUSES = (FetchJob.STATUS_PENDING, FetchJob.STATUS_RUNNING)
+
+
+def job_key(params):
+    """
+    抓取條件的去重鍵：忽略大小寫與關鍵字順序
+    """
+    normalized = [params['industry'].lower(), sorted({k.lower() for k in params['keywords']})]
+    return hashlib.sha1(json.dumps(normalized, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+
+def enqueue_fetch(industry_name, keyword_list):
+    """
+    排入抓取工作。相同條件已有等待中或執行中的工作時直接沿用，
+    讓同時送出的大量請求只觸發一次抓取；回傳 (工作, 是否新建)
+    """
+    params = {'industry': industry_name or '', 'keywords': sorted(set(keyword_list or []))}
+    key = job_key(params)
+    while True:
+        job = FetchJob.objects.filter(dedupe_key=key, status__in=ACTIVE_STATUSES).first()
+        if job is not None:
+            return job, False
+        try:
+            with transaction.atomic():
+                return FetchJob.objects.create(dedupe_key=key, params=params), True
+        except IntegrityError:
+            # 其他請求同時建立了相同的工作，重新查詢沿用
+            continue
+
+
+def claim_next_job():
+    """
+    取出最早的等待中工作並標記為執行中；以條件更新確保多個 worker 不會取到同一個工作
+    """
+    while True:
+        job_id = (
+            FetchJob.objects.filter(status=FetchJob.STATUS_PENDING)
+            .order_by('id').values_list('id', flat=True).first()
+        )
+        if job_id is None:
+            return None
+        claimed = FetchJob.objects.filter(id=job_id, status=FetchJob.STATUS_PENDING).update(
+            status=FetchJob.STATUS_RUNNING,
+            started_at=timezone.now(),
+            attempts=F('attempts') + 1,
+        )
+        if claimed:
+            return FetchJob.objects.get(id=job_id)
+
+
+def requeue_stale_jobs(stale_after=timedelta(minutes=10), max_attempts=3):
+    """
+    worker 中斷而停在執行中的工作：未超過重試次數的重新排入，其餘標記為失敗
+    """
+    stale = FetchJob.objects.filter(
+        status=FetchJob.STATUS_RUNNING, started_at__lt=timezone.now() - stale_after
+    )
+    requeued = stale.filter(attempts__lt=max_attempts).update(status=FetchJob.STATUS_PENDING)
+    failed = stale.update(
+        status=FetchJob.STATUS_FAILED, error="工作逾時", finished_at=timezone.now()
+    )
+    return requeued, failed
+
+
+def purge_finished_jobs(older_than=timedelta(days=1)):
+    """
+    刪除已完成或失敗一段時間的工作
+    """
+    deleted, _ = FetchJob.objects.filter(
+        status__in=(FetchJob.STATUS_DONE, FetchJob.STATUS_FAILED),
+        finished_at__lt=timezone.now() - older_than,
+    ).delete()
+    return deleted
+
+
+def execute_fetch(params, client, limit=10):
+    """
+    依產業與關鍵字抓取新聞並儲存，回傳結果摘要；API 錯誤時拋出 RuntimeError
+    """
+    # 先建立瀏覽時記錄的新詞，文章才能關聯到對應的關鍵字
+    flush_pending_terms()
+
+    industry_name = params.get('industry', '')
+    keyword_list = params.get('keywords', [])
+    keyword_filter = Q()
+    for keyword in keyword_list:
+        keyword_filter |= Q(keyword__iexact=keyword)
+    # 產業名稱與篩選流程相同，不分大小寫
+    industry = Industry.objects.filter(name__iexact=industry_name).first() if industry_name else None
+    industry_keywords = None
+    if industry:
+        industry_keywords = list(industry.keywords.values_list('keyword', flat=True))
+        keyword_filter |= Q(industry=industry)
+    elif industry_name:
+        keyword_filter |= Q(keyword__iexact=industry_name)
+
+    # 只使用用戶選擇的關鍵字進行搜尋，與 fetch_news 一樣經由 plan_queries 組成不超過長度上限的查詢；
+    # 查詢規劃只需要關鍵字文字，因此使用未儲存的 Keyword
+    search_terms = keyword_list if keyword_list else [industry_name]
+    plans = plan_queries([(Keyword(keyword=term), industry_keywords) for term in search_terms])
+
+    articles = []
+    seen_urls = set()
+    for plan in plans:
+        data, error = client.search(plan.query, page_size_for(plan, limit))
+        if error:
+            raise RuntimeError(error)
+        for article in (data or {}).get('articles', []):
+            if article.get('url') not in seen_urls:
+                seen_urls.add(article.get('url'))
+                articles.append(article)
+
+    created = 0
+    if articles:
+        keyword_objs = list(Keyword.objects.filter(keyword_filter)) if keyword_filter else []
+        created = ingest_articles(articles, keyword_objs)['created']
+
+    if created:
+        message = f"成功獲取 {created} 篇最新新聞！"
+    elif articles:
+        message = "找到的文章都已經存在，沒有新增新聞"
+    else:
+        message = "沒有找到相關的新聞文章"
+    return {'fetched': len(articles), 'created': created, 'message': message}
+
+
+def run_job(job, client):
+    """
+    執行單一工作並記錄結果
+    """
+    try:
+        if job.params.get('task') == 'backfill':
+            job.result = run_backfill(job.params)
+        else:
+            job.result = execute_fetch(job.params, client)
+        job.status = FetchJob.STATUS_DONE
+    except Exception as e:
+        job.error = str(e)
+        job.status = FetchJob.STATUS_FAILED
+    job.finished_at = timezone.now()
+    job.save(update_fields=['result', 'status', 'error', 'finished_at'])
+    return job
+
+
+def job_status(job):
+    """
+    供狀態 API 回傳的工作資訊
+    """
+    return {
+        'id': job.id,
+        'status': job.status,
+        'result': job.result,
+        'error': job.error,
+        'created_at': job.created_at.isoformat(),
+        'finished_at': job.finished_at.isoformat() if job.finished_at else None,
+    }
@@ -0,0 +1,322 @@
+# web/management/commands/bench.py
+
+import json
+import platform
+import re
+import sqlite3
+import subprocess
+import tempfile
+import time
+import warnings
+from datetime import datetime
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+
+from modelCore.bloom import reset_url_filter
+from modelCore.models import Industry, Keyword, NewsArticle
+from modelCore.versions import CORPUS, TAXONOMY, bump_version
+from web.benchmark import StubNewsAPI, SyntheticCorpus, percentile
+from web.ingest import ingest_articles
+from web.management.commands.fetch_news import NewsAPIClient, save_articles
+
+SCENARIOS = ('detect', 'ingest', 'fetch', 'filter_news', 'autocomplete')
+
+# filter_news 的篩選條件組合
+FILTER_SHAPES = ('all', 'industry', 'industry_keywords', 'keywords', 'week_collapse')
+
+_NEXT_CURSOR = re.compile(r'cursor=([\w-]+)"')
+
+
+class Command(BaseCommand):
+    help = "以固定種子產生的合成資料在獨立的測試資料庫上執行效能測試，結果寫成 JSON 供不同版本比較"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed', type=int, default=0, help='亂數種子（預設：0）')
+        parser.add_argument('--industries', type=int, default=20, help='產業數量（預設：20）')
+        parser.add_argument('--keywords', type=int, default=400, help='關鍵字數量（預設：400）')
+        parser.add_argument('--articles', type=int, default=5000, help='文章數量（預設：5000）')
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=30,
+            help='每個情境的取樣次數（預設：30）'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=50,
+            help='ingest 與 fetch 情境每批的文章數（預設：50）'
+        )
+        parser.add_argument(
+            '--page-depth',
+            type=int,
+            default=10,
+            help='filter_news 測試的較深頁數（預設：10）'
+        )
+        parser.add_argument(
+            '--scenarios',
+            default=','.join(SCENARIOS),
+            help=f"要執行的情境，以逗號分隔（預設：{','.join(SCENARIOS)}）"
+        )
+        parser.add_argument(
+            '--output',
+            default='bench.json',
+            help='結果 JSON 的路徑（預設：bench.json）'
+        )
+
+    def handle(self, *args, **options):
+        scenarios = [name.strip() for name in options['scenarios'].split(',') if name.strip()]
+        unknown = set(scenarios) - set(SCENARIOS)
+        if unknown:
+            raise CommandError(f"未知的情境：{', '.join(sorted(unknown))}")
+
+        self.repeat = options['repeat']
+        self.results = {}
+        # filter_news 的時間範圍以本地時間計算，Django 會依 TIME_ZONE 解讀，每次請求的警告不需輸出
+        warnings.filterwarnings(
+            'ignore', message=r'DateTimeField .* received a naive datetime', category=RuntimeWarning
+        )
+        with tempfile.TemporaryDirectory() as temp_dir:
+            isolated = override_settings(
+                ALLOWED_HOSTS=['testserver'],
+                CACHES={
+                    'default': {
+                        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+                        'LOCATION': 'bench-default',
+                    },
+                    'results': {
+                        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+                        'LOCATION': 'bench-results',
+                        'OPTIONS': {'MAX_ENTRIES': 500},
+                    },
+                },
+                NEWS_URL_FILTER={**settings.NEWS_URL_FILTER, 'PATH': f'{temp_dir}/urls.bloom'},
+                NEWS_PENDING_TERMS_PATH=f'{temp_dir}/pending_terms.jsonl',
+                NEWS_METRICS={'DIR': None},
+            )
+            with isolated:
+                old_name = connection.settings_dict['NAME']
+                connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+                reset_url_filter()
+                try:
+                    setup_seconds = self.setup_corpus(options)
+                    for name in scenarios:
+                        self.stdout.write(f"執行 {name} ...")
+                        getattr(self, f'bench_{name}')(options)
+                finally:
+                    reset_url_filter()
+                    connection.creation.destroy_test_db(old_name, verbosity=0)
+
+        report = {
+            'meta': {
+                'created_at': datetime.now().isoformat(timespec='seconds'),
+                'commit': self.git_commit(),
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'sqlite': sqlite3.sqlite_version,
+                'seed': options['seed'],
+                'industries': options['industries'],
+                'keywords': options['keywords'],
+                'articles': options['articles'],
+                'repeat': self.repeat,
+                'batch_size': options['batch_size'],
+                'setup_seconds': round(setup_seconds, 3),
+            },
+            'scenarios': self.results,
+        }
+        with open(options['output'], 'w', encoding='utf-8') as handle:
+            json.dump(report, handle, ensure_ascii=False, indent=2)
+
+        self.stdout.write(
+            f"{'情境':<40}{'p50 ms':>10}{'p95 ms':>10}{'次/秒':>10}{'查詢':>8}"
+        )
+        for name, result in self.results.items():
+            self.stdout.write(
+                f"{name:<40}{result['p50_ms']:>10.2f}{result['p95_ms']:>10.2f}"
+                f"{result['throughput_per_s']:>10.1f}{result['queries_avg']:>8.1f}"
+            )
+        self.stdout.write(f"結果已寫入 {options['output']}")
+
+    def git_commit(self):
+        try:
+            return subprocess.run(
+                ['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True,
+                cwd=settings.BASE_DIR,
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+
+    def setup_corpus(self, options):
+        """
+        建立合成的產業、關鍵字與文章，回傳耗時秒數
+        """
+        started = time.perf_counter()
+        self.corpus = SyntheticCorpus(
+            options['seed'], options['industries'], options['keywords'], options['articles']
+        )
+        Industry.objects.bulk_create([Industry(name=name) for name in self.corpus.industries])
+        industry_ids = dict(Industry.objects.values_list('name', 'id'))
+        Keyword.objects.bulk_create([
+            Keyword(keyword=keyword, industry_id=industry_ids[industry])
+            for keyword, industry in self.corpus.keywords
+        ])
+        bump_version(TAXONOMY)
+        for start in range(0, options['articles'], 500):
+            ingest_articles(self.corpus.articles(start, min(start + 500, options['articles'])))
+        return time.perf_counter() - started
+
+    def measure(self, name, function, items=1, prepare=None):
+        """
+        執行 repeat 次並記錄每次的時間與查詢次數；prepare 在每次計時前執行，不計入結果
+        """
+        durations = []
+        queries = []
+        for i in range(self.repeat):
+            argument = prepare(i) if prepare else None
+            with CaptureQueriesContext(connection) as context:
+                started = time.perf_counter()
+                function(argument)
+                durations.append(time.perf_counter() - started)
+            queries.append(len(context.captured_queries))
+
+        durations.sort()
+        queries.sort()
+        total = sum(durations)
+        self.results[name] = {
+            'samples': len(durations),
+            'p50_ms': percentile(durations, 0.5) * 1000,
+            'p95_ms': percentile(durations, 0.95) * 1000,
+            'mean_ms': total / len(durations) * 1000,
+            'max_ms': durations[-1] * 1000,
+            'throughput_per_s': len(durations) / total if total else 0.0,
+            'items_per_s': len(durations) * items / total if total else 0.0,
+            'queries_avg': sum(queries) / len(queries),
+            'queries_p95': percentile(queries, 0.95),
+        }
+
+    def bench_detect(self, options):
+        rng = self.corpus.rng
+        ids = list(NewsArticle.objects.values_list('id', flat=True))
+        self.measure(
+            'detect_and_link',
+            lambda article: article.detect_and_link_industries_keywords(),
+            prepare=lambda i: NewsArticle.objects.get(id=rng.choice(ids)),
+        )
+
+    def bench_ingest(self, options):
+        size = options['batch_size']
+        self.measure(
+            'save_articles',
+            save_articles,
+            items=size,
+            prepare=lambda i: self.corpus.new_batch(size),
+        )
+
+    def bench_fetch(self, options):
+        size = options['batch_size']
+        with StubNewsAPI(self.corpus) as stub:
+            client = NewsAPIClient(cache=False, max_retries=0)
+            client.api_url = stub.url
+            client.api_key = 'bench'
+
+            def fetch(keyword):
+                data, error = client.search(f'"{keyword}"', size)
+                if error:
+                    raise CommandError(error)
+                save_articles(data['articles'])
+
+            rng = self.corpus.rng
+            try:
+                self.measure(
+                    'fetch_and_save',
+                    fetch,
+                    items=size,
+                    prepare=lambda i: rng.choice(self.corpus.keywords)[0],
+                )
+            finally:
+                client.close()
+
+    def filter_params(self, shape):
+        rng = self.corpus.rng
+        industry = rng.choice(self.corpus.industries)
+        keywords = self.corpus.industry_keywords.get(industry, [])
+        if shape == 'industry':
+            return {'industry': industry}
+        if shape == 'industry_keywords':
+            return {'industry': industry, 'keywords': rng.sample(keywords, min(2, len(keywords)))}
+        if shape == 'keywords':
+            return {'keywords': [rng.choice(self.corpus.keywords)[0]]}
+        if shape == 'week_collapse':
+            return {'time_range': 'week', 'collapse': 'on'}
+        return {}
+
+    def deep_cursor(self, client, params, depth):
+        """
+        依序點「下一頁」取得第 depth 頁的游標；結果不足時停在最後一頁
+        """
+        cursor = None
+        for _ in range(depth - 1):
+            response = client.get('/', {**params, 'cursor': cursor} if cursor else params)
+            match = _NEXT_CURSOR.search(response.content.decode('utf-8'))
+            if match is None:
+                break
+            cursor = match.group(1)
+        return cursor
+
+    def bench_filter_news(self, options):
+        client = Client()
+
+        def request(params):
+            response = client.get('/', params)
+            if response.status_code != 200:
+                raise CommandError(f"filter_news 回應 {response.status_code}")
+
+        def cold(shape):
+            def prepare(i):
+                # 讓結果快取失效，量測完整查詢
+                bump_version(CORPUS)
+                return self.filter_params(shape)
+            return prepare
+
+        for shape in FILTER_SHAPES:
+            self.measure(f'filter_news.{shape}.page1.cold', request, prepare=cold(shape))
+            params = self.filter_params(shape)
+            request(params)
+            self.measure(f'filter_news.{shape}.page1.warm', request, prepare=lambda i: params)
+
+            depth = options['page_depth']
+            cursor = self.deep_cursor(client, params, depth)
+            deep_params = {**params, 'cursor': cursor} if cursor else params
+            self.measure(
+                f'filter_news.{shape}.page{depth}.warm', request, prepare=lambda i: deep_params
+            )
+
+    def bench_autocomplete(self, options):
+        client = Client()
+        rng = self.corpus.rng
+
+        def request(args):
+            path, params = args
+            response = client.get(path, params)
+            if response.status_code != 200:
+                raise CommandError(f"{path} 回應 {response.status_code}")
+
+        def keyword_prefix(i):
+            keyword, industry = rng.choice(self.corpus.keywords)
+            return '/api/keywords/', {'q': keyword[:rng.randint(1, 2)]}
+
+        def keyword_in_industry(i):
+            keyword, industry = rng.choice(self.corpus.keywords)
+            return '/api/keywords/', {'q': keyword[:rng.randint(1, 2)], 'industry': industry}
+
+        def industry_prefix(i):
+            return '/api/industries/', {'q': rng.choice(self.corpus.industries)[:1]}
+
+        self.measure('get_keywords', request, prepare=keyword_prefix)
+        self.measure('get_keywords.industry', request, prepare=keyword_in_industry)
+        self.measure('get_industries', request, prepare=industry_prefix)
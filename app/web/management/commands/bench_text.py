@@ -0,0 +1,172 @@
+# web/management/commands/bench_text.py
+
+import random
+import re
+import timeit
+from django.core.management.base import BaseCommand
+from modelCore.models import Industry, Keyword, NewsArticle
+from modelCore.text import clean_term, clean_terms, clean_text, clean_texts
+
+
+def legacy_model_clean_text(text):
+    """原本 modelCore/models.py 中的 clean_text，作為比較基準"""
+    if not text:
+        return ""
+    if isinstance(text, list):
+        text = text[0] if text else ""
+    if isinstance(text, str):
+        if text.startswith('[') and text.endswith(']'):
+            try:
+                import ast
+                parsed = ast.literal_eval(text)
+                if isinstance(parsed, list) and parsed:
+                    text = parsed[0]
+            except:
+                pass
+        text = text.strip('[]\'\"')
+        text = text.strip()
+    return text
+
+
+def legacy_view_clean_text(text):
+    """原本 web/views.py 中的 clean_text，作為比較基準"""
+    if not text:
+        return ""
+    if isinstance(text, list):
+        text = text[0] if text else ""
+    if isinstance(text, str):
+        if text.startswith('[') and text.endswith(']'):
+            try:
+                import ast
+                parsed = ast.literal_eval(text)
+                if isinstance(parsed, list) and parsed:
+                    text = parsed[0]
+            except:
+                pass
+        text = text.strip('[]\'\"')
+        text = text.strip()
+        text = re.sub(r'[-_]+', ' ', text)
+        text = re.sub(r'\s+', ' ', text)
+        text = text.strip()
+        if not text or len(text) < 2 or not any(c.isalnum() for c in text):
+            return ""
+    return text
+
+
+# 資料庫內容不足時補上的樣本，涵蓋全形字、列表字串與連字號等情況
+SAMPLE_TERMS = [
+    '半導體', '人工智慧', 'ＡＩ', '電動車', 'COVID-19', 'machine_learning', "['台積電']",
+    '  金融科技 ', '５Ｇ', 'ESG', '雲端運算', 'e-commerce', '生技醫療', '區塊鏈',
+]
+SAMPLE_TITLES = [
+    '台積電公布第三季財報　營收創新高',
+    "['Nvidia unveils new AI chips for data centers']",
+    'ＯｐｅｎＡＩ 推出新模型，企業導入加速',
+    'EV makers cut prices as competition heats up - Reuters',
+    '金管會：純網銀 2025 年可望全面獲利',
+]
+
+
+class Command(BaseCommand):
+    help = "比較文字正規化模組與原本兩個 clean_text 的執行速度"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--size',
+            type=int,
+            default=5000,
+            help='每種資料的樣本數（預設：5000）'
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=5,
+            help='重複次數，取最快的一次（預設：5）'
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=0,
+            help='抽樣用的亂數種子（預設：0）'
+        )
+
+    def _sample(self, values, fallback, size, rng):
+        values = [value for value in values if value] or fallback
+        return [rng.choice(values) for _ in range(size)]
+
+    def _time(self, function, repeat):
+        timer = timeit.Timer(function)
+        return min(timer.repeat(repeat=repeat, number=1))
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        size = options['size']
+        repeat = options['repeat']
+
+        # 字庫名稱會重複出現（每次比對、每次重建索引），以抽樣重複模擬
+        terms = self._sample(
+            list(Keyword.objects.values_list('keyword', flat=True))
+            + list(Industry.objects.values_list('name', flat=True))
+            + SAMPLE_TERMS,
+            SAMPLE_TERMS, size, rng,
+        )
+        articles = list(
+            NewsArticle.objects.order_by('-id').values_list('title', 'description')[:size]
+        )
+        texts = self._sample(
+            [text for row in articles for text in row] + SAMPLE_TITLES, SAMPLE_TITLES, size, rng
+        )
+
+        # 真實的描述多為一兩百字且幾乎不重複，快取派不上用場。
+        # API 原始內容只在寫入時清理一次；已存入的內容在比對、補建關聯與顯示時會反覆清理
+        raw_descriptions = [
+            ' '.join(rng.choice(SAMPLE_TITLES) for _ in range(4)) + f' ({i})'
+            for i in range(size)
+        ]
+        stored_descriptions = clean_texts(raw_descriptions)
+
+        cases = [
+            ('字庫名稱', terms, [
+                ('models.clean_text（原本）', lambda: [legacy_model_clean_text(t) for t in terms]),
+                ('views.clean_text（原本）', lambda: [legacy_view_clean_text(t) for t in terms]),
+                ('clean_text', lambda: [clean_text(t) for t in terms]),
+                ('clean_term', lambda: [clean_term(t) for t in terms]),
+                ('clean_terms（批次）', lambda: clean_terms(terms)),
+            ]),
+            ('文章標題與描述', texts, [
+                ('models.clean_text（原本）', lambda: [legacy_model_clean_text(t) for t in texts]),
+                ('views.clean_text（原本）', lambda: [legacy_view_clean_text(t) for t in texts]),
+                ('clean_text', lambda: [clean_text(t) for t in texts]),
+                ('clean_texts（批次）', lambda: clean_texts(texts)),
+            ]),
+            ('已存入的長篇描述', stored_descriptions, [
+                ('models.clean_text（原本）', lambda: [legacy_model_clean_text(t) for t in stored_descriptions]),
+                ('views.clean_text（原本）', lambda: [legacy_view_clean_text(t) for t in stored_descriptions]),
+                ('clean_text', lambda: [clean_text(t) for t in stored_descriptions]),
+                ('clean_texts（批次）', lambda: clean_texts(stored_descriptions)),
+            ]),
+            ('API 原始長篇描述', raw_descriptions, [
+                ('models.clean_text（原本）', lambda: [legacy_model_clean_text(t) for t in raw_descriptions]),
+                ('views.clean_text（原本）', lambda: [legacy_view_clean_text(t) for t in raw_descriptions]),
+                ('clean_text', lambda: [clean_text(t) for t in raw_descriptions]),
+                ('clean_texts（批次）', lambda: clean_texts(raw_descriptions)),
+            ]),
+        ]
+
+        for label, data, functions in cases:
+            self.stdout.write(f"{label}：{len(data)} 筆")
+            baseline = None
+            for name, function in functions:
+                elapsed = self._time(function, repeat)
+                if baseline is None:
+                    baseline = elapsed
+                self.stdout.write(
+                    f"  {name:<28}{elapsed * 1e6 / len(data):8.2f} µs/筆"
+                    f"  {baseline / elapsed:6.2f}x"
+                )
+
+        # 兩個原本版本結果不同的樣本數（新模組另外會做全形轉半形與空白合併）
+        differing = sum(
+            legacy_model_clean_text(t) != legacy_view_clean_text(t) for t in terms + texts
+        )
+        self.stdout.write(f"原本兩個版本結果不同的樣本：{differing} 筆")
@@ -0,0 +1,63 @@
+# web/management/commands/cluster_articles.py
+
+import time
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from modelCore.clustering import assign_clusters, bucket_stats
+from modelCore.models import ArticleBucket, NewsArticle
+
+class Command(BaseCommand):
+    help = "為尚未計算指紋的文章指定相同新聞群組，並顯示 LSH 桶的統計"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rebuild',
+            action='store_true',
+            help='清除所有指紋與群組後重新計算'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=1000,
+            help='每批處理的文章數量（預設：1000）'
+        )
+        parser.add_argument(
+            '--stats-only',
+            action='store_true',
+            help='只顯示統計，不計算指紋'
+        )
+
+    def handle(self, *args, **options):
+        if not options['stats_only']:
+            started = time.monotonic()
+            if options['rebuild']:
+                with transaction.atomic():
+                    ArticleBucket.objects.all().delete()
+                    NewsArticle.objects.update(minhash=None, cluster_id=None)
+
+            # 依 id 順序處理，較早的文章成為群組代表
+            processed = 0
+            last_id = 0
+            while True:
+                rows = list(
+                    NewsArticle.objects.filter(id__gt=last_id, minhash__isnull=True)
+                    .order_by('id').values_list('id', 'title', 'description')[:options['chunk_size']]
+                )
+                if not rows:
+                    break
+                with transaction.atomic():
+                    assign_clusters(rows)
+                processed += len(rows)
+                last_id = rows[-1][0]
+            self.stdout.write(f"已處理 {processed} 篇文章，耗時 {time.monotonic() - started:.1f} 秒")
+
+        stats = bucket_stats()
+        self.stdout.write(
+            f"文章 {stats['articles']} 篇，已計算指紋 {stats['signed']} 篇；"
+            f"{stats['clusters']} 個群組共 {stats['clustered_articles']} 篇文章，"
+            f"最大群組 {stats['cluster_max']} 篇"
+        )
+        self.stdout.write(
+            f"桶 {stats['buckets']} 個，平均 {stats['bucket_avg']:.1f} 篇，"
+            f"p95 {stats['bucket_p95']} 篇，最大 {stats['bucket_max']} 篇"
+        )
@@ -1,15 +1,168 @@
 # news_app/management/commands/fetch_news.py
 
 import requests
+from requests.adapters import HTTPAdapter
+from django.conf import settings
 from django.core.management.base import BaseCommand
-from modelCore.models import Keyword, NewsArticle, Industry
-from datetime import datetime
+from modelCore.models import Keyword, Industry
+from django.db.models import Q
+from modelCore.bloom import get_url_filter
+from web import metrics
+from web.archive import import_archive
+from web.ingest import ingest_articles, parse_published_at
+from web.pending_terms import flush_pending_terms
+from web.response_cache import ResponseCache
+from web.query_planner import attribute_articles, page_size_for, plan_queries
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, as_completed, wait
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
 import os
+import random
+import threading
+import time
 
 class NewsAPIClient:
-    def __init__(self):
+    # 這些狀態碼視為暫時性錯誤，會以指數退避重試
+    RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+    def __init__(self, pool_size=10, connect_timeout=5, read_timeout=30,
+                 max_retries=3, backoff_factor=0.5, backoff_max=30, cache=True):
+        """
+        pool_size: 連線池大小，並行抓取時應不小於同時請求數
+        connect_timeout / read_timeout: 連線與讀取逾時秒數
+        max_retries: 遇到 429/5xx 或連線錯誤時最多重試的次數
+        backoff_factor / backoff_max: 指數退避的基準秒數與上限
+        cache: 是否使用 settings.NEWS_API_CACHE 設定的回應快取，也可直接傳入 ResponseCache
+        """
         self.api_key = os.getenv('NEWS_API_KEY')
-        self.api_url = 'https://newsapi.org/v2/everything'
+        self.api_url = os.getenv('NEWS_API_URL', 'https://newsapi.org/v2/everything')
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.backoff_max = backoff_max
+
+        # 共用同一個 Session，讓請求重用 keep-alive 連線
+        self.session = requests.Session()
+        self.session.headers.update({
+            'Accept-Encoding': 'gzip, deflate',
+            'Connection': 'keep-alive',
+        })
+        self._adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, pool_block=True)
+        self.session.mount('https://', self._adapter)
+        self.session.mount('http://', self._adapter)
+
+        if cache is True:
+            config = getattr(settings, 'NEWS_API_CACHE', None)
+            cache = ResponseCache(
+                config['PATH'], config.get('TTL', 300), config.get('MAX_ENTRIES', 1000)
+            ) if config else None
+        self.cache = cache or None
+
+        self._lock = threading.Lock()
+        self._stats = {
+            'requests': 0,
+            'retries': 0,
+            'errors': 0,
+            'latency_total': 0.0,
+            'latency_max': 0.0,
+        }
+
+    def close(self):
+        self.session.close()
+
+    def _backoff(self, attempt, response=None):
+        """
+        計算第 attempt 次重試前要等待的秒數：
+        有 Retry-After 標頭時遵守它，否則使用加上隨機抖動的指數退避
+        """
+        if response is not None:
+            retry_after = response.headers.get('Retry-After')
+            if retry_after:
+                try:
+                    delay = float(retry_after)
+                except ValueError:
+                    try:
+                        retry_at = parsedate_to_datetime(retry_after)
+                        delay = (retry_at - datetime.now(timezone.utc)).total_seconds()
+                    except (TypeError, ValueError):
+                        delay = None
+                if delay is not None:
+                    return min(max(delay, 0), self.backoff_max)
+        return random.uniform(0, min(self.backoff_max, self.backoff_factor * (2 ** attempt)))
+
+    def _record(self, key, value=1):
+        with self._lock:
+            self._stats[key] += value
+        if key == 'retries':
+            metrics.NEWSAPI_RETRIES.inc(value)
+        elif key == 'errors':
+            metrics.NEWSAPI_ERRORS.inc(value)
+
+    def get(self, params):
+        """
+        送出 GET 請求，遇到 429/5xx 或連線錯誤時自動重試。
+        回傳 requests.Response；重試用盡後的連線錯誤會拋出 requests.RequestException
+        """
+        attempt = 0
+        while True:
+            started = time.monotonic()
+            response = None
+            try:
+                response = self.session.get(self.api_url, params=params, timeout=self.timeout)
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt >= self.max_retries:
+                    self._record('errors')
+                    raise
+            finally:
+                latency = time.monotonic() - started
+                with self._lock:
+                    self._stats['requests'] += 1
+                    self._stats['latency_total'] += latency
+                    self._stats['latency_max'] = max(self._stats['latency_max'], latency)
+                metrics.NEWSAPI_REQUESTS.inc(
+                    status=response.status_code if response is not None else 'error'
+                )
+                metrics.NEWSAPI_LATENCY.observe(latency)
+
+            if response is not None and (
+                response.status_code not in self.RETRY_STATUS_CODES or attempt >= self.max_retries
+            ):
+                return response
+
+            delay = self._backoff(attempt, response)
+            if response is not None:
+                response.close()
+            attempt += 1
+            self._record('retries')
+            time.sleep(delay)
+
+    def get_stats(self):
+        """
+        回傳請求次數、重試次數、連線重用率與延遲等統計
+        """
+        with self._lock:
+            stats = dict(self._stats)
+
+        # 由 urllib3 連線池的計數推算重用率：每個新連線之外的請求都是重用
+        pools = self._adapter.poolmanager.pools
+        connections = 0
+        pooled_requests = 0
+        for key in pools.keys():
+            pool = pools.get(key)
+            if pool is not None:
+                connections += pool.num_connections
+                pooled_requests += pool.num_requests
+        stats['connections'] = connections
+        stats['reuse_rate'] = 1 - connections / pooled_requests if pooled_requests else 0.0
+        stats['latency_avg'] = (
+            stats['latency_total'] / stats['requests'] if stats['requests'] else 0.0
+        )
+        if self.cache:
+            cache_stats = self.cache.get_stats()
+            stats['cache_hits'] = cache_stats['hits']
+            stats['cache_misses'] = cache_stats['misses']
+            stats['cache_hit_rate'] = cache_stats['hit_rate']
+        return stats
 
     def fetch_news(self, keywords, industry_keywords=None, limit=5):
         """
@@ -30,66 +183,153 @@ class NewsAPIClient:
         else:
             query = ' OR '.join(f'"{k}"' for k in keywords)
         
+        return self.search(query, limit)
+
+    def search(self, query, page_size=5, since=None, page=1):
+        """
+        以已組好的查詢字串呼叫 API，回傳 (data, error)
+        since: 只抓取此時間之後發布的文章（API 的 from 參數）
+        """
         params = {
             'q': query,
             'apiKey': self.api_key,
             'language': 'zh',
             'sortBy': 'publishedAt',
-            'pageSize': limit
+            'pageSize': page_size
         }
-        
-        response = requests.get(self.api_url, params=params)
+        if since:
+            params['from'] = since.astimezone(timezone.utc).strftime('%Y-%m-%dT%H:%M:%S')
+        if page > 1:
+            params['page'] = page
+
+        if self.cache:
+            data = self.cache.get(params)
+            metrics.NEWSAPI_CACHE.inc(result='miss' if data is None else 'hit')
+            if data is not None:
+                return data, None
+
+        try:
+            response = self.get(params)
+        except requests.RequestException as e:
+            return None, f"抓取關鍵字 {query} 失敗：{str(e)}"
         if response.status_code != 200:
+            self._record('errors')
             return None, f"抓取關鍵字 {query} 失敗，狀態碼：{response.status_code}"
-            
-        return response.json(), None
+
+        data = response.json()
+        if self.cache:
+            self.cache.set(params, data)
+        return data, None
 
 def save_articles(articles, keyword_obj=None, stdout=None):
     """
     儲存新聞文章到資料庫，並建立關鍵字和產業關聯
+    回傳新增的文章數量
     """
-    saved_count = 0
+    stats = ingest_articles(articles, [keyword_obj] if keyword_obj else None)
+    if stdout:
+        for article_id, title in stats['created_articles']:
+            stdout.write(f"儲存文章：{title}")
+    return stats['created']
+
+def fetch_incremental(client, query, page_size, since=None, known_urls=(), max_pages=1):
+    """
+    從最新的文章開始逐頁抓取，只保留 since 之後的文章；
+    一旦遇到已知網址或較舊的文章就停止翻頁。
+    沒有抓取進度（since 為 None）時只抓取第一頁。
+    回傳 ({'articles': [...]}, error)
+    """
+    known_urls = set(known_urls)
+    articles = []
+    for page in range(1, max(max_pages, 1) + 1):
+        data, error = client.search(query, page_size, since, page)
+        if error:
+            if articles:
+                break
+            return None, error
+
+        page_articles = data.get('articles', [])
+        reached_known = False
+        for article in page_articles:
+            published_at = parse_published_at(article.get('publishedAt'))
+            if article.get('url') in known_urls or (
+                since and published_at and published_at <= since
+            ):
+                reached_known = True
+                continue
+            articles.append(article)
+
+        total_results = data.get('totalResults') or 0
+        if (since is None or reached_known or len(page_articles) < page_size
+                or page * page_size >= total_results):
+            break
+    return {'articles': articles}, None
+
+def plan_checkpoint(plan):
+    """
+    合併查詢的抓取進度：取各關鍵字中最舊的進度，任一關鍵字沒有進度時回傳 None
+    """
+    checkpoints = [k.last_published_at for k in plan.keywords]
+    if not checkpoints or any(c is None for c in checkpoints):
+        return None, ()
+    return min(checkpoints), [k.last_article_url for k in plan.keywords if k.last_article_url]
+
+def update_checkpoints(plan, articles):
+    """
+    以此次抓取到的最新文章更新查詢涵蓋的所有關鍵字的抓取進度
+    """
+    newest = None
+    newest_url = ''
     for article in articles:
-        published_at = article.get('publishedAt')
-        try:
-            published_at = datetime.fromisoformat(published_at.replace("Z", "+00:00"))
-        except Exception:
-            published_at = None
+        published_at = parse_published_at(article.get('publishedAt'))
+        if published_at and (newest is None or published_at > newest):
+            newest = published_at
+            newest_url = article.get('url') or ''
+    if newest is None:
+        return 0
 
-        # 清理文章內容
-        title = article.get('title', '')
-        description = article.get('description', '')
-        source = article.get('source', {}).get('name', '')
+    # 直接以 update() 寫入，抓取進度不屬於字庫變更，不需觸發 Keyword.save
+    return Keyword.objects.filter(
+        id__in=[k.id for k in plan.keywords]
+    ).filter(
+        Q(last_published_at__isnull=True) | Q(last_published_at__lt=newest)
+    ).update(last_published_at=newest, last_article_url=newest_url[:500])
 
+def fetch_concurrently(client, plans, limit, concurrency=1, incremental=True, max_pages=1):
+    """
+    以執行緒池同時執行多個查詢，最多同時有 concurrency 個請求進行中。
+    plans: QueryPlan 列表
+    incremental: 依關鍵字的抓取進度只抓取新文章
+    依完成順序產生 (plan, data, error, 耗時秒數)，由呼叫端負責寫入資料庫
+    """
+    def fetch(plan):
+        started = time.monotonic()
+        since, known_urls = plan_checkpoint(plan) if incremental else (None, ())
         try:
-            news, created = NewsArticle.objects.get_or_create(
-                url=article['url'],
-                defaults={
-                    'title': title,
-                    'description': description,
-                    'source': source,
-                    'published_at': published_at,
-                }
+            data, error = fetch_incremental(
+                client, plan.query, page_size_for(plan, limit), since, known_urls, max_pages
             )
+        except requests.RequestException as e:
+            data, error = None, f"抓取關鍵字 {plan.query} 失敗：{str(e)}"
+        return plan, data, error, time.monotonic() - started
 
-            if created:
-                # 如果有關鍵字物件，添加關聯
-                if keyword_obj:
-                    news.keywords.add(keyword_obj)
-                    # 如果關鍵字有關聯的產業，也添加產業關聯
-                    if keyword_obj.industry:
-                        news.industries.add(keyword_obj.industry)
-                
-                saved_count += 1
-                if stdout:
-                    stdout.write(f"儲存文章：{news.title}")
-                    
-        except Exception as e:
-            if stdout:
-                stdout.write(f"儲存文章時發生錯誤：{str(e)}")
-            continue
-    
-    return saved_count
+    if concurrency <= 1:
+        for plan in plans:
+            yield fetch(plan)
+        return
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        pending = set()
+        for plan in plans:
+            # 限制排隊中的工作數量，避免結果在記憶體中堆積
+            if len(pending) >= concurrency * 2:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+            pending.add(executor.submit(fetch, plan))
+
+        for future in as_completed(pending):
+            yield future.result()
 
 class Command(BaseCommand):
     help = "根據關鍵字字庫抓取新聞文章"
@@ -111,16 +351,60 @@ class Command(BaseCommand):
             type=str,
             help='指定要查詢的產業名稱'
         )
+        parser.add_argument(
+            '--full',
+            action='store_true',
+            help='忽略抓取進度，重新抓取最新文章'
+        )
+        parser.add_argument(
+            '--max-pages',
+            type=int,
+            default=3,
+            help='有抓取進度時，每個查詢最多翻幾頁（預設：3）'
+        )
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=1,
+            help='同時進行的 API 請求數量（預設：1）'
+        )
+        parser.add_argument(
+            '--from-file',
+            type=str,
+            help='從 NewsAPI 回應的存檔（JSON、NDJSON 或 gzip 壓縮）匯入文章，不呼叫 API'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='--from-file 每批寫入的文章數（預設：500）'
+        )
+        parser.add_argument(
+            '--restart',
+            action='store_true',
+            help='--from-file 忽略檢查點，從檔案開頭重新匯入'
+        )
 
     def handle(self, *args, **options):
-        client = NewsAPIClient()
         article_limit = options['limit']
         keyword_query = options['keyword']
         industry_name = options['industry']
 
+        # 先建立瀏覽時記錄的新詞，讓這次抓取也涵蓋它們
+        new_industries, new_keywords = flush_pending_terms()
+        if new_industries or new_keywords:
+            self.stdout.write(f"新增 {new_industries} 個產業、{new_keywords} 個關鍵字")
+
+        # 離線匯入模式
+        if options['from_file']:
+            self.import_file(options['from_file'], options['batch_size'], options['restart'])
+            return
+
+        client = NewsAPIClient(pool_size=max(10, options['concurrency']))
+
         # 手動查詢模式
         if keyword_query or industry_name:
-            keywords_to_fetch = []
+            keywords_to_fetch = Keyword.objects.none()
             
             # 如果指定了關鍵字
             if keyword_query:
@@ -131,7 +415,7 @@ class Command(BaseCommand):
                 try:
                     industry = Industry.objects.get(name=industry_name)
                     industry_keywords = Keyword.objects.filter(industry=industry)
-                    keywords_to_fetch = keywords_to_fetch.union(industry_keywords)
+                    keywords_to_fetch = keywords_to_fetch | industry_keywords
                 except Industry.DoesNotExist:
                     self.stderr.write(f"找不到產業：{industry_name}")
                     return
@@ -147,16 +431,88 @@ class Command(BaseCommand):
                 self.stdout.write("尚未建立任何關鍵字，請先在後台新增。")
                 return
 
+        # 在主執行緒先準備好每個關鍵字的查詢參數，抓取執行緒不存取資料庫
+        tasks = []
+        for keyword in keywords_to_fetch.select_related('industry'):
+            industry_keywords = None
+            if keyword.industry:
+                industry_keywords = [k.keyword for k in keyword.industry.keywords.all()]
+            tasks.append((keyword, industry_keywords))
+
+        # 將關鍵字打包成盡量少的查詢
+        plans = plan_queries(tasks)
+        self.stdout.write(f"{len(tasks)} 個關鍵字合併為 {len(plans)} 個查詢")
+
+        concurrency = max(1, options['concurrency'])
         total_articles = 0
-        for keyword in keywords_to_fetch:
-            self.stdout.write(f"開始抓取關鍵字「{keyword.keyword}」的最新 {article_limit} 篇文章")
-            
-            data, error = client.fetch_news(keyword.keyword, keyword.industry.keywords.all() if keyword.industry else None, article_limit)
+        total_fetched = 0
+        total_filtered = 0
+        started = time.monotonic()
+
+        for plan, data, error, latency in fetch_concurrently(
+            client, plans, article_limit, concurrency,
+            incremental=not options['full'], max_pages=options['max_pages'],
+        ):
             if error:
-                self.stderr.write(error)
+                self.stderr.write(f"{error}（{latency * 1000:.0f} ms）")
                 continue
-                
-            saved_count = save_articles(data.get('articles', []), keyword, self.stdout)
-            total_articles += saved_count
 
-        self.stdout.write(f"完成！共儲存 {total_articles} 篇新文章。")
+            # 在本地將結果分配回各關鍵字；所有寫入都在主執行緒進行，SQLite 只會有一個寫入者
+            articles = data.get('articles', [])
+            stats = ingest_articles(articles, keywords_by_url=attribute_articles(articles, plan.keywords))
+            update_checkpoints(plan, articles)
+            keyword_names = '、'.join(k.keyword for k in plan.keywords)
+            self.stdout.write(
+                f"關鍵字「{keyword_names}」：耗時 {latency * 1000:.0f} ms，"
+                f"收到 {stats['received']} 篇，新增 {stats['created']} 篇，"
+                f"略過重複 {stats['duplicates']} 篇"
+            )
+            total_fetched += stats['received']
+            total_articles += stats['created']
+            total_filtered += stats['filtered']
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(
+            f"完成！共儲存 {total_articles} 篇新文章。"
+            f"（{len(tasks)} 個關鍵字，耗時 {elapsed:.1f} 秒，"
+            f"{len(tasks) / elapsed if elapsed else 0:.1f} 個關鍵字/秒，"
+            f"{total_fetched / elapsed if elapsed else 0:.1f} 篇/秒）"
+        )
+        api_stats = client.get_stats()
+        self.stdout.write(
+            f"API 請求 {api_stats['requests']} 次，重試 {api_stats['retries']} 次，"
+            f"失敗 {api_stats['errors']} 次，連線重用率 {api_stats['reuse_rate']:.0%}，"
+            f"平均延遲 {api_stats['latency_avg'] * 1000:.0f} ms，"
+            f"最大延遲 {api_stats['latency_max'] * 1000:.0f} ms"
+        )
+        if client.cache:
+            self.stdout.write(
+                f"回應快取命中 {api_stats['cache_hits']} 次，未命中 {api_stats['cache_misses']} 次"
+                f"（命中率 {api_stats['cache_hit_rate']:.0%}）"
+            )
+        url_filter = get_url_filter()
+        if url_filter is not None:
+            filter_stats = url_filter.get_stats()
+            self.stdout.write(
+                f"網址過濾器略過 {total_filtered} 篇已知文章，"
+                f"已記錄 {filter_stats['count']} 個網址（容量 {filter_stats['capacity']}），"
+                f"估計誤判率 {filter_stats['estimated_error_rate']:.4%}"
+            )
+        client.close()
+
+    def import_file(self, path, batch_size, restart):
+        if not os.path.isfile(path):
+            self.stderr.write(f"找不到檔案：{path}")
+            return
+        started = time.monotonic()
+        try:
+            totals = import_archive(path, batch_size, restart, log=self.stdout.write)
+        except ValueError as error:
+            self.stderr.write(f"檔案格式錯誤：{error}（已匯入的批次可從檢查點繼續）")
+            return
+        elapsed = time.monotonic() - started
+        self.stdout.write(
+            f"完成！讀取 {totals['records']} 篇，新增 {totals['created']} 篇，"
+            f"重複 {totals['duplicates']} 篇，無效 {totals['invalid']} 篇。"
+            f"（本次耗時 {elapsed:.1f} 秒）"
+        )
@@ -0,0 +1,11 @@
+# web/management/commands/flush_pending_terms.py
+
+from django.core.management.base import BaseCommand
+from web.pending_terms import flush_pending_terms
+
+class Command(BaseCommand):
+    help = "批次建立瀏覽時記錄的新產業與關鍵字（可由排程定期執行）"
+
+    def handle(self, *args, **options):
+        industries, keywords = flush_pending_terms()
+        self.stdout.write(f"完成！新增 {industries} 個產業、{keywords} 個關鍵字")
@@ -0,0 +1,16 @@
+# web/management/commands/rebuild_rollups.py
+
+import time
+from django.core.management.base import BaseCommand
+from modelCore.rollups import rebuild_rollups
+
+class Command(BaseCommand):
+    help = "從文章關聯重新計算產業與關鍵字的每日文章數量"
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        industry_rows, keyword_rows = rebuild_rollups()
+        self.stdout.write(
+            f"完成！共建立 {industry_rows} 筆產業統計、{keyword_rows} 筆關鍵字統計，"
+            f"耗時 {time.monotonic() - started:.1f} 秒"
+        )
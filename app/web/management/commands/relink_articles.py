@@ -0,0 +1,144 @@
+# web/management/commands/relink_articles.py
+
+import os
+import time
+import multiprocessing
+from collections import deque
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.utils import timezone
+
+from modelCore.models import NewsArticle, Industry
+from modelCore.matcher import KeywordMatcher
+from modelCore.linking import sync_links
+
+# worker 行程內的比對器，由 _init_worker 設定
+_worker_matcher = None
+
+
+def _init_worker(matcher):
+    global _worker_matcher
+    _worker_matcher = matcher
+
+
+def _match_chunk(rows):
+    """
+    在 worker 行程中比對一批文章，回傳 [(article_id, 產業 id 集合, 關鍵字 id 集合), ...]
+    """
+    return [
+        (article_id, *_worker_matcher.match_article(title, description))
+        for article_id, title, description in rows
+    ]
+
+
+def _chunked(iterable, size):
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+class Command(BaseCommand):
+    help = "依目前的產業與關鍵字字庫，批次重新建立所有文章的關聯"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--since',
+            type=str,
+            help='只處理此日期（YYYY-MM-DD）之後發布的文章'
+        )
+        parser.add_argument(
+            '--industry',
+            type=str,
+            help='只重新建立指定產業及其關鍵字的關聯'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=os.cpu_count() or 1,
+            help='比對用的 worker 行程數量（預設：CPU 核心數）'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=1000,
+            help='每批處理的文章數量（預設：1000）'
+        )
+
+    def handle(self, *args, **options):
+        workers = max(1, options['workers'])
+        chunk_size = max(1, options['chunk_size'])
+
+        articles = NewsArticle.objects.order_by('id')
+        if options['since']:
+            try:
+                since = datetime.strptime(options['since'], '%Y-%m-%d')
+            except ValueError:
+                raise CommandError(f"日期格式錯誤：{options['since']}，請使用 YYYY-MM-DD")
+            articles = articles.filter(published_at__gte=timezone.make_aware(since))
+
+        industry_scope = None
+        keyword_scope = None
+        if options['industry']:
+            try:
+                industry = Industry.objects.get(name=options['industry'])
+            except Industry.DoesNotExist:
+                raise CommandError(f"找不到產業：{options['industry']}")
+            industry_scope = {industry.id}
+            keyword_scope = set(industry.keywords.values_list('id', flat=True))
+
+        matcher = KeywordMatcher.from_database()
+        total = articles.count()
+        self.stdout.write(
+            f"開始重新建立 {total} 篇文章的關聯（字庫 {len(matcher)} 個詞，{workers} 個 worker）"
+        )
+
+        rows = articles.values_list('id', 'title', 'description').iterator(chunk_size=chunk_size)
+        chunks = _chunked(rows, chunk_size)
+
+        stats = {'processed': 0, 'added': 0, 'removed': 0}
+        started = time.monotonic()
+
+        def write(results):
+            links = {article_id: (industry_ids, keyword_ids)
+                     for article_id, industry_ids, keyword_ids in results}
+            counts = sync_links(links, industry_scope, keyword_scope)
+            stats['processed'] += len(results)
+            stats['added'] += counts['industries'][0] + counts['keywords'][0]
+            stats['removed'] += counts['industries'][1] + counts['keywords'][1]
+            elapsed = time.monotonic() - started
+            rate = stats['processed'] / elapsed if elapsed else 0
+            self.stdout.write(
+                f"已處理 {stats['processed']}/{total} 篇"
+                f"（新增 {stats['added']}、移除 {stats['removed']} 筆關聯，{rate:.0f} 篇/秒）"
+            )
+
+        if workers == 1:
+            _init_worker(matcher)
+            for chunk in chunks:
+                write(_match_chunk(chunk))
+        else:
+            # fork 前關閉資料庫連線，避免子行程共用同一個連線
+            connections.close_all()
+            with multiprocessing.Pool(workers, initializer=_init_worker, initargs=(matcher,)) as pool:
+                # 資料庫讀寫都留在主行程，最多同時保留 workers * 2 批在比對中
+                pending = deque()
+                for chunk in chunks:
+                    pending.append(pool.apply_async(_match_chunk, (chunk,)))
+                    if len(pending) >= workers * 2:
+                        write(pending.popleft().get())
+                while pending:
+                    write(pending.popleft().get())
+
+        elapsed = time.monotonic() - started
+        rate = stats['processed'] / elapsed if elapsed else 0
+        self.stdout.write(
+            f"完成！共處理 {stats['processed']} 篇文章，新增 {stats['added']} 筆、"
+            f"移除 {stats['removed']} 筆關聯，耗時 {elapsed:.1f} 秒（{rate:.0f} 篇/秒）"
+        )
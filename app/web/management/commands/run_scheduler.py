@@ -0,0 +1,102 @@
+# web/management/commands/run_scheduler.py
+
+import time
+from django.core.management.base import BaseCommand
+from web.management.commands.fetch_news import NewsAPIClient
+from web.metrics import start_flushing
+from web.pending_terms import flush_pending_terms
+from web.scheduler import FetchScheduler, scheduler_settings
+
+class Command(BaseCommand):
+    help = "常駐排程抓取新聞：依各關鍵字的新文章產出調整抓取頻率，並限制每小時的 API 請求數"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--limit',
+            type=int,
+            default=5,
+            help='每個關鍵字要抓取的最新文章數量（預設：5）'
+        )
+        parser.add_argument(
+            '--max-pages',
+            type=int,
+            default=3,
+            help='有抓取進度時，每個查詢最多翻幾頁（預設：3）'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=20,
+            help='同時到期時最多合併幾個關鍵字一起抓取（預設：20）'
+        )
+        parser.add_argument(
+            '--requests-per-hour',
+            type=int,
+            help='每小時 API 請求上限（預設：settings.NEWS_SCHEDULER）'
+        )
+        parser.add_argument(
+            '--min-interval',
+            type=int,
+            help='單一關鍵字最短抓取間隔秒數'
+        )
+        parser.add_argument(
+            '--max-interval',
+            type=int,
+            help='單一關鍵字最長抓取間隔秒數'
+        )
+        parser.add_argument(
+            '--sync-interval',
+            type=int,
+            default=300,
+            help='每隔幾秒檢查新增的關鍵字（預設：300）'
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='只處理目前已到期的關鍵字後結束'
+        )
+
+    def handle(self, *args, **options):
+        start_flushing()
+        scheduler_options = scheduler_settings(
+            REQUESTS_PER_HOUR=options['requests_per_hour'],
+            MIN_INTERVAL=options['min_interval'],
+            MAX_INTERVAL=options['max_interval'],
+        )
+        client = NewsAPIClient()
+        scheduler = FetchScheduler(
+            client, scheduler_options,
+            limit=options['limit'], max_pages=options['max_pages'],
+            batch_size=options['batch_size'], log=self.stdout.write,
+        )
+        self.stdout.write(
+            f"排程啟動：每小時最多 {scheduler_options['REQUESTS_PER_HOUR']} 次請求，"
+            f"間隔 {scheduler_options['MIN_INTERVAL']}～{scheduler_options['MAX_INTERVAL']} 秒"
+        )
+
+        last_sync = None
+        try:
+            while True:
+                # 定期建立新詞並為新關鍵字建立排程
+                if last_sync is None or time.monotonic() - last_sync > options['sync_interval']:
+                    flush_pending_terms()
+                    created = scheduler.sync_schedules()
+                    if created:
+                        self.stdout.write(f"新增 {created} 個關鍵字排程")
+                    last_sync = time.monotonic()
+
+                schedules = scheduler.pop_due()
+                if schedules:
+                    created = scheduler.run_batch(schedules)
+                    self.stdout.write(f"{len(schedules)} 個關鍵字抓取完成，新增 {created} 篇文章")
+                    continue
+
+                if options['once']:
+                    break
+                wait = scheduler.seconds_until_due()
+                sleep_for = options['sync_interval'] if wait is None else min(wait, options['sync_interval'])
+                time.sleep(max(sleep_for, 1))
+        except KeyboardInterrupt:
+            self.stdout.write("已停止，排程狀態已保存")
+        finally:
+            client.close()
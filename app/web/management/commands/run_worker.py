@@ -0,0 +1,65 @@
+# web/management/commands/run_worker.py
+
+import time
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from web.jobs import claim_next_job, purge_finished_jobs, requeue_stale_jobs, run_job
+from web.management.commands.fetch_news import NewsAPIClient
+from web.metrics import start_flushing
+
+class Command(BaseCommand):
+    help = "處理網頁排入的即時抓取工作"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='處理完目前所有等待中的工作後結束'
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=1.0,
+            help='沒有工作時的輪詢間隔秒數（預設：1）'
+        )
+        parser.add_argument(
+            '--stale-after',
+            type=int,
+            default=600,
+            help='執行中超過此秒數的工作視為中斷並重新排入（預設：600）'
+        )
+
+    def handle(self, *args, **options):
+        start_flushing()
+        client = NewsAPIClient()
+        stale_after = timedelta(seconds=options['stale_after'])
+        last_maintenance = 0
+
+        try:
+            while True:
+                # 定期處理中斷的工作並清除舊工作
+                if time.monotonic() - last_maintenance > 60:
+                    requeued, failed = requeue_stale_jobs(stale_after)
+                    if requeued or failed:
+                        self.stdout.write(f"重新排入 {requeued} 個中斷的工作，{failed} 個標記為失敗")
+                    purge_finished_jobs()
+                    last_maintenance = time.monotonic()
+
+                job = claim_next_job()
+                if job is None:
+                    if options['once']:
+                        break
+                    time.sleep(options['poll_interval'])
+                    continue
+
+                started = time.monotonic()
+                run_job(job, client)
+                elapsed = time.monotonic() - started
+                if job.error:
+                    self.stderr.write(f"工作 #{job.id} 失敗（{elapsed:.1f} 秒）：{job.error}")
+                else:
+                    self.stdout.write(f"工作 #{job.id} 完成（{elapsed:.1f} 秒）：{job.result['message']}")
+        except KeyboardInterrupt:
+            self.stdout.write("已停止")
+        finally:
+            client.close()
@@ -0,0 +1,48 @@
+# web/management/commands/url_filter.py
+
+import time
+from django.core.management.base import BaseCommand
+from modelCore.bloom import build_url_filter, get_url_filter, reset_url_filter
+
+class Command(BaseCommand):
+    help = "顯示或重建已知文章網址的 Bloom filter"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rebuild',
+            action='store_true',
+            help='由資料庫重新建立（刪除文章或調整容量、誤判率後使用，其他行程需重新啟動才會載入）'
+        )
+        parser.add_argument(
+            '--capacity',
+            type=int,
+            help='重建時的設計容量（預設：settings.NEWS_URL_FILTER）'
+        )
+        parser.add_argument(
+            '--error-rate',
+            type=float,
+            help='重建時的誤判率（預設：settings.NEWS_URL_FILTER）'
+        )
+
+    def handle(self, *args, **options):
+        if options['rebuild']:
+            started = time.monotonic()
+            reset_url_filter()
+            bloom = build_url_filter(capacity=options['capacity'], error_rate=options['error_rate'])
+            bloom.close()
+            self.stdout.write(f"重建完成，耗時 {time.monotonic() - started:.1f} 秒")
+
+        url_filter = get_url_filter()
+        if url_filter is None:
+            self.stderr.write("未設定 NEWS_URL_FILTER['PATH']")
+            return
+        stats = url_filter.get_stats()
+        self.stdout.write(
+            f"{stats['path']}：已記錄 {stats['count']} 個網址，容量 {stats['capacity']}，"
+            f"{stats['bits']} 位元（{stats['size_bytes'] / 1024:.0f} KB）、{stats['hashes']} 個雜湊函數"
+        )
+        self.stdout.write(
+            f"填充率 {stats['fill_ratio']:.2%}，估計誤判率 {stats['estimated_error_rate']:.4%}"
+        )
+        if stats['count'] > stats['capacity']:
+            self.stderr.write("已超過設計容量，誤判率會持續上升，請以 --rebuild 重建")
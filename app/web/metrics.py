@@ -0,0 +1,352 @@
+# web/metrics.py
+
+import atexit
+import glob
+import json
+import math
+import os
+import threading
+import time
+
+from django.conf import settings
+
+try:
+    import fcntl
+except ImportError:  # Windows 沒有 fcntl，退回只用行程內的鎖
+    fcntl = None
+
+# 延遲（秒）、查詢次數與回應大小（位元組）的 histogram 區間
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576)
+
+_ARCHIVE = 'archive.json'
+
+
+def metrics_settings():
+    options = {'DIR': None, 'FLUSH_INTERVAL': 5, 'ALLOWED_IPS': ('127.0.0.1', '::1')}
+    options.update(getattr(settings, 'NEWS_METRICS', {}))
+    return options
+
+
+class Registry:
+    """
+    行程內的指標數值。各 uwsgi worker 與背景命令定期把自己的數值寫入
+    NEWS_METRICS['DIR'] 下以 pid 命名的檔案，/metrics 再加總所有檔案，
+    因此不論請求落在哪個 worker，看到的都是全部行程的合計
+    """
+
+    def __init__(self):
+        self.metrics = {}
+        # 由 start_flushing() 設定；未設定的行程（一般管理命令、測試）不寫入任何檔案
+        self.directory = None
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        # fork 出的子行程不沿用父行程的數值，避免重複計算
+        self._pid = os.getpid()
+        self._values = {}
+        self._flushed_at = 0.0
+        self._dirty = False
+
+    def register(self, metric):
+        self.metrics[metric.name] = metric
+        return metric
+
+    def update(self, name, labels, function):
+        with self._lock:
+            if os.getpid() != self._pid:
+                self._reset()
+            samples = self._values.setdefault(name, {})
+            samples[labels] = function(samples.get(labels))
+            self._dirty = True
+        self.maybe_flush()
+
+    def snapshot(self):
+        with self._lock:
+            if os.getpid() != self._pid:
+                self._reset()
+            return {
+                name: [
+                    [list(labels), list(value) if isinstance(value, list) else value]
+                    for labels, value in samples.items()
+                ]
+                for name, samples in self._values.items()
+            }
+
+    def maybe_flush(self, force=False):
+        """
+        距離上次寫入超過 FLUSH_INTERVAL 秒時，以暫存檔改名的方式寫入此行程的數值
+        """
+        directory = self.directory
+        if not directory or not self._dirty:
+            return
+        now = time.monotonic()
+        if not force and now - self._flushed_at < metrics_settings()['FLUSH_INTERVAL']:
+            return
+        if not self._flush_lock.acquire(blocking=force):
+            # 其他執行緒正在寫入
+            return
+        try:
+            self._flushed_at = now
+            self._dirty = False
+            os.makedirs(directory, exist_ok=True)
+            path = os.path.join(directory, f'{os.getpid()}.json')
+            temp_path = f'{path}.tmp'
+            with open(temp_path, 'w', encoding='utf-8') as handle:
+                json.dump(self.snapshot(), handle)
+            os.replace(temp_path, path)
+        finally:
+            self._flush_lock.release()
+
+
+registry = Registry()
+
+
+def start_flushing():
+    """
+    由 web 伺服器與常駐的背景程式（run_worker、run_scheduler）呼叫：
+    依目前的 NEWS_METRICS['DIR'] 開始定期寫入此行程的數值，並在結束前寫入最後的數值
+    """
+    directory = metrics_settings()['DIR']
+    if not directory or registry.directory:
+        return
+    registry.directory = str(directory)
+    atexit.register(registry.maybe_flush, force=True)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _format_value(value):
+    if value == math.inf:
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class Counter:
+    """只會增加的計數"""
+
+    kind = 'counter'
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        registry.register(self)
+
+    def _key(self, labels):
+        return tuple(str(labels.get(name, '')) for name in self.labelnames)
+
+    def inc(self, amount=1, **labels):
+        if amount:
+            registry.update(self.name, self._key(labels), lambda value: (value or 0) + amount)
+
+    def merge(self, a, b):
+        return a + b
+
+    def render(self, samples):
+        lines = []
+        for labels, value in sorted(samples.items()):
+            lines.append(f'{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}')
+        return lines
+
+
+class Histogram(Counter):
+    """各區間的累計次數，以及觀測值的總和與次數"""
+
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, amount, **labels):
+        index = next(
+            (i for i, bound in enumerate(self.buckets) if amount <= bound), len(self.buckets)
+        )
+
+        def add(value):
+            # [各區間（不累計）的次數..., 超過最大區間的次數, 總和]
+            value = value or [0] * (len(self.buckets) + 1) + [0.0]
+            value[index] += 1
+            value[-1] += amount
+            return value
+
+        registry.update(self.name, self._key(labels), add)
+
+    def merge(self, a, b):
+        return [x + y for x, y in zip(a, b)]
+
+    def render(self, samples):
+        lines = []
+        for labels, value in sorted(samples.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), value[:-1]):
+                cumulative += count
+                bucket_labels = _format_labels(
+                    self.labelnames, labels, [('le', _format_value(bound))]
+                )
+                lines.append(f'{self.name}_bucket{bucket_labels} {cumulative}')
+            label_text = _format_labels(self.labelnames, labels)
+            lines.append(f'{self.name}_sum{label_text} {_format_value(value[-1])}')
+            lines.append(f'{self.name}_count{label_text} {cumulative}')
+        return lines
+
+
+def _merge_into(totals, snapshot):
+    for name, samples in snapshot.items():
+        metric = registry.metrics.get(name)
+        if metric is None:
+            continue
+        merged = totals.setdefault(name, {})
+        for labels, value in samples:
+            labels = tuple(labels)
+            if labels in merged:
+                merged[labels] = metric.merge(merged[labels], value)
+            else:
+                merged[labels] = value
+
+
+def _read(path):
+    try:
+        with open(path, encoding='utf-8') as handle:
+            return json.load(handle)
+    except (OSError, ValueError):
+        return {}
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _archive_dead(directory):
+    """
+    已結束行程的數值併入 archive.json 後刪除原檔，計數不會因 worker 重新啟動而倒退
+    """
+    archive_path = os.path.join(directory, _ARCHIVE)
+    with open(os.path.join(directory, 'archive.lock'), 'a') as lock:
+        if fcntl is not None:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+        archived = {}
+        _merge_into(archived, _read(archive_path))
+        dead = []
+        for path in glob.glob(os.path.join(directory, '[0-9]*.json')):
+            pid = int(os.path.basename(path).split('.')[0])
+            if pid != os.getpid() and not _pid_alive(pid):
+                _merge_into(archived, _read(path))
+                dead.append(path)
+        if not dead:
+            return
+        temp_path = f'{archive_path}.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as handle:
+            json.dump(
+                {
+                    name: [[list(labels), value] for labels, value in samples.items()]
+                    for name, samples in archived.items()
+                },
+                handle,
+            )
+        os.replace(temp_path, archive_path)
+        for path in dead:
+            os.remove(path)
+
+
+def collect():
+    """
+    加總所有行程的數值：{指標名稱: {標籤值 tuple: 數值}}
+    """
+    directory = metrics_settings()['DIR']
+    totals = {}
+    if not directory:
+        _merge_into(totals, registry.snapshot())
+        return totals
+
+    registry.maybe_flush(force=True)
+    directory = str(directory)
+    if os.path.isdir(directory):
+        _archive_dead(directory)
+        for path in glob.glob(os.path.join(directory, '*.json')):
+            if os.path.basename(path) == f'{os.getpid()}.json':
+                continue
+            _merge_into(totals, _read(path))
+    _merge_into(totals, registry.snapshot())
+    return totals
+
+
+def render():
+    """
+    以 Prometheus 文字格式輸出所有指標
+    """
+    totals = collect()
+    lines = []
+    for name, metric in sorted(registry.metrics.items()):
+        lines.append(f'# HELP {name} {metric.documentation}')
+        lines.append(f'# TYPE {name} {metric.kind}')
+        lines.extend(metric.render(totals.get(name, {})))
+    return '\n'.join(lines) + '\n'
+
+
+# 網頁請求
+REQUEST_LATENCY = Histogram(
+    'news_http_request_duration_seconds', '請求處理時間（秒）', ('view', 'method')
+)
+REQUESTS = Counter(
+    'news_http_requests_total', '請求次數', ('view', 'method', 'status')
+)
+REQUEST_QUERIES = Histogram(
+    'news_http_request_db_queries', '每個請求的資料庫查詢次數', ('view',), QUERY_BUCKETS
+)
+REQUEST_DB_TIME = Histogram(
+    'news_http_request_db_duration_seconds', '每個請求的資料庫查詢時間（秒）', ('view',)
+)
+RESPONSE_SIZE = Histogram(
+    'news_http_response_size_bytes', '回應大小（位元組）', ('view',), SIZE_BUCKETS
+)
+
+# 文章寫入
+INGEST_ARTICLES = Counter(
+    'news_ingest_articles_total', '寫入批次中的文章數，依處理結果分類', ('result',)
+)
+INGEST_LINKS = Counter(
+    'news_ingest_links_total', '新文章建立的關聯數', ('kind',)
+)
+INGEST_LATENCY = Histogram(
+    'news_ingest_batch_duration_seconds', '每批文章的寫入時間（秒）'
+)
+
+# 篩選結果快取
+RESULT_CACHE = Counter(
+    'news_result_cache_requests_total', '篩選結果快取的查詢次數', ('result',)
+)
+
+# NewsAPI
+NEWSAPI_REQUESTS = Counter(
+    'news_api_requests_total', '送出的 NewsAPI 請求次數（含重試），依狀態碼分類', ('status',)
+)
+NEWSAPI_LATENCY = Histogram(
+    'news_api_request_duration_seconds', 'NewsAPI 請求時間（秒）'
+)
+NEWSAPI_RETRIES = Counter('news_api_retries_total', 'NewsAPI 請求重試次數')
+NEWSAPI_ERRORS = Counter('news_api_errors_total', '最終失敗的 NewsAPI 查詢次數')
+NEWSAPI_CACHE = Counter(
+    'news_api_cache_requests_total', 'NewsAPI 回應快取的查詢次數', ('result',)
+)
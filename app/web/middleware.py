@@ -0,0 +1,60 @@
+# web/middleware.py
+
+import time
+
+from django.db import connections
+
+from . import metrics
+
+
+class _QueryTimer:
+    """以 execute_wrapper 累計請求期間的查詢次數與時間"""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.duration += time.perf_counter() - started
+
+
+def view_label(request):
+    """
+    指標使用的檢視名稱：以 URL 名稱分類，管理後台合併為 admin，未對應任何 URL 的為 unmatched
+    """
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return 'unmatched'
+    if match.app_name == 'admin' or 'admin' in match.namespaces:
+        return 'admin'
+    return match.url_name or match.view_name or 'unnamed'
+
+
+class MetricsMiddleware:
+    """
+    記錄每個請求的處理時間、資料庫查詢次數與時間、回應大小，由 /metrics 輸出
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        timer = _QueryTimer()
+        started = time.perf_counter()
+        with connections['default'].execute_wrapper(timer):
+            response = self.get_response(request)
+        duration = time.perf_counter() - started
+
+        view = view_label(request)
+        metrics.REQUESTS.inc(view=view, method=request.method, status=response.status_code)
+        metrics.REQUEST_LATENCY.observe(duration, view=view, method=request.method)
+        metrics.REQUEST_QUERIES.observe(timer.count, view=view)
+        metrics.REQUEST_DB_TIME.observe(timer.duration, view=view)
+        if not response.streaming:
+            metrics.RESPONSE_SIZE.observe(len(response.content), view=view)
+        return response
@@ -0,0 +1,111 @@
+# web/pagination.py
+
+import base64
+import json
+
+from django.db.models import F, Q
+from django.utils.dateparse import parse_datetime
+
+# 文章列表的排序：發布時間新到舊（沒有發布時間的排最後），同時間以 id 排序
+ARTICLE_ORDERING = (F('published_at').desc(nulls_last=True), F('id').desc())
+REVERSE_ORDERING = (F('published_at').asc(nulls_first=True), F('id').asc())
+
+
+def encode_cursor(published_at, article_id):
+    """
+    將 (published_at, id) 編碼為不透明的游標字串
+    """
+    payload = json.dumps([published_at.isoformat() if published_at else None, article_id])
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(token):
+    """
+    解碼游標字串，格式錯誤時回傳 None
+    """
+    if not token:
+        return None
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        published_at, article_id = json.loads(base64.urlsafe_b64decode(padded))
+        published_at = parse_datetime(published_at) if published_at else None
+        return published_at, int(article_id)
+    except (ValueError, TypeError):
+        return None
+
+
+def _after(published_at, article_id):
+    """
+    依 ARTICLE_ORDERING 排在 (published_at, id) 之後的文章
+    """
+    if published_at is None:
+        return Q(published_at__isnull=True, id__lt=article_id)
+    return (
+        Q(published_at__lt=published_at)
+        | Q(published_at=published_at, id__lt=article_id)
+        | Q(published_at__isnull=True)
+    )
+
+
+def _before(published_at, article_id):
+    """
+    依 ARTICLE_ORDERING 排在 (published_at, id) 之前的文章
+    """
+    if published_at is None:
+        return Q(published_at__isnull=False) | Q(published_at__isnull=True, id__gt=article_id)
+    return Q(published_at__gt=published_at) | Q(published_at=published_at, id__gt=article_id)
+
+
+class KeysetPage:
+    """
+    以游標分頁的一頁文章，不需要 COUNT 或 OFFSET
+    """
+
+    def __init__(self, articles, has_next, has_previous):
+        self.object_list = articles
+        self.has_next = has_next
+        self.has_previous = has_previous
+        self.next_cursor = (
+            encode_cursor(articles[-1].published_at, articles[-1].id)
+            if has_next and articles else ''
+        )
+        self.prev_cursor = (
+            encode_cursor(articles[0].published_at, articles[0].id)
+            if has_previous and articles else ''
+        )
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+
+def paginate_queryset(queryset, cursor=None, direction='next', per_page=10):
+    """
+    以 (published_at, id) 為鍵做游標分頁；每一頁的成本與頁數深淺無關
+    """
+    queryset = queryset.order_by()
+    if direction == 'prev' and cursor:
+        rows = list(queryset.filter(_before(*cursor)).order_by(*REVERSE_ORDERING)[:per_page + 1])
+        has_previous = len(rows) > per_page
+        return KeysetPage(list(reversed(rows[:per_page])), True, has_previous)
+
+    if cursor:
+        queryset = queryset.filter(_after(*cursor))
+    rows = list(queryset.order_by(*ARTICLE_ORDERING)[:per_page + 1])
+    return KeysetPage(rows[:per_page], len(rows) > per_page, cursor is not None)
+
+
+def paginate(source, cursor=None, direction='next', per_page=10):
+    """
+    source 可以是 QuerySet 或 result_cache.CachedResults；
+    快取中有足夠的 id 時直接切片，否則改以資料庫游標分頁
+    """
+    window = getattr(source, 'window', None)
+    if window is not None:
+        page = window(cursor, direction, per_page)
+        if page is not None:
+            return KeysetPage(*page)
+        source = source.queryset
+    return paginate_queryset(source, cursor, direction, per_page)
@@ -0,0 +1,185 @@
+# web/pending_terms.py
+
+import json
+import os
+import threading
+
+from django.conf import settings
+from django.db import transaction
+
+from modelCore.backfill import backfill_terms
+from modelCore.models import Industry, Keyword
+from modelCore.versions import TAXONOMY, bump_version, get_version
+
+try:
+    import fcntl
+except ImportError:  # Windows 沒有 fcntl，退回只用行程內的鎖
+    fcntl = None
+
+_lock = threading.Lock()
+
+# 此行程已寫入過的記錄：瀏覽與翻頁會重複送出相同的新詞，只需寫入一次。
+# flush 或字庫版本改變時清空，並限制數量避免無限成長
+MAX_RECORDED = 10000
+_recorded = set()
+_recorded_version = None
+
+
+def _spool_path():
+    return str(settings.NEWS_PENDING_TERMS_PATH)
+
+
+def _lock_file(handle):
+    if fcntl is not None:
+        fcntl.flock(handle.fileno(), fcntl.LOCK_EX)
+
+
+def record_terms(industry=None, keywords=()):
+    """
+    將尚未建立的產業與關鍵字附加到待處理檔案，不存取資料庫。
+    已存在於建議索引中的詞會直接略過；回傳是否有寫入
+    """
+    from .autocomplete import get_index
+
+    index = get_index()
+    keywords = [k for k in keywords if k and not index.has_keyword(k)]
+    if industry and index.has_industry(industry):
+        # 產業已存在時，只需記錄新的關鍵字與其所屬產業
+        if not keywords:
+            return False
+    elif not industry and not keywords:
+        return False
+
+    global _recorded_version
+    entry = ((industry or '').lower(), tuple(sorted({k.lower() for k in keywords})))
+    version = get_version(TAXONOMY)
+    line = json.dumps({'industry': industry or '', 'keywords': keywords}, ensure_ascii=False) + '\n'
+    path = _spool_path()
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with _lock:
+        if version != _recorded_version or len(_recorded) >= MAX_RECORDED:
+            _recorded.clear()
+            _recorded_version = version
+        if entry in _recorded:
+            return False
+        while True:
+            with open(path, 'a', encoding='utf-8') as handle:
+                _lock_file(handle)
+                # 取得鎖之前檔案可能已被 flush 改名，此時重新開啟新的檔案
+                try:
+                    current = os.stat(path).st_ino
+                except FileNotFoundError:
+                    current = None
+                if current != os.fstat(handle.fileno()).st_ino:
+                    continue
+                handle.write(line)
+                _recorded.add(entry)
+                return True
+
+
+def _take_spool():
+    """
+    將待處理檔案改名後讀出，改名期間持有檔案鎖以免遺漏正在寫入的資料
+    """
+    path = _spool_path()
+    flushing = path + '.flushing'
+    if os.path.exists(path):
+        with open(path, 'a', encoding='utf-8') as handle:
+            _lock_file(handle)
+            if os.path.exists(flushing):
+                # 上次 flush 中斷留下的資料，併入這次處理
+                with open(flushing, encoding='utf-8') as previous:
+                    handle.write(previous.read())
+            os.replace(path, flushing)
+    if not os.path.exists(flushing):
+        return flushing, []
+
+    entries = []
+    with open(flushing, encoding='utf-8') as handle:
+        for line in handle:
+            try:
+                entries.append(json.loads(line))
+            except ValueError:
+                continue
+    return flushing, entries
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def flush_pending_terms():
+    """
+    批次建立待處理的產業與關鍵字（不分大小寫去除重複），回傳 (新增產業數, 新增關鍵字數)。
+    新關鍵字歸屬於同一筆記錄中的產業。
+    worker、排程器與 fetch_news 都會呼叫，以獨立的鎖檔讓同一時間只有一個行程處理
+    """
+    with _lock:
+        _recorded.clear()
+    path = _spool_path()
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path + '.lock', 'a') as lock:
+        _lock_file(lock)
+        return _flush_spool()
+
+
+def _flush_spool():
+    flushing, entries = _take_spool()
+    if not entries:
+        _remove(flushing)
+        return 0, 0
+
+    industries = {}
+    keywords = {}
+    for entry in entries:
+        industry = (entry.get('industry') or '').strip()
+        if industry:
+            industries.setdefault(industry.lower(), industry)
+        for keyword in entry.get('keywords') or []:
+            keyword = keyword.strip()
+            if keyword:
+                # 同一關鍵字出現多次時，以第一個有指定產業的記錄為準
+                current = keywords.get(keyword.lower())
+                if current is None or (not current[1] and industry):
+                    keywords[keyword.lower()] = (keyword, industry)
+
+    with transaction.atomic():
+        existing_industries = {
+            name.lower(): name for name in Industry.objects.values_list('name', flat=True)
+        }
+        new_industries = [
+            Industry(name=name) for lowered, name in industries.items()
+            if lowered not in existing_industries
+        ]
+        Industry.objects.bulk_create(new_industries, ignore_conflicts=True)
+
+        # 與篩選流程相同，產業名稱不分大小寫
+        industry_ids = {
+            name.lower(): industry_id
+            for industry_id, name in Industry.objects.values_list('id', 'name')
+        }
+        existing_keywords = {k.lower() for k in Keyword.objects.values_list('keyword', flat=True)}
+        new_keywords = [
+            Keyword(keyword=keyword, industry_id=industry_ids.get(industry.lower()))
+            for lowered, (keyword, industry) in keywords.items()
+            if lowered not in existing_keywords
+        ]
+        Keyword.objects.bulk_create(new_keywords, ignore_conflicts=True)
+
+    # bulk_create 不會呼叫 save()，需自行讓依賴字庫的快取失效
+    if new_industries or new_keywords:
+        bump_version(TAXONOMY)
+        # 同樣也不會補建既有文章的關聯
+        backfill_terms(
+            industry_ids=Industry.objects.filter(
+                name__in=[industry.name for industry in new_industries]
+            ).values_list('id', flat=True),
+            keyword_ids=Keyword.objects.filter(
+                keyword__in=[keyword.keyword for keyword in new_keywords]
+            ).values_list('id', flat=True),
+        )
+    _remove(flushing)
+    return len(new_industries), len(new_keywords)
@@ -0,0 +1,141 @@
+# web/query_planner.py
+
+from collections import namedtuple
+
+# NewsAPI 的 q 參數最多 500 個字元
+MAX_QUERY_LENGTH = 500
+# NewsAPI 單次請求最多回傳 100 篇
+MAX_PAGE_SIZE = 100
+
+QueryPlan = namedtuple('QueryPlan', ['query', 'keywords'])
+
+
+def _quote(term):
+    return f'"{term}"'
+
+
+def _or_group(terms):
+    if len(terms) == 1:
+        return _quote(terms[0])
+    return '(' + ' OR '.join(_quote(t) for t in terms) + ')'
+
+
+def _dedupe(terms):
+    """
+    去除重複（不區分大小寫）並排序，讓等價的查詢得到相同的字串
+    """
+    seen = {}
+    for term in terms:
+        term = (term or '').strip().replace('"', '')
+        if term and term.lower() not in seen:
+            seen[term.lower()] = term
+    return sorted(seen.values(), key=str.lower)
+
+
+def _pack(terms, budget):
+    """
+    將詞依序裝入多個 OR 群組，每個群組的長度不超過 budget。
+    單一詞本身超過 budget 時自成一組
+    """
+    chunks = []
+    current = []
+    for term in terms:
+        candidate = current + [term]
+        if current and len(_or_group(candidate)) > budget:
+            chunks.append(current)
+            current = [term]
+        else:
+            current = candidate
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def build_queries(terms, industry_terms=None, max_length=MAX_QUERY_LENGTH):
+    """
+    將 (產業關鍵字 × 關鍵字) 的組合寫成 (ik1 OR ik2 ...) AND (kw1 OR kw2 ...)，
+    與原本逐一列出 ("ik" AND "kw") 的查詢等價但短得多；
+    若仍超過長度上限，將兩邊各自切塊後取所有組合。
+    回傳 [(查詢字串, 此查詢涵蓋的關鍵字列表), ...]
+    """
+    terms = _dedupe(terms)
+    industry_terms = _dedupe(industry_terms or [])
+    if not terms:
+        return []
+
+    if not industry_terms:
+        return [(_or_group(chunk), chunk) for chunk in _pack(terms, max_length)]
+
+    separator = ' AND '
+    full_industry = _or_group(industry_terms)
+    full_terms = _or_group(terms)
+    if len(full_industry) + len(separator) + len(full_terms) <= max_length:
+        return [(f'{full_industry}{separator}{full_terms}', terms)]
+
+    # 產業關鍵字最多使用一半的長度，剩下的留給關鍵字
+    available = max_length - len(separator)
+    industry_chunks = _pack(industry_terms, min(len(full_industry), available // 2))
+    industry_length = max(len(_or_group(chunk)) for chunk in industry_chunks)
+    term_chunks = _pack(terms, max(available - industry_length, 1))
+
+    return [
+        (f'{_or_group(industry_chunk)}{separator}{_or_group(term_chunk)}', term_chunk)
+        for industry_chunk in industry_chunks
+        for term_chunk in term_chunks
+    ]
+
+
+def plan_queries(tasks, max_length=MAX_QUERY_LENGTH):
+    """
+    將多個關鍵字的抓取需求合併成盡量少的查詢。
+    tasks: [(keyword, industry_keywords), ...]，keyword 為 Keyword 物件
+    同一組產業關鍵字的關鍵字會被打包進同一個 OR 查詢，相同的查詢只會出現一次。
+    回傳 QueryPlan 列表，keywords 為此查詢涵蓋的 Keyword 物件
+    """
+    groups = {}
+    for keyword, industry_keywords in tasks:
+        group_key = tuple(t.lower() for t in _dedupe(industry_keywords or []))
+        group = groups.setdefault(group_key, {'industry_terms': industry_keywords or [], 'keywords': []})
+        group['keywords'].append(keyword)
+
+    plans = {}
+    for group in groups.values():
+        by_term = {}
+        for keyword in group['keywords']:
+            by_term.setdefault(keyword.keyword.lower(), []).append(keyword)
+
+        for query, chunk in build_queries(
+            [k.keyword for k in group['keywords']], group['industry_terms'], max_length
+        ):
+            covered = plans.setdefault(query, [])
+            for term in chunk:
+                for keyword in by_term.get(term.lower(), []):
+                    if keyword not in covered:
+                        covered.append(keyword)
+
+    return [QueryPlan(query, keywords) for query, keywords in plans.items()]
+
+
+def page_size_for(plan, limit):
+    """
+    合併後的查詢需要涵蓋每個關鍵字原本的篇數
+    """
+    return min(MAX_PAGE_SIZE, limit * max(len(plan.keywords), 1))
+
+
+def attribute_articles(articles, keywords):
+    """
+    在本地將查詢結果分配回各個關鍵字：標題或描述中含有關鍵字即歸屬該關鍵字。
+    回傳 {url: [Keyword, ...]}，找不到歸屬的文章不會出現在結果中
+    """
+    terms = [(keyword, keyword.keyword.lower()) for keyword in keywords]
+    attributed = {}
+    for article in articles:
+        url = article.get('url')
+        if not url:
+            continue
+        text = f"{article.get('title') or ''} {article.get('description') or ''}".lower()
+        matched = [keyword for keyword, term in terms if term and term in text]
+        if matched:
+            attributed[url] = matched
+    return attributed
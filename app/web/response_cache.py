@@ -0,0 +1,133 @@
+# web/response_cache.py
+
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+
+# 這些參數決定 API 回應內容；apiKey 等其他參數不列入快取鍵
+CACHE_KEY_PARAMS = ('q', 'language', 'sortBy', 'pageSize', 'from', 'page')
+
+
+def cache_key(params):
+    """
+    將請求參數正規化後轉為快取鍵：查詢字串忽略大小寫與多餘空白
+    """
+    normalized = {}
+    for name in CACHE_KEY_PARAMS:
+        value = params.get(name)
+        if value is None or value == '':
+            continue
+        if name == 'q':
+            value = re.sub(r'\s+', ' ', str(value)).strip().lower()
+        normalized[name] = str(value)
+    payload = json.dumps(normalized, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
+class ResponseCache:
+    """
+    存放在本機 SQLite 檔案中的 API 回應快取，同一台主機上的 uwsgi worker 共用。
+    超過 ttl 秒的項目視為過期；項目數超過 max_entries 時淘汰最久未使用的項目。
+    """
+
+    def __init__(self, path, ttl=300, max_entries=1000):
+        self.path = str(path)
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'evictions': 0}
+
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        with self._connection() as conn:
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS responses ('
+                ' key TEXT PRIMARY KEY,'
+                ' created_at REAL NOT NULL,'
+                ' accessed_at REAL NOT NULL,'
+                ' body TEXT NOT NULL)'
+            )
+            conn.execute('CREATE INDEX IF NOT EXISTS responses_created_at ON responses (created_at)')
+            conn.execute('CREATE INDEX IF NOT EXISTS responses_accessed_at ON responses (accessed_at)')
+
+    def _connection(self):
+        # sqlite3 連線不能跨執行緒共用，每個執行緒各自開啟
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def _record(self, key, value=1):
+        with self._lock:
+            self._stats[key] += value
+
+    def get(self, params):
+        """
+        回傳未過期的快取內容，沒有命中時回傳 None
+        """
+        key = cache_key(params)
+        now = time.time()
+        try:
+            with self._connection() as conn:
+                row = conn.execute(
+                    'SELECT body FROM responses WHERE key = ? AND created_at > ?',
+                    (key, now - self.ttl),
+                ).fetchone()
+                if row is not None:
+                    conn.execute('UPDATE responses SET accessed_at = ? WHERE key = ?', (now, key))
+        except sqlite3.Error:
+            row = None
+
+        if row is None:
+            self._record('misses')
+            return None
+        self._record('hits')
+        return json.loads(row[0])
+
+    def set(self, params, data):
+        key = cache_key(params)
+        now = time.time()
+        try:
+            with self._connection() as conn:
+                conn.execute(
+                    'INSERT OR REPLACE INTO responses (key, created_at, accessed_at, body) '
+                    'VALUES (?, ?, ?, ?)',
+                    (key, now, now, json.dumps(data, ensure_ascii=False)),
+                )
+                # 先清除過期項目，仍超過上限時淘汰最久未使用的項目
+                conn.execute('DELETE FROM responses WHERE created_at <= ?', (now - self.ttl,))
+                (count,) = conn.execute('SELECT COUNT(*) FROM responses').fetchone()
+                if count > self.max_entries:
+                    cursor = conn.execute(
+                        'DELETE FROM responses WHERE key IN ('
+                        ' SELECT key FROM responses ORDER BY accessed_at LIMIT ?)',
+                        (count - self.max_entries,),
+                    )
+                    self._record('evictions', cursor.rowcount)
+        except sqlite3.Error:
+            # 快取寫入失敗不影響正常抓取
+            pass
+
+    def clear(self):
+        with self._connection() as conn:
+            conn.execute('DELETE FROM responses')
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        try:
+            (stats['entries'],) = self._connection().execute(
+                'SELECT COUNT(*) FROM responses'
+            ).fetchone()
+        except sqlite3.Error:
+            stats['entries'] = None
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = stats['hits'] / lookups if lookups else 0.0
+        return stats
@@ -0,0 +1,108 @@
+# web/result_cache.py
+
+import hashlib
+
+from django.conf import settings
+from django.core.cache import caches
+
+from modelCore.models import NewsArticle
+from modelCore.versions import CORPUS, TAXONOMY, get_version
+
+from . import metrics
+from .pagination import ARTICLE_ORDERING
+
+RESULT_CACHE_ALIAS = 'results'
+
+
+def normalize_filters(industry_name, keyword_list, time_range, start_date=None, collapse=False):
+    """
+    將篩選條件正規化為快取鍵使用的 tuple：忽略大小寫、關鍵字順序與重複。
+    時間範圍以分鐘為單位，讓同一分鐘內的請求共用結果
+    """
+    return (
+        (industry_name or '').strip().lower(),
+        tuple(sorted({k.strip().lower() for k in keyword_list or [] if k.strip()})),
+        time_range or 'all',
+        start_date.strftime('%Y-%m-%dT%H:%M') if start_date else '',
+        bool(collapse),
+    )
+
+
+def _cache_key(filters):
+    digest = hashlib.sha1(repr(filters).encode('utf-8')).hexdigest()
+    # 版本號寫入快取鍵：文章或字庫有變動時舊項目自然失效
+    return f'news:{get_version(TAXONOMY)}:{get_version(CORPUS)}:{digest}'
+
+
+class CachedResults:
+    """
+    快取的篩選結果：依列表順序排列的 (published_at, id)，以及總數。
+    分頁時在快取中找到游標位置後直接切片，超出快取範圍時由呼叫端改查資料庫
+    """
+
+    def __init__(self, rows, total, queryset, estimated=False):
+        self.rows = rows
+        self.total = total
+        self.estimated = estimated
+        self.queryset = queryset
+        self._index = {article_id: i for i, (_, article_id) in enumerate(rows)}
+
+    def count(self):
+        return self.total
+
+    def window(self, cursor, direction, per_page):
+        """
+        回傳 (文章列表, has_next, has_previous)；無法由快取提供時回傳 None
+        """
+        if cursor is None:
+            start = 0
+        else:
+            position = self._index.get(cursor[1])
+            if position is None:
+                return None
+            start = max(0, position - per_page) if direction == 'prev' else position + 1
+        end = start + per_page
+        if direction == 'prev' and cursor is not None:
+            end = min(end, position)
+
+        truncated = len(self.rows) < self.total or self.estimated
+        if end > len(self.rows) and truncated:
+            return None
+
+        page_ids = [article_id for _, article_id in self.rows[start:end]]
+        articles = NewsArticle.objects.in_bulk(page_ids)
+        page = [articles[article_id] for article_id in page_ids if article_id in articles]
+        has_next = end < len(self.rows) or truncated
+        return page, has_next, start > 0
+
+
+def get_results(filters, queryset):
+    """
+    取得篩選結果。命中快取時不需執行查詢與 count()；
+    未命中時查詢前 NEWS_RESULT_CACHE_MAX_IDS 筆並存入快取。
+    結果超過上限時，只有 NEWS_EXACT_TOTALS 開啟才計算精確總數，否則以上限作為估計值
+    """
+    cache = caches[RESULT_CACHE_ALIAS]
+    max_ids = getattr(settings, 'NEWS_RESULT_CACHE_MAX_IDS', 1000)
+    key = _cache_key(filters)
+
+    entry = cache.get(key)
+    if entry is not None:
+        metrics.RESULT_CACHE.inc(result='hit')
+        return CachedResults(entry['rows'], entry['count'], queryset, entry['estimated'])
+
+    metrics.RESULT_CACHE.inc(result='miss')
+    rows = list(
+        queryset.order_by(*ARTICLE_ORDERING).values_list('published_at', 'id')[:max_ids + 1]
+    )
+    estimated = False
+    if len(rows) <= max_ids:
+        total = len(rows)
+    elif getattr(settings, 'NEWS_EXACT_TOTALS', False):
+        total = queryset.count()
+    else:
+        total = max_ids
+        estimated = True
+    rows = rows[:max_ids]
+    cache.set(key, {'rows': rows, 'count': total, 'estimated': estimated})
+    return CachedResults(rows, total, queryset, estimated)
@@ -0,0 +1,247 @@
+# web/scheduler.py
+
+import heapq
+import time
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from modelCore.models import Keyword, KeywordSchedule
+
+from .ingest import ingest_articles
+from .management.commands.fetch_news import fetch_concurrently, update_checkpoints
+from .query_planner import attribute_articles, plan_queries
+
+# 沒有新文章時間隔放大的倍數；抓取失敗時放大的倍數
+IDLE_BACKOFF = 1.5
+ERROR_BACKOFF = 2.0
+# 有新文章時間隔最多縮短為原本的幾分之一
+MAX_SPEEDUP = 4.0
+# 平均新增文章數的平滑係數
+YIELD_SMOOTHING = 0.3
+
+
+def scheduler_settings(**overrides):
+    """
+    合併 settings.NEWS_SCHEDULER 與命令列參數
+    """
+    options = {
+        'MIN_INTERVAL': 10 * 60,
+        'MAX_INTERVAL': 24 * 60 * 60,
+        'INITIAL_INTERVAL': 60 * 60,
+        'REQUESTS_PER_HOUR': 50,
+    }
+    options.update(getattr(settings, 'NEWS_SCHEDULER', {}))
+    options.update({k: v for k, v in overrides.items() if v is not None})
+    return options
+
+
+def adapt_interval(interval, new_articles, error=False, min_interval=600, max_interval=86400):
+    """
+    依此次抓取結果計算下一次的間隔：
+    失敗或沒有新文章時拉長間隔，新文章越多縮得越短，結果限制在 [min_interval, max_interval]
+    """
+    if error:
+        interval *= ERROR_BACKOFF
+    elif new_articles <= 0:
+        interval *= IDLE_BACKOFF
+    else:
+        interval /= min(MAX_SPEEDUP, 1 + new_articles / 2)
+    return int(min(max(interval, min_interval), max_interval))
+
+
+class TokenBucket:
+    """
+    每小時請求數上限：以固定速率補充額度，最多累積 capacity 次
+    """
+
+    def __init__(self, per_hour, capacity=None, clock=time.monotonic):
+        self.rate = per_hour / 3600
+        self.capacity = capacity if capacity is not None else max(1.0, per_hour / 12)
+        self.clock = clock
+        self.tokens = self.capacity
+        self.updated = clock()
+
+    def _refill(self):
+        now = self.clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount=1):
+        """
+        取得 amount 次額度前需要等待的秒數
+        """
+        self._refill()
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.rate if self.rate else float('inf')
+
+    def consume(self, amount):
+        """
+        扣除實際使用的請求數，可能扣成負數，之後的請求會等待更久
+        """
+        self._refill()
+        self.tokens -= amount
+
+
+class FetchScheduler:
+    """
+    以優先佇列（依下次抓取時間排序）排程各關鍵字的抓取。
+    同時到期的關鍵字會合併成查詢一起抓取；狀態存放在 KeywordSchedule，重新啟動後可接續
+    """
+
+    def __init__(self, client, options=None, limit=5, max_pages=3, batch_size=20, log=None):
+        self.client = client
+        self.options = options or scheduler_settings()
+        self.limit = limit
+        self.max_pages = max_pages
+        self.batch_size = batch_size
+        self.bucket = TokenBucket(self.options['REQUESTS_PER_HOUR'])
+        self.log = log or (lambda message: None)
+        self.heap = []
+
+    def sync_schedules(self):
+        """
+        為尚未排程的關鍵字建立排程，並由資料庫重建佇列；回傳新建的排程數
+        """
+        now = timezone.now()
+        # ignore_conflicts 的 bulk_create 會回傳所有傳入的物件（包含衝突而略過的），
+        # 因此以建立前尚無排程的關鍵字計算數量
+        missing = set(Keyword.objects.values_list('id', flat=True)) - set(
+            KeywordSchedule.objects.values_list('keyword_id', flat=True)
+        )
+        KeywordSchedule.objects.bulk_create(
+            [
+                KeywordSchedule(
+                    keyword_id=keyword_id,
+                    interval=self.options['INITIAL_INTERVAL'],
+                    next_fetch_at=now,
+                )
+                for keyword_id in sorted(missing)
+            ],
+            ignore_conflicts=True,
+        )
+        self.heap = [
+            (next_fetch_at.timestamp(), keyword_id)
+            for keyword_id, next_fetch_at in KeywordSchedule.objects.values_list(
+                'keyword_id', 'next_fetch_at'
+            )
+        ]
+        heapq.heapify(self.heap)
+        return len(missing)
+
+    def seconds_until_due(self):
+        """
+        距離最早到期的關鍵字還有幾秒；佇列為空時回傳 None
+        """
+        if not self.heap:
+            return None
+        return max(0.0, self.heap[0][0] - time.time())
+
+    def pop_due(self):
+        """
+        取出已到期的排程（最多 batch_size 個），略過已刪除或已被改期的項目
+        """
+        now = time.time()
+        due = {}
+        while self.heap and self.heap[0][0] <= now and len(due) < self.batch_size:
+            scheduled_at, keyword_id = heapq.heappop(self.heap)
+            due[keyword_id] = scheduled_at
+        if not due:
+            return []
+
+        schedules = []
+        for schedule in KeywordSchedule.objects.filter(keyword_id__in=list(due)).select_related(
+            'keyword__industry'
+        ):
+            if abs(schedule.next_fetch_at.timestamp() - due[schedule.keyword_id]) > 1:
+                # 佇列中的時間已過時（例如重新同步後），以資料庫的時間重新排入
+                heapq.heappush(self.heap, (schedule.next_fetch_at.timestamp(), schedule.keyword_id))
+                continue
+            schedules.append(schedule)
+        return schedules
+
+    def _record(self, schedules, new_counts, error=False):
+        """
+        更新排程的間隔與下次抓取時間，並立即寫回資料庫
+        """
+        now = timezone.now()
+        for schedule in schedules:
+            new_articles = new_counts.get(schedule.keyword_id, 0)
+            schedule.interval = adapt_interval(
+                schedule.interval, new_articles, error,
+                self.options['MIN_INTERVAL'], self.options['MAX_INTERVAL'],
+            )
+            schedule.next_fetch_at = now + timedelta(seconds=schedule.interval)
+            schedule.last_fetched_at = now
+            if error:
+                schedule.error_count += 1
+            else:
+                schedule.error_count = 0
+                schedule.fetch_count += 1
+                schedule.last_new_articles = new_articles
+                schedule.avg_new_articles += YIELD_SMOOTHING * (
+                    new_articles - schedule.avg_new_articles
+                )
+            heapq.heappush(self.heap, (schedule.next_fetch_at.timestamp(), schedule.keyword_id))
+
+        KeywordSchedule.objects.bulk_update(
+            schedules,
+            ['interval', 'next_fetch_at', 'last_fetched_at', 'last_new_articles',
+             'avg_new_articles', 'fetch_count', 'error_count'],
+        )
+
+    def run_batch(self, schedules, sleep=time.sleep):
+        """
+        抓取一批到期的關鍵字，回傳此批次新增的文章數
+        """
+        by_keyword = {schedule.keyword_id: schedule for schedule in schedules}
+        tasks = []
+        for schedule in schedules:
+            keyword = schedule.keyword
+            industry_keywords = None
+            if keyword.industry:
+                industry_keywords = [k.keyword for k in keyword.industry.keywords.all()]
+            tasks.append((keyword, industry_keywords))
+
+        total_created = 0
+        plans = plan_queries(tasks)
+        fetches = fetch_concurrently(
+            self.client, plans, self.limit, incremental=True, max_pages=self.max_pages
+        )
+        for _ in plans:
+            # 每個查詢前確認還有請求額度；查詢在 next() 時才會送出
+            wait = self.bucket.wait_time()
+            if wait > 0:
+                self.log(f"已達每小時請求上限，等待 {wait:.0f} 秒")
+                sleep(wait)
+            requests_before = self.client.get_stats()['requests']
+            plan, data, error, latency = next(fetches)
+            self.bucket.consume(self.client.get_stats()['requests'] - requests_before)
+
+            plan_schedules = [by_keyword[k.id] for k in plan.keywords if k.id in by_keyword]
+            if error:
+                self.log(f"{error}（{latency * 1000:.0f} ms）")
+                self._record(plan_schedules, {}, error=True)
+                continue
+
+            articles = data.get('articles', [])
+            keywords_by_url = attribute_articles(articles, plan.keywords)
+            stats = ingest_articles(articles, keywords_by_url=keywords_by_url)
+            update_checkpoints(plan, articles)
+
+            # 以新文章被分配到的關鍵字計算各關鍵字的產出
+            new_counts = Counter(
+                keyword.id
+                for url in stats['created_urls']
+                for keyword in keywords_by_url.get(url, [])
+            )
+            self._record(plan_schedules, new_counts)
+            total_created += stats['created']
+            self.log(
+                f"關鍵字「{'、'.join(k.keyword for k in plan.keywords)}」："
+                f"收到 {stats['received']} 篇，新增 {stats['created']} 篇"
+            )
+        return total_created
@@ -1,3 +1,233 @@
-from django.test import TestCase
+import os
+import re
+import tempfile
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from modelCore.bloom import reset_url_filter
+from modelCore.models import Industry, Keyword, NewsArticle
+
+from .benchmark import StubNewsAPI, SyntheticCorpus
 
 # Create your tests here.
+
+_TERM = re.compile(r'"([^"]+)"')
+
+# 測試不讀寫開發環境的檔案快取、指標、網址過濾器與待處理新詞
+ISOLATED_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'tests-default',
+    },
+    'results': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'tests-results',
+    },
+}
+
+
+class IsolatedTestCase(TestCase):
+    def setUp(self):
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        isolated = override_settings(
+            CACHES=ISOLATED_CACHES,
+            NEWS_API_CACHE=None,
+            NEWS_URL_FILTER={'PATH': f'{temp_dir.name}/urls.bloom'},
+            NEWS_PENDING_TERMS_PATH=f'{temp_dir.name}/pending_terms.jsonl',
+            NEWS_METRICS={'DIR': None},
+        )
+        isolated.enable()
+        self.addCleanup(isolated.disable)
+        reset_url_filter()
+        self.addCleanup(reset_url_filter)
+        self.temp_dir = temp_dir.name
+
+
+class FetchNewsConcurrencyTests(IsolatedTestCase):
+    def setUp(self):
+        super().setUp()
+        self.corpus = SyntheticCorpus(seed=1, industries=3, keywords=9, articles=0)
+        for industry_name in self.corpus.industries:
+            industry = Industry.objects.create(name=industry_name)
+            for keyword in self.corpus.industry_keywords[industry_name]:
+                Keyword.objects.create(keyword=keyword, industry=industry)
+
+        self.stub = StubNewsAPI(self.corpus, duplicate_ratio=0)
+        self.stub.__enter__()
+        self.addCleanup(self.stub.__exit__)
+
+        environ = mock.patch.dict(os.environ, {'NEWS_API_URL': self.stub.url, 'NEWS_API_KEY': 'test'})
+        environ.start()
+        self.addCleanup(environ.stop)
+
+    def test_concurrent_fetch_ingests_articles(self):
+        call_command('fetch_news', concurrency=3, stdout=StringIO(), stderr=StringIO())
+
+        # 每個關鍵字只出現在一個查詢的關鍵字群組（AND 之後）中
+        requested = sorted(
+            term for query in self.stub.queries
+            for term in _TERM.findall(query.split(' AND ')[-1])
+        )
+        self.assertEqual(requested, sorted(keyword for keyword, _ in self.corpus.keywords))
+
+        # 伺服器回傳的每篇文章都已寫入，並依內容建立關聯
+        returned = self.corpus.articles(0, self.corpus._next_index)
+        self.assertEqual(
+            NewsArticle.objects.filter(url__startswith='https://bench.example/').count(),
+            len(returned),
+        )
+        self.assertTrue(NewsArticle.objects.filter(keywords__isnull=False).exists())
+
+
+class BackfillTests(IsolatedTestCase):
+    def run_jobs(self):
+        from .jobs import claim_next_job, run_job
+
+        while (job := claim_next_job()) is not None:
+            run_job(job, client=None)
+            self.assertEqual(job.status, job.STATUS_DONE, job.error)
+
+    def test_rename_moves_links_to_the_new_text(self):
+        industry = Industry.objects.create(name='半導體')
+        first = NewsArticle.objects.create(url='https://a.example/1', title='半導體 晶圓 擴產')
+        second = NewsArticle.objects.create(url='https://a.example/2', title='半導體 封裝 需求')
+
+        # 補建在交易提交後排入背景工作，儲存本身不比對文章
+        with self.captureOnCommitCallbacks(execute=True):
+            keyword = Keyword.objects.create(keyword='晶圓', industry=industry)
+        self.assertFalse(first.keywords.exists())
+        self.run_jobs()
+        self.assertEqual(list(first.keywords.all()), [keyword])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            keyword.keyword = '封裝'
+            keyword.save()
+        self.run_jobs()
+        self.assertFalse(first.keywords.exists())
+        self.assertEqual(list(second.keywords.all()), [keyword])
+
+
+class ExecuteFetchTests(IsolatedTestCase):
+    def test_industry_is_case_insensitive_and_queries_fit_the_limit(self):
+        from .jobs import execute_fetch
+        from .management.commands.fetch_news import NewsAPIClient
+        from .query_planner import MAX_QUERY_LENGTH
+
+        industry = Industry.objects.create(name='AI')
+        for i in range(60):
+            Keyword.objects.create(keyword=f'machine learning topic {i}', industry=industry)
+
+        corpus = SyntheticCorpus(seed=2, industries=2, keywords=4, articles=0)
+        with StubNewsAPI(corpus, duplicate_ratio=0) as stub:
+            client = NewsAPIClient(cache=False, max_retries=0)
+            client.api_url = stub.url
+            try:
+                result = execute_fetch({'industry': 'ai', 'keywords': []}, client)
+            finally:
+                client.close()
+
+        self.assertGreater(len(stub.queries), 1)
+        for query in stub.queries:
+            self.assertLessEqual(len(query), MAX_QUERY_LENGTH)
+            # 以產業的關鍵字限定範圍，表示產業名稱已正確對應
+            self.assertIn(' AND ', query)
+        self.assertEqual(result['fetched'], corpus._next_index)
+
+
+class IngestTests(IsolatedTestCase):
+    # 不使用網址過濾器，讓舊文章一定經過資料庫比對
+    @override_settings(NEWS_URL_FILTER={'PATH': None})
+    def test_existing_row_without_canonical_url_is_not_counted_as_created(self):
+        from .ingest import ingest_articles
+
+        old = NewsArticle.objects.create(url='https://a.example/story', title='舊文章')
+        NewsArticle.objects.filter(pk=old.pk).update(canonical_url=None)
+
+        stats = ingest_articles([
+            {'url': 'https://a.example/story', 'title': '舊文章', 'publishedAt': '2026-10-01T00:00:00Z'},
+            {'url': 'https://a.example/new', 'title': '新文章', 'publishedAt': '2026-10-01T00:00:00Z'},
+        ])
+        self.assertEqual(stats['created'], 1)
+        self.assertEqual(stats['duplicates'], 1)
+        self.assertEqual(stats['created_urls'], {'https://a.example/new'})
+
+
+class SchedulerTests(IsolatedTestCase):
+    OPTIONS = {
+        'MIN_INTERVAL': 600,
+        'MAX_INTERVAL': 86400,
+        'INITIAL_INTERVAL': 3600,
+        'REQUESTS_PER_HOUR': 60,
+    }
+
+    def setUp(self):
+        super().setUp()
+        from .scheduler import FetchScheduler
+
+        self.keywords = [Keyword.objects.create(keyword=f'排程{i}') for i in range(3)]
+        self.scheduler = FetchScheduler(client=None, options=dict(self.OPTIONS))
+
+    def test_adapt_interval_backs_off_and_speeds_up_within_bounds(self):
+        from .scheduler import adapt_interval
+
+        self.assertEqual(adapt_interval(3600, 0), 5400)
+        self.assertEqual(adapt_interval(3600, 0, error=True), 7200)
+        self.assertEqual(adapt_interval(3600, 2), 1800)
+        self.assertEqual(adapt_interval(3600, 100), 900)
+        self.assertEqual(adapt_interval(700, 100), 600)
+        self.assertEqual(adapt_interval(80000, 0, error=True), 86400)
+
+    def test_token_bucket_waits_for_refill(self):
+        from .scheduler import TokenBucket
+
+        now = [0.0]
+        bucket = TokenBucket(per_hour=3600, capacity=2, clock=lambda: now[0])
+        self.assertEqual(bucket.wait_time(), 0.0)
+        bucket.consume(3)
+        self.assertAlmostEqual(bucket.wait_time(), 2.0)
+        now[0] += 2
+        self.assertEqual(bucket.wait_time(), 0.0)
+
+    def test_sync_counts_only_new_schedules(self):
+        self.assertEqual(self.scheduler.sync_schedules(), 3)
+        self.assertEqual(self.scheduler.sync_schedules(), 0)
+        Keyword.objects.create(keyword='排程新增')
+        self.assertEqual(self.scheduler.sync_schedules(), 1)
+
+    def test_pop_due_returns_only_due_schedules_and_requeues_stale_entries(self):
+        from modelCore.models import KeywordSchedule
+
+        self.scheduler.sync_schedules()
+        later = timezone.now() + timedelta(hours=1)
+        KeywordSchedule.objects.filter(keyword=self.keywords[2]).update(next_fetch_at=later)
+        # 佇列中仍是舊的時間：取出時應以資料庫的時間重新排入，而不是抓取
+        due = self.scheduler.pop_due()
+        self.assertEqual(
+            sorted(schedule.keyword_id for schedule in due),
+            sorted(keyword.id for keyword in self.keywords[:2]),
+        )
+        self.assertEqual(self.scheduler.heap, [(later.timestamp(), self.keywords[2].id)])
+        self.assertEqual(self.scheduler.pop_due(), [])
+
+    def test_record_backs_off_on_error_and_resets_after_success(self):
+        from modelCore.models import KeywordSchedule
+
+        self.scheduler.sync_schedules()
+        schedules = self.scheduler.pop_due()
+        self.scheduler._record(schedules, {}, error=True)
+        schedule = KeywordSchedule.objects.get(keyword=self.keywords[0])
+        self.assertEqual(schedule.interval, 7200)
+        self.assertEqual(schedule.error_count, 1)
+        self.assertGreater(schedule.next_fetch_at, timezone.now() + timedelta(seconds=7100))
+
+        self.scheduler._record([schedule], {schedule.keyword_id: 4})
+        schedule.refresh_from_db()
+        self.assertEqual(schedule.interval, 2400)
+        self.assertEqual(schedule.error_count, 0)
+        self.assertEqual(schedule.last_new_articles, 4)
@@ -5,4 +5,7 @@ urlpatterns = [
     path('', views.filter_news, name='filter_news'),
     path('api/industries/', views.get_industries, name='get_industries'),
     path('api/keywords/', views.get_keywords, name='get_keywords'),
+    path('api/trends/', views.get_trends, name='get_trends'),
+    path('api/jobs/<int:job_id>/', views.get_job_status, name='get_job_status'),
+    path('metrics', views.get_metrics, name='metrics'),
 ]
\ No newline at end of file
@@ -1,53 +1,20 @@
-import re
 from django.shortcuts import render
 from django.db.models import Q
 from django.contrib import messages
-from django.core.paginator import Paginator
 from .forms import FilterForm
-from modelCore.models import NewsArticle, Keyword, Industry
-from .management.commands.fetch_news import NewsAPIClient, save_articles
+from modelCore.models import NewsArticle, Keyword, Industry, IndustryDailyCount, KeywordDailyCount, FetchJob
+from modelCore.clustering import collapse_clusters
+from modelCore.search import text_search_q
+from modelCore.text import clean_term, clean_text
+from .autocomplete import get_index
+from . import metrics
+from .jobs import enqueue_fetch, job_status
+from .pagination import ARTICLE_ORDERING, decode_cursor, paginate
+from .pending_terms import record_terms
+from .result_cache import get_results, normalize_filters
 from datetime import datetime, timedelta
-from django.http import JsonResponse
-
-def clean_text(text):
-    """
-    清理文字，移除不必要的符號和空白
-    """
-    if not text:
-        return ""
-    
-    # 如果是列表，取第一個元素
-    if isinstance(text, list):
-        text = text[0] if text else ""
-        
-    # 處理字符串
-    if isinstance(text, str):
-        # 如果文字看起來像列表字符串，嘗試解析它
-        if text.startswith('[') and text.endswith(']'):
-            try:
-                import ast
-                # 安全地解析字符串為Python對象
-                parsed = ast.literal_eval(text)
-                if isinstance(parsed, list) and parsed:
-                    text = parsed[0]
-            except:
-                pass
-        
-        # 移除可能的列表符號和引號
-        text = text.strip('[]\'\"')
-        # 移除額外的空白
-        text = text.strip()
-        
-        # 移除或替換特殊字符
-        text = re.sub(r'[-_]+', ' ', text)  # 將連字符和底線替換為空格
-        text = re.sub(r'\s+', ' ', text)    # 將多個空格替換為單個空格
-        text = text.strip()                  # 再次清理前後空白
-        
-        # 如果清理後的文字太短或只包含特殊字符或空白，返回空字符串
-        if not text or len(text) < 2 or not any(c.isalnum() for c in text):
-            return ""
-        
-    return text
+from django.http import HttpResponse, JsonResponse
+from django.utils import timezone
 
 def create_or_get_industry(name):
     """
@@ -57,7 +24,7 @@ def create_or_get_industry(name):
         return None
     
     # 清理產業名稱
-    name = clean_text(name)
+    name = clean_term(name)
     if not name or len(name) < 1:
         return None
         
@@ -75,20 +42,20 @@ def create_or_get_keywords(keyword_str, industry=None):
     # 如果是字符串，先分割成列表
     if isinstance(keyword_str, str):
         # 清理並分割關鍵字
-        keyword_str = clean_text(keyword_str)
+        keyword_str = clean_term(keyword_str)
         if not keyword_str:  # 如果清理後為空，直接返回
             return []
-        keyword_list = [clean_text(k) for k in keyword_str.split(',')]
+        keyword_list = [clean_term(k) for k in keyword_str.split(',')]
     else:
         # 如果已經是列表，清理每個元素
-        keyword_list = [clean_text(k) for k in keyword_str]
+        keyword_list = [clean_term(k) for k in keyword_str]
     
     # 過濾掉空白或無效的關鍵字
     keyword_list = [k for k in keyword_list if k and len(k) >= 2 and not k.isspace()]
     
     # 創建或獲取每個關鍵字
     for kw in keyword_list:
-        kw = clean_text(kw)  # 再次清理確保乾淨
+        kw = clean_term(kw)  # 再次清理確保乾淨
         if kw and len(kw) >= 2 and not kw.isspace():  # 確保關鍵字有效
             # 檢查是否已存在相同的關鍵字（不區分大小寫）
             existing_keyword = Keyword.objects.filter(keyword__iexact=kw).first()
@@ -109,19 +76,58 @@ def create_or_get_keywords(keyword_str, industry=None):
                     continue
     return keywords
 
+def build_article_filter(industry_name, keyword_list):
+    """
+    組合文章篩選條件。
+    關聯條件以中介表子查詢表示、文字條件走全文索引，
+    不需要 JOIN，也就不需要 distinct()
+    """
+    through_industries = NewsArticle.industries.through.objects
+    through_keywords = NewsArticle.keywords.through.objects
+    q = Q()
+    
+    # 處理產業篩選
+    if industry_name:
+        # 先查找產業關聯的文章
+        industry_q = Q(id__in=through_industries.filter(
+            industry__name=industry_name).values('newsarticle_id'))
+        # 再查找標題或描述中包含產業名稱的文章
+        text_q = text_search_q([industry_name])
+        # 查找該產業下所有關鍵字關聯的文章（子查詢在資料庫端執行，不需先確認是否存在）
+        keywords_q = Q(id__in=through_keywords.filter(
+            keyword__industry__name=industry_name).values('newsarticle_id'))
+        q = industry_q | text_q | keywords_q
+    
+    # 處理關鍵字篩選
+    if keyword_list:
+        # 查找關鍵字關聯的文章
+        keyword_q = Q(id__in=through_keywords.filter(
+            keyword__keyword__in=keyword_list).values('newsarticle_id'))
+        # 查找標題或描述中包含關鍵字的文章
+        keyword_q |= text_search_q(keyword_list)
+        
+        # 如果同時有產業和關鍵字，使用 AND (&) 運算符
+        if industry_name:
+            q &= keyword_q
+        else:
+            q = keyword_q
+    return q
+
 def filter_news(request):
     form = FilterForm(request.GET or None)
-    articles = NewsArticle.objects.all().order_by('-published_at')
-    total_new_articles = 0  # 初始化變數
+    articles = NewsArticle.objects.order_by(*ARTICLE_ORDERING)
+    # 結果快取使用的正規化篩選條件
+    filters = normalize_filters('', [], 'all')
+    fetch_job = None
     
     if form.is_valid():
         industry_name = form.cleaned_data.get('industry')
         # 清理產業名稱
-        industry_name = clean_text(industry_name)
+        industry_name = clean_term(industry_name)
         
         keyword_list = form.cleaned_data.get('keywords', [])
         # 清理關鍵字列表，並移除無效的關鍵字
-        keyword_list = [k for k in [clean_text(k) for k in keyword_list] if k and len(k) >= 2 and not k.isspace()]
+        keyword_list = [k for k in [clean_term(k) for k in keyword_list] if k and len(k) >= 2 and not k.isspace()]
         
         fetch_new = form.cleaned_data.get('fetch_new', False)
         time_range = form.cleaned_data.get('time_range', 'all')
@@ -140,234 +146,153 @@ def filter_news(request):
             
             if start_date:
                 articles = articles.filter(published_at__gte=start_date)
+        else:
+            start_date = None
+        
+        collapse = form.cleaned_data.get('collapse', False)
+        filters = normalize_filters(industry_name, keyword_list, time_range, start_date, collapse)
         
         if fetch_new:
-            # 獲取最新新聞
-            client = NewsAPIClient()
-            keywords_to_fetch = set()
-
-            # 處理產業關鍵字
-            if industry_name and len(industry_name) >= 2 and not industry_name.isspace():
-                # 嘗試獲取現有產業
-                industry = Industry.objects.filter(name=industry_name).first()
-                if industry:
-                    # 如果產業存在，獲取其關鍵字
-                    industry_keywords = Keyword.objects.filter(industry=industry)
-                    keywords_to_fetch.update(k.keyword for k in industry_keywords if k.keyword and len(k.keyword) >= 2 and not k.keyword.isspace())
-                else:
-                    # 如果產業不存在，直接使用產業名稱作為關鍵字
-                    keywords_to_fetch.add(industry_name)
-                    # 創建新產業和關鍵字
-                    industry = Industry.objects.create(name=industry_name)
-                    # 檢查是否已存在相同的關鍵字
-                    existing_keyword = Keyword.objects.filter(keyword__iexact=industry_name).first()
-                    if not existing_keyword and len(industry_name) >= 2 and not industry_name.isspace():
-                        keyword = Keyword.objects.create(keyword=industry_name, industry=industry)
-                        messages.success(request, f"已新增產業類別：{industry_name}")
+            # 新詞先記錄，由背景工作在抓取前批次建立
+            if industry_name and not get_index().has_industry(industry_name):
+                # 產業不存在時，以產業名稱作為該產業的第一個關鍵字
+                record_terms(industry_name, [industry_name])
+            record_terms(industry_name, keyword_list)
 
-            # 處理一般關鍵字
-            for kw in keyword_list:
-                kw = clean_text(kw)
-                if kw and len(kw) >= 2 and not kw.isspace():
-                    keywords_to_fetch.add(kw)
-                    # 檢查是否已存在相同的關鍵字
-                    keyword_obj = Keyword.objects.filter(keyword__iexact=kw).first()
-                    if not keyword_obj:
-                        try:
-                            keyword_obj = Keyword.objects.create(
-                                keyword=kw,
-                                industry=industry if industry_name else None
-                            )
-                            messages.success(request, f"已新增關鍵字：{kw}")
-                        except Exception as e:
-                            print(f"Error creating keyword '{kw}': {str(e)}")
-                            continue
-
-            if not keywords_to_fetch:
+            if not (industry_name or keyword_list):
                 messages.warning(request, "請選擇至少一個產業或關鍵字來獲取新聞")
             else:
-                # 分離產業關鍵字和一般關鍵字
-                industry_keywords = None
-                search_keywords = []
-                
-                if industry_name:
-                    industry = Industry.objects.filter(name=industry_name).first()
-                    if industry:
-                        industry_keywords = [k.keyword for k in Keyword.objects.filter(industry=industry)]
-                
-                # 只使用用戶選擇的關鍵字進行搜尋
-                search_keywords = keyword_list if keyword_list else [industry_name]
-                
-                # 一次性獲取所有關鍵字的新聞
-                data, error = client.fetch_news(
-                    search_keywords,
-                    industry_keywords=industry_keywords,
-                    limit=10
-                )
-                
-                if error:
-                    messages.error(request, error)
-                else:
-                    total_fetched = len(data.get('articles', [])) if data and 'articles' in data else 0
-                    
-                    if total_fetched > 0:
-                        # 為每個關鍵字建立關聯
-                        saved_articles = []  # 用於存儲新保存的文章
-                        for keyword in keywords_to_fetch:
-                            keyword_obj = Keyword.objects.filter(keyword=keyword).first()
-                            if keyword_obj and data and 'articles' in data:
-                                saved_count = save_articles(data.get('articles', []), keyword_obj)
-                                total_new_articles += saved_count
-                        
-                        if total_new_articles > 0:
-                            messages.success(request, f"成功獲取 {total_new_articles} 篇最新新聞！")
-                            
-                            # 根據當前的篩選條件重新查詢文章
-                            q = Q()
-                            
-                            # 處理產業篩選
-                            if industry_name:
-                                industry_q = Q(industries__name=industry_name)
-                                text_q = Q(title__icontains=industry_name) | Q(description__icontains=industry_name)
-                                industry_keywords = Keyword.objects.filter(industry__name=industry_name)
-                                if industry_keywords.exists():
-                                    keywords_q = Q(keywords__in=industry_keywords)
-                                    q = industry_q | text_q | keywords_q
-                                else:
-                                    q = industry_q | text_q
-                            
-                            # 處理關鍵字篩選
-                            if keyword_list:
-                                keyword_q = Q()
-                                for keyword in keyword_list:
-                                    keyword_q |= Q(keywords__keyword=keyword)
-                                    keyword_q |= Q(title__icontains=keyword) | Q(description__icontains=keyword)
-                                
-                                if industry_name:
-                                    q &= keyword_q
-                                else:
-                                    q = keyword_q
-                            
-                            # 使用篩選條件查詢文章
-                            if q:
-                                articles = NewsArticle.objects.filter(q).distinct().order_by('-published_at')
-                            else:
-                                articles = NewsArticle.objects.all().order_by('-published_at')
-                        else:
-                            messages.info(request, "找到的文章都已經存在，沒有新增新聞")
-                    else:
-                        messages.info(request, "沒有找到相關的新聞文章")
-        
+                # 抓取交由 run_worker 執行，相同條件的工作會合併；頁面透過狀態 API 輪詢結果
+                fetch_job, created = enqueue_fetch(industry_name, keyword_list)
+                messages.info(request, "已排入抓取工作，完成後會自動更新列表")
+        else:
+            # 瀏覽時不寫入資料庫：新詞先記錄，由 flush_pending_terms 在背景批次建立
+            record_terms(industry_name)
+            record_terms(keywords=keyword_list)
+
         # 篩選文章
-        q = Q()
-        
-        # 處理產業篩選
-        if industry_name:
-            # 先查找產業關聯的文章
-            industry_q = Q(industries__name=industry_name)
-            # 再查找標題或描述中包含產業名稱的文章
-            text_q = Q(title__icontains=industry_name) | Q(description__icontains=industry_name)
-            # 查找該產業下所有關鍵字關聯的文章
-            industry_keywords = Keyword.objects.filter(industry__name=industry_name)
-            if industry_keywords.exists():
-                keywords_q = Q(keywords__in=industry_keywords)
-                q = industry_q | text_q | keywords_q
-            else:
-                q = industry_q | text_q
-        
-        # 處理關鍵字篩選
-        if keyword_list:
-            keyword_q = Q()
-            for keyword in keyword_list:
-                # 查找關鍵字關聯的文章
-                keyword_q |= Q(keywords__keyword=keyword)
-                # 查找標題或描述中包含關鍵字的文章
-                keyword_q |= Q(title__icontains=keyword) | Q(description__icontains=keyword)
-            
-            # 如果同時有產業和關鍵字，使用 AND (&) 運算符
-            if industry_name:
-                q &= keyword_q
-            else:
-                q = keyword_q
-        
+        q = build_article_filter(industry_name, keyword_list)
         if q:
-            articles = articles.filter(q).distinct()  # 使用 distinct() 去除重複
+            articles = articles.filter(q)
+        # 同一則新聞的多個來源只保留一篇
+        if collapse:
+            articles = collapse_clusters(articles)
     
-    # 分頁處理
-    page_number = request.GET.get('page', 1)
-    paginator = Paginator(articles, 10)
-    page_obj = paginator.get_page(page_number)
+    # 游標分頁：以 (published_at, id) 為鍵，深層頁面與第一頁成本相同
+    cursor = decode_cursor(request.GET.get('cursor'))
+    direction = request.GET.get('dir', 'next')
+    results = get_results(filters, articles)
+    page_obj = paginate(results, cursor, direction, per_page=10)
+    
+    # 分頁連結沿用目前的篩選條件（不重複排入抓取工作）
+    filter_query = request.GET.copy()
+    for key in ('cursor', 'dir', 'page', 'fetch_new'):
+        filter_query.pop(key, None)
     
     # 對當前頁的文章進行預處理
     for article in page_obj:
-        article.description = clean_text(article.description)
+        article.description = clean_term(article.description)
     
     context = {
         'form': form,
         'page_obj': page_obj,
-        'total_count': articles.count(),
-        'current_filters': request.GET.dict(),
+        'total_count': results.count(),
+        'total_estimated': results.estimated,
+        'filter_query': filter_query.urlencode(),
+        'fetch_job': fetch_job,
     }
     return render(request, 'filter_news.html', context)
 
+def get_job_status(request, job_id):
+    """抓取工作的狀態，供頁面輪詢"""
+    job = FetchJob.objects.filter(id=job_id).first()
+    if job is None:
+        return JsonResponse({'error': '找不到此工作'}, status=404)
+    return JsonResponse(job_status(job))
+
+def get_metrics(request):
+    """
+    以 Prometheus 文字格式輸出所有行程合計的指標。
+    只開放給 NEWS_METRICS['ALLOWED_IPS'] 中的位址與管理員；經由本機 nginx 轉送的請求以 X-Real-IP 判斷
+    """
+    client_ip = request.META.get('REMOTE_ADDR')
+    if client_ip in ('127.0.0.1', '::1'):
+        client_ip = request.META.get('HTTP_X_REAL_IP', client_ip)
+    allowed = metrics.metrics_settings()['ALLOWED_IPS']
+    if client_ip not in allowed and not request.user.is_staff:
+        return HttpResponse(status=403)
+    return HttpResponse(metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+def get_trends(request):
+    """
+    產業與關鍵字的每日文章數量，供時間序列圖表使用。
+    參數：industry、keyword（可重複，未指定時回傳所有產業）、days（預設 30，最多 365）
+    """
+    try:
+        days = min(max(int(request.GET.get('days', 30)), 1), 365)
+    except ValueError:
+        days = 30
+    end = timezone.localdate()
+    start = end - timedelta(days=days - 1)
+    dates = [start + timedelta(days=i) for i in range(days)]
+
+    industry_names = [n for n in request.GET.getlist('industry') if n]
+    keyword_names = [k for k in request.GET.getlist('keyword') if k]
+
+    def build_series(rows):
+        series = {}
+        for name, day, count in rows:
+            series.setdefault(name, {})[day] = count
+        return [
+            {
+                'name': name,
+                'series': [{'date': d.isoformat(), 'count': counts.get(d, 0)} for d in dates],
+            }
+            for name, counts in sorted(series.items())
+        ]
+
+    data = {'start': start.isoformat(), 'end': end.isoformat()}
+
+    if industry_names or not keyword_names:
+        industry_rows = IndustryDailyCount.objects.filter(day__gte=start, day__lte=end)
+        if industry_names:
+            industry_rows = industry_rows.filter(industry__name__in=industry_names)
+        data['industries'] = build_series(
+            industry_rows.values_list('industry__name', 'day', 'count')
+        )
+
+    if keyword_names:
+        keyword_rows = KeywordDailyCount.objects.filter(
+            day__gte=start, day__lte=end, keyword__keyword__in=keyword_names
+        )
+        data['keywords'] = build_series(
+            keyword_rows.values_list('keyword__keyword', 'day', 'count')
+        )
+
+    return JsonResponse(data)
+
 def get_industries(request):
     """獲取產業建議列表"""
-    query = request.GET.get('q', '')
-    industries = Industry.objects.filter(name__icontains=query)[:10]
-    return JsonResponse(list(industries.values('name')), safe=False)
+    raw_query = request.GET.get('q', '').strip()
+    # 單一字元（例如「半」）也要篩選，因此不用 clean_term；只有真的沒有輸入時才列出全部
+    query = clean_text(raw_query)
+    if raw_query and not query:
+        return JsonResponse([], safe=False)
+    industries = get_index().search_industries(query, limit=10)
+    return JsonResponse([{'name': name} for name in industries], safe=False)
 
 def get_keywords(request):
     """獲取關鍵字建議列表"""
     query = request.GET.get('q', '')
     industry = request.GET.get('industry', '')
     
-    # 清理查詢字符串
-    query = clean_text(query)
-    industry = clean_text(industry)
-    
-    # 排除預設提示文字和空選項
-    excluded_keywords = ['選擇或輸入關鍵字...', '', None]
-    
-    # 使用 distinct 確保關鍵字不重複，同時排除空白或無效的關鍵字
-    keywords = Keyword.objects.exclude(
-        Q(keyword__in=excluded_keywords) |
-        Q(keyword__isnull=True) |
-        Q(keyword__exact='') |
-        Q(keyword__regex=r'^\s*$')
-    ).values('keyword').distinct()
-    
-    if industry:
-        # 如果選擇了產業，優先顯示該產業的關鍵字，但也包含其他關鍵字
-        industry_keywords = Keyword.objects.filter(
-            industry__name=industry,
-            keyword__icontains=query if query else ''
-        ).exclude(
-            Q(keyword__in=excluded_keywords) |
-            Q(keyword__isnull=True) |
-            Q(keyword__exact='') |
-            Q(keyword__regex=r'^\s*$')
-        ).values_list('keyword', flat=True)
-        
-        other_keywords = Keyword.objects.exclude(
-            industry__name=industry
-        ).filter(
-            keyword__icontains=query if query else ''
-        ).exclude(
-            Q(keyword__in=excluded_keywords) |
-            Q(keyword__isnull=True) |
-            Q(keyword__exact='') |
-            Q(keyword__regex=r'^\s*$')
-        ).values_list('keyword', flat=True)
-        
-        # 合併結果，確保產業關鍵字優先顯示，並移除重複項
-        all_keywords = list(industry_keywords) + list(set(other_keywords) - set(industry_keywords))
-        # 過濾掉空白、無效或預設的關鍵字
-        all_keywords = [k for k in all_keywords if k and k not in excluded_keywords and clean_text(k)]
-        return JsonResponse([{'keyword': k} for k in all_keywords[:10]], safe=False)
-    
-    if query:
-        keywords = keywords.filter(keyword__icontains=query)
+    # 清理查詢字符串；查詢字串與產業建議相同，保留單一字元
+    raw_query = query.strip()
+    query = clean_text(raw_query)
+    if raw_query and not query:
+        return JsonResponse([], safe=False)
+    industry = clean_term(industry)
     
-    # 過濾掉空白、無效或預設的關鍵字
-    keywords_list = [k['keyword'] for k in keywords.values('keyword') if k['keyword'] and k['keyword'] not in excluded_keywords and clean_text(k['keyword'])]
-    return JsonResponse([{'keyword': k} for k in keywords_list[:10]], safe=False)
+    # 從記憶體內索引查詢：如果選擇了產業，優先顯示該產業的關鍵字，但也包含其他關鍵字
+    keywords = get_index().search_keywords(query, industry=industry, limit=10)
+    return JsonResponse([{'keyword': k} for k in keywords], safe=False)